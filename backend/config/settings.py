@@ -1,4 +1,5 @@
 import os
+from typing import List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,6 +13,27 @@ def get_env_int(name: str, default: int) -> int:
     except ValueError:
         return default
 
+def get_env_float(name: str, default: float) -> float:
+    val = os.getenv(name)
+    if val is None or val.strip() == "":
+        return default
+    try:
+        return float(val)
+    except ValueError:
+        return default
+
+def get_env_bool(name: str, default: bool) -> bool:
+    val = os.getenv(name)
+    if val is None or val.strip() == "":
+        return default
+    return val.strip().lower() in ("1", "true", "yes", "on")
+
+def get_env_list(name: str) -> Optional[List[str]]:
+    val = os.getenv(name)
+    if val is None or val.strip() == "":
+        return None
+    return [item.strip() for item in val.split(",") if item.strip()]
+
 class Settings:
     # IXC API Configuration
     IXC_CONFIG = {
@@ -22,7 +44,46 @@ class Settings:
                 'user_token': os.getenv("IXC_API_TOKEN", "")
             },
             'request_param': {
-                'default_page_size': get_env_int("IXC_PAGE_SIZE", 100)
+                'default_page_size': get_env_int("IXC_PAGE_SIZE", 100),
+                'page_concurrency': get_env_int("IXC_PAGE_CONCURRENCY", 4),
+                'prefetch': get_env_int("IXC_PREFETCH_PAGES", 4),
+                # Endpoints paged by `id > last_id` instead of page offsets
+                'keyset_endpoints': get_env_list("IXC_KEYSET_ENDPOINTS") or [],
+                'page_budget': get_env_int("IXC_SYNC_PAGE_BUDGET", 2000),
+                'checkpoint_dir': os.getenv("IXC_CHECKPOINT_DIR", "data/checkpoints"),
+                'checkpoint_ttl': get_env_int("IXC_CHECKPOINT_TTL_MINUTES", 120) * 60
+            },
+            'retry': {
+                'max_retries': get_env_int("IXC_MAX_RETRIES", 4),
+                'backoff_base': get_env_float("IXC_RETRY_BACKOFF_BASE", 0.5),
+                'backoff_max': get_env_float("IXC_RETRY_BACKOFF_MAX", 30.0)
+            },
+            'http': {
+                'max_connections': get_env_int("IXC_HTTP_MAX_CONNECTIONS", 10),
+                'max_keepalive_connections': get_env_int("IXC_HTTP_MAX_KEEPALIVE", 5),
+                'keepalive_expiry': get_env_float("IXC_HTTP_KEEPALIVE_EXPIRY", 30.0),
+                'http2': get_env_bool("IXC_HTTP2", False),
+                # Decode `registros` incrementally while pages download (needs ijson)
+                'stream_decode': get_env_bool("IXC_STREAM_DECODE", True)
+            },
+            # Per-endpoint field allowlist overrides ('*' keeps every field)
+            'fields': {
+                endpoint: fields for endpoint, fields in (
+                    (endpoint, get_env_list(f"IXC_FIELDS_{endpoint.upper()}"))
+                    for endpoint in ('cliente', 'cliente_contrato', 'fn_areceber', 'tipo_cliente')
+                ) if fields is not None
+            },
+            'page_size_tuning': {
+                'enabled': get_env_bool("IXC_PAGE_SIZE_AUTO", True),
+                'min_size': get_env_int("IXC_PAGE_SIZE_MIN", 50),
+                'max_size': get_env_int("IXC_PAGE_SIZE_MAX", 2000),
+                'state_path': os.getenv("IXC_PAGE_SIZE_STATE_PATH", "data/page_sizes.json")
+            },
+            'rate_limit': {
+                'rate': get_env_float("IXC_RATE_LIMIT", 10.0),
+                'min_rate': get_env_float("IXC_RATE_LIMIT_MIN", 1.0),
+                'max_rate': get_env_float("IXC_RATE_LIMIT_MAX", 30.0),
+                'burst': get_env_float("IXC_RATE_LIMIT_BURST", 5.0)
             }
         }
     }
@@ -31,15 +92,50 @@ class Settings:
     SYNC_INTERVAL_MINUTES = get_env_int("IXC_SYNC_INTERVAL_MINUTES", 30)
     SYNC_CUSTOMERS_HOUR = get_env_int("IXC_SYNC_CUSTOMERS_HOUR", 7)
     REPORT_DAYS = get_env_int("IXC_REPORT_DAYS", 45)
+    # Delinquency buckets: 1..N days late is vencimento_padrao, up to M transicao, cronico after that
+    CLASSIFIER_PADRAO_MAX_DAYS = get_env_int("CLASSIFIER_PADRAO_MAX_DAYS", 6)
+    CLASSIFIER_TRANSICAO_MAX_DAYS = get_env_int("CLASSIFIER_TRANSICAO_MAX_DAYS", 10)
+    # Trust unlock only counts while the client's (first) contract connection is active
+    CLASSIFIER_TRUST_REQUIRES_ACTIVE = get_env_bool("CLASSIFIER_TRUST_REQUIRES_ACTIVE", True)
+    
+    # 'delta' fetches only rows changed since the last run; 'full' always re-downloads everything
+    SYNC_MODE = os.getenv("IXC_SYNC_MODE", "delta").strip().lower()
+    SYNC_FULL_RECONCILE_HOURS = get_env_int("IXC_SYNC_FULL_RECONCILE_HOURS", 24)
     
     # Timeouts
     HTTP_TIMEOUT = get_env_int("IXC_HTTP_TIMEOUT", 120)
     
+    # Storage backend: 'tinydb' (JSON snapshot files) or 'sqlite' (one indexed database).
+    # The dataset paths below name the datasets either way; SQLite imports them on first use.
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "tinydb").strip().lower()
+    STORAGE_SQLITE_PATH = os.getenv("STORAGE_SQLITE_PATH", "data/ixc.sqlite3")
+    # Also write a typed Arrow IPC snapshot of each dataset per generation (needs pyarrow)
+    STORAGE_COLUMNAR = get_env_bool("STORAGE_COLUMNAR", True)
+    # Compress the TinyDB snapshot files: 'none', 'auto' (zstd, else lz4, else gzip), 'zstd', 'lz4' or 'gzip'
+    STORAGE_COMPRESSION = os.getenv("STORAGE_COMPRESSION", "none")
+
+    # Daily history of bills and contracts: one delta-encoded snapshot per day
+    HISTORY_ENABLED = get_env_bool("HISTORY_ENABLED", True)
+    HISTORY_PATH = os.getenv("HISTORY_PATH", "data/history")
+    HISTORY_RETENTION_DAYS = get_env_int("HISTORY_RETENTION_DAYS", 400)
+    # A full keyframe every N recorded days bounds how many deltas an as-of read replays
+    HISTORY_KEYFRAME_DAYS = get_env_int("HISTORY_KEYFRAME_DAYS", 7)
+    HISTORY_COMPRESSION = os.getenv("HISTORY_COMPRESSION", "auto")
+
+    # Delinquency report views precomputed after each sync and at midnight (memory + disk)
+    MATERIALIZE_METRICS = get_env_bool("MATERIALIZE_METRICS", True)
+    MATERIALIZED_PATH = os.getenv("MATERIALIZED_PATH", "data/materialized/inadiplencia.json")
+    # Cache-Control of the report endpoints; with 'no-cache' clients revalidate with ETag and get cheap 304s
+    REPORT_CACHE_CONTROL = os.getenv("REPORT_CACHE_CONTROL", "private, no-cache")
+    # Inadiplencia views of other as_of/start/end params kept per storage generation (LRU)
+    REPORT_CACHE_SIZE = get_env_int("REPORT_CACHE_SIZE", 256)
+    
     # Storage Paths (TinyDB)
     
     STORAGE_PATH_CLIENTES = os.getenv("IXC_STORAGE_PATH_CLIENTES", "data/clientes.json")
     STORAGE_PATH_CONTRATOS = os.getenv("IXC_STORAGE_PATH_CONTRATOS", "data/contratos.json")
     STORAGE_PATH_BOLETOS = os.getenv("IXC_STORAGE_PATH_BOLETOS", "data/boletos.json")
+    WATERMARKS_PATH = os.getenv("IXC_WATERMARKS_PATH", "data/watermarks.json")
     
     # API Configuration
     API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from loguru import logger
+
+
+class ListingCheckpoint:
+    """
+    On-disk progress of one paginated listing.
+
+    Stored as JSON lines: a header with the `total` and page size IXC
+    reported, then one line per page that was fetched successfully. A sync
+    that fails half-way leaves the file behind, and the next run of the same
+    listing only fetches the pages that are missing.
+    """
+
+    _PAGE_PREFIX = re.compile(rb'^\{"page": (\d+), "registros": ')
+
+    def __init__(self, directory: str, endpoint: str, query_params: Dict[str, Any], ttl_seconds: float = 7200):
+        key = hashlib.sha1(json.dumps([endpoint, query_params], sort_keys=True).encode()).hexdigest()[:16]
+        self.path = os.path.join(directory, f"{endpoint}-{key}.jsonl")
+        self.endpoint = endpoint
+        self.ttl_seconds = ttl_seconds
+        self.total: Optional[int] = None
+        self.page_size: Optional[int] = None
+        self._offsets: Dict[int, int] = {}
+
+    def load(self, total: int, page_size: int) -> Set[int]:
+        """
+        Return the page numbers saved for a listing of the same shape, discarding anything stale.
+
+        Only byte offsets are kept in memory; `read_page` decodes a page when
+        the listing reaches it.
+        """
+        self.total, self.page_size = total, page_size
+        self._offsets = {}
+        if not os.path.exists(self.path):
+            return set()
+        if time.time() - os.path.getmtime(self.path) > self.ttl_seconds:
+            self.clear()
+            return set()
+        valid_end = 0
+        with open(self.path, "rb") as f:
+            header = json.loads(f.readline() or b"{}")
+            if header.get("total") != total or header.get("page_size") != page_size:
+                logger.info(f"Discarding checkpoint for {self.endpoint}: listing changed since it was written")
+            else:
+                valid_end = f.tell()
+                while True:
+                    offset = f.tell()
+                    line = f.readline()
+                    match = self._PAGE_PREFIX.match(line)
+                    # A line cut short by a crash ends the usable part of the file
+                    if not match or not line.endswith(b"}\n"):
+                        break
+                    self._offsets[int(match.group(1))] = offset
+                    valid_end = f.tell()
+        if not self._offsets:
+            self.clear()
+            return set()
+        if valid_end < os.path.getsize(self.path):
+            logger.warning(f"Checkpoint {self.path} is truncated; resuming from its valid pages")
+            os.truncate(self.path, valid_end)
+        logger.info(f"Resuming {self.endpoint} from checkpoint with {len(self._offsets)} pages already fetched")
+        return set(self._offsets)
+
+    def read_page(self, page: int) -> List[Dict[str, Any]]:
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[page])
+            return json.loads(f.readline())["registros"]
+
+    def save_page(self, page: int, records: List[Dict[str, Any]]) -> None:
+        if page in self._offsets:
+            return
+        new_file = not os.path.exists(self.path)
+        if new_file:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            if new_file:
+                f.write(json.dumps({"endpoint": self.endpoint, "total": self.total, "page_size": self.page_size}) + "\n")
+            self._offsets[page] = f.tell()
+            f.write(json.dumps({"page": page, "registros": records}) + "\n")
+
+    def clear(self) -> None:
+        self._offsets = {}
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
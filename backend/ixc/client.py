@@ -3,11 +3,19 @@ import time
 import base64
 import json
 import asyncio
-from typing import List, Dict, Any, Optional
+import random
+import importlib.util
+from collections import deque
+from typing import List, Dict, Any, Optional, AsyncIterator
 from loguru import logger
 from datetime import datetime, timedelta
 
 from config.settings import settings
+from ixc.ratelimit import AdaptiveRateLimiter, get_rate_limiter
+from ixc.checkpoint import ListingCheckpoint
+from ixc.tuning import PageSizeTuner
+from ixc.decoding import PageDecoder
+from ixc.exceptions import IxcRequestError, PageBudgetExceeded, IncompleteListingError
 
 class IxcClient:
     """
@@ -26,7 +34,25 @@ class IxcClient:
         'CM': 'Check Status'
     }
 
-    def __init__(self, instance_config: Dict[str, Any]):
+    # Fields kept from each IXC row; everything else is dropped as pages are decoded.
+    # Derived from what main.py, the sync watermarks and _enrich_records read.
+    FIELD_ALLOWLIST = {
+        'cliente': [
+            'id', 'razao', 'fantasia', 'bairro', 'fone', 'telefone_celular', 'telefone_comercial',
+            'telefone_residencial', 'id_tipo_cliente', 'ativo', 'ultima_atualizacao'
+        ],
+        'cliente_contrato': [
+            'id', 'id_cliente', 'status', 'status_internet', 'desbloqueio_confianca',
+            'desbloqueio_confianca_ativo', 'ultima_atualizacao'
+        ],
+        'fn_areceber': [
+            'id', 'id_cliente', 'data_emissao', 'data_vencimento', 'pagamento_data', 'valor', 'status',
+            'ultima_atualizacao'
+        ],
+        'tipo_cliente': ['id', 'tipo_cliente']
+    }
+
+    def __init__(self, instance_config: Dict[str, Any], transport: Optional[httpx.AsyncBaseTransport] = None):
         self.config = instance_config
         self.erp = instance_config.get('erp', {})
         self.base_url = self.erp.get('base_url')
@@ -34,13 +60,82 @@ class IxcClient:
         self.user_id = self.auth.get('user_id')
         self.token = self.auth.get('user_token')
         self.default_page_size = self.erp.get('request_param', {}).get('default_page_size', 100)
+        self.page_concurrency = self.erp.get('request_param', {}).get('page_concurrency', 1)
+        self.prefetch = self.erp.get('request_param', {}).get('prefetch')
+        self.keyset_endpoints = set(self.erp.get('request_param', {}).get('keyset_endpoints') or [])
+        
+        # Per-endpoint `rp` tuning (disabled unless configured)
+        tuning = self.erp.get('page_size_tuning', {})
+        self.tuner: Optional[PageSizeTuner] = None
+        if tuning.get('enabled'):
+            self.tuner = PageSizeTuner(
+                tuning.get('state_path'),
+                initial=self.default_page_size,
+                min_size=tuning.get('min_size', 50),
+                max_size=tuning.get('max_size', 2000),
+                timeout=settings.HTTP_TIMEOUT
+            )
         
-        self.last_request_time = 0
-        self.min_delay = 0.1  # 100ms
+        # Retry / budget / resume policy
+        retry = self.erp.get('retry', {})
+        self.max_retries = retry.get('max_retries', 4)
+        self.backoff_base = retry.get('backoff_base', 0.5)
+        self.backoff_max = retry.get('backoff_max', 30.0)
+        self.page_budget = self.erp.get('request_param', {}).get('page_budget')
+        self.pages_fetched = 0
+        self.checkpoint_dir = self.erp.get('request_param', {}).get('checkpoint_dir')
+        self.checkpoint_ttl = self.erp.get('request_param', {}).get('checkpoint_ttl', 7200)
+        self.http_config = self.erp.get('http', {})
+        self.fields = {**self.FIELD_ALLOWLIST, **self.erp.get('fields', {})}
+        self.stream_decode = self.http_config.get('stream_decode', True)
         
+        # Shared with every other client of this IXC instance
+        self.rate_limiter: AdaptiveRateLimiter = get_rate_limiter(self.base_url, **self.erp.get('rate_limit', {}))
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        
+        # Pooled HTTP client, created lazily and reused for the client's lifetime
+        self._transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
         
         logger.info(f"Initialized IxcClient for {self.base_url}")
 
+    async def __aenter__(self) -> "IxcClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    def _build_http_client(self) -> httpx.AsyncClient:
+        """Create the pooled keep-alive client used for every request of this instance."""
+        limits = httpx.Limits(
+            max_connections=self.http_config.get('max_connections', 10),
+            max_keepalive_connections=self.http_config.get('max_keepalive_connections', 5),
+            keepalive_expiry=self.http_config.get('keepalive_expiry', 30.0)
+        )
+        http2 = bool(self.http_config.get('http2', False))
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+            http2 = False
+        return httpx.AsyncClient(
+            timeout=settings.HTTP_TIMEOUT,
+            limits=limits,
+            http2=http2,
+            transport=self._transport
+        )
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """The shared pooled client (opened on first use)."""
+        if self._http is None or self._http.is_closed:
+            self._http = self._build_http_client()
+        return self._http
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client and release its connections."""
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._http = None
+
     def _get_headers(self) -> Dict[str, str]:
         """Generate authentication headers."""
         credentials = f"{self.user_id}:{self.token}"
@@ -52,63 +147,257 @@ class IxcClient:
         }
 
     async def _rate_limit(self):
-        """Non-blocking rate limiting to avoid hitting API thresholds."""
-        now = time.time()
-        elapsed = now - self.last_request_time
-        if elapsed < self.min_delay:
-            await asyncio.sleep(self.min_delay - elapsed)
-        self.last_request_time = time.time()
+        """Wait for a slot from the shared, adaptive rate limiter of this IXC instance."""
+        await self.rate_limiter.acquire()
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        try:
+            return float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than a server-provided Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        return max(delay, retry_after or 0.0)
 
     async def _fetch_page(self, endpoint: str, query_params: Dict[str, Any], page: int) -> Dict[str, Any]:
-        """Fetch a single page from the IXC API."""
+        """
+        Fetch a single page from the IXC API.
+
+        Timeouts, connection errors, 429 and 5xx responses are retried with
+        jittered exponential backoff. Anything else, or running out of
+        attempts, raises `IxcRequestError`; an empty dict is never returned
+        for a failed page.
+        """
         params = query_params.copy()
         params['page'] = str(page)
         if 'rp' not in params:
             params['rp'] = str(self.default_page_size)
-            
-        await self._rate_limit()
-        url = f"{self.base_url}/webservice/v1/{endpoint}"
+
+        if self.page_budget is not None and self.pages_fetched >= self.page_budget:
+            raise PageBudgetExceeded(f"Page budget of {self.page_budget} exhausted while fetching {endpoint} page {page}")
+        self.pages_fetched += 1
         
-        try:
-            async with httpx.AsyncClient(timeout=settings.HTTP_TIMEOUT) as client:
-                response = await client.post(url, headers=self._get_headers(), json=params)
-                response.raise_for_status()
-                return response.json()
-        except Exception as e:
-            logger.error(f"Error fetching {endpoint} page {page}: {type(e).__name__}: {e}")
-            return {}
+        url = f"{self.base_url}/webservice/v1/{endpoint}"
+        attempt = 0
+        while True:
+            await self._rate_limit()
+            started = time.monotonic()
+            retry_after = None
+            try:
+                async with self.http.stream("POST", url, headers=self._get_headers(), json=params) as response:
+                    retry_after = self._retry_after(response)
+                    # Time to headers: the server-side cost, independent of page size
+                    self.rate_limiter.record(response.status_code, time.monotonic() - started, retry_after)
+                    if response.status_code == 429 or response.status_code >= 500:
+                        reason = f"HTTP {response.status_code}"
+                    elif response.is_error:
+                        raise IxcRequestError(endpoint, page, f"HTTP {response.status_code}")
+                    else:
+                        # Records are decoded and projected while the body is still arriving
+                        decoder = PageDecoder(self.fields.get(endpoint), stream=self.stream_decode)
+                        records = []
+                        async for chunk in response.aiter_bytes():
+                            records.extend(decoder.feed(chunk))
+                        data = decoder.close()
+                        if isinstance(data, dict) and data.get('type') == 'error':
+                            raise IxcRequestError(endpoint, page, data.get('message', 'error response'))
+                        if decoder.stream:
+                            data['registros'] = records
+                        if self.tuner is not None:
+                            self.tuner.observe(endpoint, int(params['rp']), len(data.get('registros') or []),
+                                               time.monotonic() - started, decoder.nbytes)
+                        return data
+            except httpx.TransportError as e:
+                self.rate_limiter.record(None, time.monotonic() - started)
+                if self.tuner is not None and isinstance(e, httpx.TimeoutException):
+                    self.tuner.observe_timeout(endpoint, int(params['rp']))
+                reason = f"{type(e).__name__}: {e}"
+            except ValueError as e:
+                # Body cut short mid-transfer
+                reason = f"invalid JSON: {e}"
 
-    async def list_all(self, endpoint: str, query_params: Dict[str, Any], refresh: bool = False) -> List[Dict[str, Any]]:
-        # Fetching always from API now, caching is handled by the sync process
-        all_records = []
-        page = 1
+            if attempt >= self.max_retries:
+                logger.error(f"Giving up on {endpoint} page {page} after {attempt + 1} attempts: {reason}")
+                raise IxcRequestError(endpoint, page, reason)
+            delay = self._backoff(attempt, retry_after)
+            attempt += 1
+            logger.warning(f"Error fetching {endpoint} page {page} ({reason}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def _endpoint_semaphore(self, endpoint: str) -> asyncio.Semaphore:
+        """Per-endpoint bound on in-flight page requests."""
+        if endpoint not in self._semaphores:
+            self._semaphores[endpoint] = asyncio.Semaphore(max(1, self.page_concurrency))
+        return self._semaphores[endpoint]
+
+    def _with_page_size(self, endpoint: str, query_params: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in the tuned `rp` unless the caller fixed one."""
+        if self.tuner is None or 'rp' in query_params:
+            return query_params
+        return dict(query_params, rp=str(self.tuner.page_size(endpoint)))
+
+    @staticmethod
+    def _stable_order(endpoint: str, query_params: Dict[str, Any]) -> bool:
+        """Whether offset pages are reproducible: only a sort on the unique id fixes the order of equal keys."""
+        return query_params.get('sortname') == f"{endpoint}.id"
+
+    def _checkpoint(self, endpoint: str, query_params: Dict[str, Any]) -> Optional[ListingCheckpoint]:
+        # Resuming by page number is only safe when the listing has a stable order
+        if not self.checkpoint_dir or not self._stable_order(endpoint, query_params):
+            return None
+        return ListingCheckpoint(self.checkpoint_dir, endpoint, query_params, ttl_seconds=self.checkpoint_ttl)
+
+    async def iter_pages(self, endpoint: str, query_params: Dict[str, Any],
+                         prefetch: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield the pages of a listing in order, one list of records at a time.
+
+        Page 1 is fetched first to learn `total`; up to `prefetch` of the
+        following pages are then fetched ahead of the consumer (bounded by the
+        per-endpoint semaphore), so at most `prefetch + 1` pages are held in
+        memory. Read-ahead only happens for listings sorted by id, since
+        offset pages of any other order (rows with equal keys) are not stable.
+
+        Raises `IncompleteListingError` once the listing ends if the number of
+        records does not match the reported `total`. Pages that did arrive are
+        kept in a checkpoint so the next attempt only fetches what is missing.
+
+        Endpoints listed in `keyset_endpoints` are paged by id instead
+        (see `_iter_pages_keyset`).
+        """
+        params = self._with_page_size(endpoint, query_params)
+        if endpoint in self.keyset_endpoints:
+            async for page in self._iter_pages_keyset(endpoint, params):
+                yield page
+            if self.tuner is not None:
+                self.tuner.finish(endpoint)
+            return
+
+        first = await self._fetch_page(endpoint, params, 1)
+        first_records = first.get('registros', [])
+        total_records = int(first.get('total', 0) or 0)
+        received = len(first_records)
+        logger.debug(f"Expecting {total_records} records from {endpoint}")
+
+        checkpoint = None
+        if first_records and received < total_records:
+            # The server may cap `rp`, so the real page size is what page 1 returned
+            page_size = received
+            last_page = -(-total_records // page_size)
+            checkpoint = self._checkpoint(endpoint, query_params)
+            saved = set()
+            if checkpoint is not None:
+                saved = checkpoint.load(total_records, page_size)
+                checkpoint.save_page(1, first_records)
+
+            sorted_listing = self._stable_order(endpoint, query_params)
+            semaphore = self._endpoint_semaphore(endpoint) if sorted_listing else asyncio.Semaphore(1)
+            depth = max(1, prefetch or self.prefetch or self.page_concurrency) if sorted_listing else 1
+
+            async def fetch(page: int) -> List[Dict[str, Any]]:
+                if page in saved:
+                    return checkpoint.read_page(page)
+                async with semaphore:
+                    data = await self._fetch_page(endpoint, params, page)
+                records = data.get('registros', [])
+                if checkpoint is not None:
+                    checkpoint.save_page(page, records)
+                return records
+
+            yield first_records
+            pending: deque = deque()
+            next_page = 2
+            try:
+                while next_page <= last_page or pending:
+                    while next_page <= last_page and len(pending) < depth:
+                        pending.append(asyncio.ensure_future(fetch(next_page)))
+                        next_page += 1
+                    records = await pending.popleft()
+                    received += len(records)
+                    yield records
+            finally:
+                for task in pending:
+                    task.cancel()
+        elif first_records:
+            yield first_records
+
+        if received != total_records:
+            raise IncompleteListingError(endpoint, total_records, received)
+        if checkpoint is not None:
+            checkpoint.clear()
+        if self.tuner is not None:
+            self.tuner.finish(endpoint)
+        logger.success(f"Fetched {received} total records from {endpoint}")
+
+    async def _iter_pages_keyset(self, endpoint: str, query_params: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Page through a listing with `id > last_seen_id` instead of `page`/`rp` offsets.
+
+        IXC only has to seek the primary key for each page, rather than skip
+        every row before the offset, and rows inserted or removed mid-sync
+        cannot shift the remaining pages. Pages are inherently sequential, so
+        there is no read-ahead. The listing is forced into ascending id order.
+        """
+        params = dict(query_params, sortname=f"{endpoint}.id", sortorder="asc")
         total_records = None
-        
+        page_size = None
+        received = 0
+        last_id = None
+
         while True:
-            data = await self._fetch_page(endpoint, query_params, page)
+            query = params if last_id is None else self.with_filter(params, f"{endpoint}.id", ">", last_id)
+            data = await self._fetch_page(endpoint, query, 1)
             records = data.get('registros', [])
+            if total_records is None:
+                total_records = int(data.get('total', 0) or 0)
+                # The server may cap `rp`, so the real page size is what the first page returned
+                page_size = len(records)
+                logger.debug(f"Expecting {total_records} records from {endpoint} (keyset)")
             if not records:
                 break
-                
-            all_records.extend(records)
-            
-            if total_records is None:
-                total_records = int(data.get('total', 0))
-                logger.debug(f"Expecting {total_records} records from {endpoint}")
-            
-            if len(all_records) >= total_records:
+            received += len(records)
+            last_id = records[-1]['id']
+            yield records
+            if len(records) < page_size or received >= total_records:
                 break
-            
-            page += 1
-                
-        logger.success(f"Fetched {len(all_records)} total records from {endpoint}")
+
+        # Rows inserted mid-listing may legitimately push the count above `total`
+        if received < total_records:
+            raise IncompleteListingError(endpoint, total_records, received)
+        logger.success(f"Fetched {received} total records from {endpoint}")
+
+    async def iter_records(self, endpoint: str, query_params: Dict[str, Any],
+                           prefetch: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the records of a listing one at a time (see `iter_pages`)."""
+        async for page in self.iter_pages(endpoint, query_params, prefetch=prefetch):
+            for record in page:
+                yield record
+
+    async def list_all(self, endpoint: str, query_params: Dict[str, Any], refresh: bool = False) -> List[Dict[str, Any]]:
+        """Fetch every record of a listing into memory. Prefer `iter_pages` for large endpoints."""
+        # Fetching always from API now, caching is handled by the sync process
+        all_records = []
+        async for page in self.iter_pages(endpoint, query_params):
+            all_records.extend(page)
         return all_records
 
+    @staticmethod
+    def with_filter(query_params: Dict[str, Any], column: str, op: str, value: Any) -> Dict[str, Any]:
+        """Return a copy of `query_params` with one more `grid_param` condition (ANDed with the others)."""
+        params = dict(query_params)
+        grid = json.loads(params.get('grid_param') or '[]')
+        grid.append({"TB": column, "OP": op, "P": str(value)})
+        params['grid_param'] = json.dumps(grid)
+        return params
+
     # Data Retrieval Methods
     
-    async def list_customers(self, refresh: bool = False) -> List[Dict[str, Any]]:
-        """List all customers (PF/PJ), excluding filial 3."""
-        params = {
+    def customers_query(self) -> Dict[str, Any]:
+        """Listing params for all customers (PF/PJ), excluding filial 3."""
+        return {
             "qtype": "cliente.id",
             "query": "0",
             "oper": ">",
@@ -119,14 +408,17 @@ class IxcClient:
                 {"TB": "cliente.filial_id", "OP": "!=", "P": "3"}
             ])
         }
-        return await self.list_all("cliente", params, refresh=refresh)
+
+    async def list_customers(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """List all customers (PF/PJ), excluding filial 3."""
+        return await self.list_all("cliente", self.customers_query(), refresh=refresh)
 
     async def get_customers(self, refresh: bool = False) -> List[Dict[str, Any]]:
         """Deprecated: Use list_customers instead."""
         return await self.list_customers(refresh=refresh)
 
-    async def list_bills(self, start_date: Optional[str] = None, end_date: Optional[str] = None, refresh: bool = False) -> List[Dict[str, Any]]:
-        """List open bills within a date range."""
+    def bills_query(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+        """Listing params for released bills due within a date range (default: last REPORT_DAYS)."""
         today = datetime.now()
         
         d_format = "%d/%m/%Y"
@@ -139,11 +431,12 @@ class IxcClient:
         else:
             start_str = (today - timedelta(days=settings.REPORT_DAYS)).strftime(d_format)
         
-        params = {
+        return {
             "qtype": "fn_areceber.data_vencimento",
             "query": end_str,
             "oper": "<",
-            "sortname": "fn_areceber.data_vencimento",
+            # By id: pages fetched concurrently (or resumed) must not shuffle bills with the same due date
+            "sortname": "fn_areceber.id",
             "sortorder": "asc",
             "grid_param": json.dumps([
                 {"TB": "fn_areceber.liberado", "OP": "=", "P": "S"},
@@ -152,11 +445,14 @@ class IxcClient:
                 {"TB": "fn_areceber.data_vencimento", "OP": ">", "P": start_str}
             ])
         }
-        return await self.list_all("fn_areceber", params, refresh=refresh)
 
-    async def list_contracts(self, refresh: bool = False) -> List[Dict[str, Any]]:
-        """List all active contracts."""
-        params = {
+    async def list_bills(self, start_date: Optional[str] = None, end_date: Optional[str] = None, refresh: bool = False) -> List[Dict[str, Any]]:
+        """List open bills within a date range."""
+        return await self.list_all("fn_areceber", self.bills_query(start_date, end_date), refresh=refresh)
+
+    def contracts_query(self) -> Dict[str, Any]:
+        """Listing params for all contracts, excluding filial 3."""
+        return {
             "qtype": "cliente_contrato.id",
             "query": "0",
             "oper": ">",
@@ -166,7 +462,10 @@ class IxcClient:
                 {"TB": "cliente_contrato.id_filial", "OP": "!=", "P": "3"}
             ])
         }
-        return await self.list_all("cliente_contrato", params, refresh=refresh)
+
+    async def list_contracts(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """List all active contracts."""
+        return await self.list_all("cliente_contrato", self.contracts_query(), refresh=refresh)
 
     async def list_client_types(self, refresh: bool = False) -> List[Dict[str, Any]]:
         """Retrieve client types."""
@@ -185,7 +484,6 @@ class IxcClient:
             "qtype": "cliente_contrato.status", 
             "query": "A", 
             "oper": "=",
-            "rp": "600", 
             "sortname": "cliente_contrato.id", 
             "sortorder": "asc",
             "grid_param": json.dumps([
@@ -0,0 +1,95 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from utils import fastjson
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - depends on the environment
+    ijson = None
+
+
+class PageDecoder:
+    """
+    Incremental decoder for one IXC listing response.
+
+    Chunks of the body are pushed in as they arrive; each completed entry of
+    `registros` is projected to `fields` and handed back straight away, so
+    the raw body, its decoded text and the full dict tree of a large page
+    never exist in memory at the same time. Uses ijson (with its C backend
+    when available); without ijson the body is buffered and decoded in one
+    go with orjson or the stdlib, which is what `stream=False` also does.
+
+    The top-level scalars (`total`, `page`, `type`/`message` on errors) sit
+    outside the array; they are recovered from the bytes around it.
+    """
+
+    _HEAD_LIMIT = 64 * 1024
+    _TOTAL = re.compile(rb'"total"\s*:\s*"?(\d+)')
+
+    def __init__(self, fields: Optional[List[str]] = None, stream: bool = True):
+        self.fields = None if not fields or '*' in fields else fields
+        self.stream = stream and ijson is not None
+        self.nbytes = 0
+        self._buffer = bytearray()
+        self._head = bytearray()
+        self._tail = b""
+        self._in_array = False
+        if self.stream:
+            self._items = ijson.sendable_list()
+            self._coro = ijson.items_coro(self._items, 'registros.item', use_float=True)
+
+    def _project(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        if self.fields is None:
+            return record
+        return {k: record[k] for k in self.fields if k in record}
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """Push one chunk; returns the records it completed."""
+        self.nbytes += len(chunk)
+        if not self.stream:
+            self._buffer += chunk
+            return []
+        if not self._in_array:
+            self._head += chunk
+            self._in_array = b'"registros"' in self._head or len(self._head) > self._HEAD_LIMIT
+        self._tail = (self._tail + chunk)[-512:]
+        try:
+            self._coro.send(chunk)
+        except ijson.JSONError as e:
+            raise ValueError(str(e)) from e
+        records = [self._project(r) for r in self._items]
+        del self._items[:]
+        return records
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Finish the body and return the page's top-level object.
+
+        When streaming, `registros` is left empty: its entries were already
+        returned by `feed`.
+        """
+        if not self.stream:
+            data = fastjson.loads(bytes(self._buffer))
+            self._buffer = bytearray()
+            if isinstance(data, dict) and data.get('registros'):
+                data['registros'] = [self._project(r) for r in data['registros']]
+            return data
+        try:
+            self._coro.close()
+        except ijson.JSONError as e:
+            raise ValueError(str(e)) from e
+
+        head = bytes(self._head)
+        array_at = head.find(b'"registros"')
+        if array_at < 0:
+            # No record array at all (empty listing or an error object): small enough to decode whole
+            return fastjson.loads(head) if len(head) <= self._HEAD_LIMIT else {}
+        data: Dict[str, Any] = {'registros': []}
+        # `total` precedes the array in IXC responses; fall back to what follows it
+        match = self._TOTAL.search(head, 0, array_at)
+        if not match and b']' in self._tail:
+            match = self._TOTAL.search(self._tail[self._tail.rfind(b']'):])
+        if match:
+            data['total'] = int(match.group(1))
+        return data
@@ -0,0 +1,26 @@
+class IxcError(Exception):
+    """Base class for failures talking to the IXC webservice."""
+
+
+class IxcRequestError(IxcError):
+    """A page could not be fetched, even after retries."""
+
+    def __init__(self, endpoint: str, page: int, reason: str):
+        self.endpoint = endpoint
+        self.page = page
+        self.reason = reason
+        super().__init__(f"Failed to fetch {endpoint} page {page}: {reason}")
+
+
+class PageBudgetExceeded(IxcError):
+    """The client fetched more pages than its per-sync budget allows."""
+
+
+class IncompleteListingError(IxcError):
+    """A listing finished with a record count different from the `total` IXC reported."""
+
+    def __init__(self, endpoint: str, expected: int, received: int):
+        self.endpoint = endpoint
+        self.expected = expected
+        self.received = received
+        super().__init__(f"Incomplete listing for {endpoint}: expected {expected} records, received {received}")
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+class SyncJob:
+    """State of one dataset's sync: the in-flight run, if any, and how the last one ended."""
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[Any]]):
+        self.name = name
+        self.func = func
+        self.task: Optional[asyncio.Task] = None
+        self.state = "idle"
+        self.source: Optional[str] = None
+        self.queued_at: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.last_status: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.last_duration: Optional[float] = None
+        self.runs = 0
+        self.joined = 0
+
+    @property
+    def in_flight(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def status(self) -> Dict[str, Any]:
+        def stamp(ts: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(ts).isoformat(timespec="seconds") if ts else None
+
+        return {
+            "state": self.state,
+            "source": self.source,
+            "queued_at": stamp(self.queued_at),
+            "started_at": stamp(self.started_at),
+            "last_finished_at": stamp(self.finished_at),
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "last_duration_seconds": round(self.last_duration, 2) if self.last_duration is not None else None,
+            "runs": self.runs,
+            "joined": self.joined
+        }
+
+
+class SyncOrchestrator:
+    """
+    Single-flight runner for the sync jobs.
+
+    The scheduler, the startup check, `POST /sync` and cold report requests
+    all go through `trigger`. While a dataset's sync is queued or running,
+    further triggers join that run (and are counted) instead of starting a
+    second copy that would double the IXC load and race on storage.
+    """
+
+    def __init__(self, jobs: Optional[Dict[str, Callable[[], Awaitable[Any]]]] = None):
+        self.jobs: Dict[str, SyncJob] = {}
+        self.listeners: List[Callable[[str], Awaitable[Any]]] = []
+        for name, func in (jobs or {}).items():
+            self.register(name, func)
+
+    def register(self, name: str, func: Callable[[], Awaitable[Any]]) -> None:
+        self.jobs[name] = SyncJob(name, func)
+
+    def add_listener(self, listener: Callable[[str], Awaitable[Any]]) -> None:
+        """Await `listener(name)` after every successful run, e.g. to rebuild derived data."""
+        self.listeners.append(listener)
+
+    def trigger(self, name: str, source: str = "manual") -> asyncio.Task:
+        """Start `name` unless it is already in flight; returns the task of the run the caller joined."""
+        job = self.jobs[name]
+        if job.in_flight:
+            job.joined += 1
+            logger.info(f"Sync '{name}' already {job.state} (started by {job.source}); {source} joins it")
+            return job.task
+        job.state = "queued"
+        job.source = source
+        job.queued_at = time.time()
+        job.task = asyncio.create_task(self._run(job))
+        return job.task
+
+    async def run(self, name: str, source: str = "scheduler") -> None:
+        """Trigger `name` and wait for the run to finish (used by the scheduler)."""
+        await asyncio.shield(self.trigger(name, source))
+
+    async def _run(self, job: SyncJob) -> None:
+        job.state = "running"
+        job.started_at = time.time()
+        job.runs += 1
+        try:
+            await job.func()
+            job.last_status, job.last_error = "success", None
+        except Exception as e:
+            # The sync functions log the details themselves
+            job.last_status, job.last_error = "error", str(e)
+        else:
+            for listener in self.listeners:
+                try:
+                    await listener(job.name)
+                except Exception as e:
+                    logger.error(f"Listener of sync '{job.name}' failed: {e}")
+        finally:
+            job.finished_at = time.time()
+            job.last_duration = job.finished_at - job.started_at
+            job.state = "idle"
+
+    def is_busy(self, name: str) -> bool:
+        return self.jobs[name].in_flight
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: job.status() for name, job in self.jobs.items()}
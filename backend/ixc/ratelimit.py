@@ -0,0 +1,129 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+
+class AdaptiveRateLimiter:
+    """
+    Token-bucket limiter with AIMD rate control.
+
+    One instance is shared by every IxcClient talking to the same IXC
+    instance (see `get_rate_limiter`), so concurrent pages and concurrent
+    sync jobs draw from the same budget. The refill rate grows additively
+    while responses are healthy and is cut multiplicatively when IXC answers
+    429/5xx, fails outright, or latency climbs well above its baseline.
+    """
+
+    def __init__(self, rate: float = 10.0, min_rate: float = 1.0, max_rate: float = 50.0,
+                 burst: float = 5.0, increase: float = 0.5, decrease: float = 0.5,
+                 latency_factor: float = 2.0, latency_floor: float = 0.25, cooldown: float = 1.0):
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.burst = float(burst)
+        self.increase = float(increase)
+        self.decrease = float(decrease)
+        self.latency_factor = float(latency_factor)
+        self.latency_floor = float(latency_floor)
+        self.cooldown = float(cooldown)
+
+        self.tokens = self.burst
+        self.waiting = 0
+        self.latency_ewma: Optional[float] = None
+        self.latency_baseline: Optional[float] = None
+        self.throttled = 0
+
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """
+        Wait for a token.
+
+        The token is reserved synchronously (the bucket may go into debt), so
+        coroutines started together by `asyncio.gather` queue up one slot
+        apart instead of all observing the same free bucket.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        wait = max(-self.tokens / self.rate if self.tokens < 0 else 0.0, self._paused_until - now)
+        if wait <= 0:
+            return
+        self.waiting += 1
+        try:
+            await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+
+    def _decrease(self, now: float, reason: str) -> None:
+        # Several in-flight requests usually fail together; count that as one signal
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._refill(now)
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.throttled += 1
+        logger.warning(f"IXC rate limit reduced to {self.rate:.2f} req/s ({reason})")
+
+    def record(self, status_code: Optional[int], latency: float, retry_after: Optional[float] = None) -> None:
+        """Feed back the outcome of one request. `status_code=None` means the request failed."""
+        now = time.monotonic()
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+        if status_code is None or status_code == 429 or status_code >= 500:
+            self._decrease(now, f"status={status_code}")
+            return
+
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        if self.latency_baseline is None or self.latency_ewma < self.latency_baseline:
+            self.latency_baseline = self.latency_ewma
+        else:
+            # Let the baseline drift up slowly so a permanently slower server is not punished forever
+            self.latency_baseline += 0.01 * (self.latency_ewma - self.latency_baseline)
+
+        # Ignore jitter on fast responses; only a real slowdown (absolute and relative) counts
+        slowdown = self.latency_ewma - self.latency_baseline
+        if self.latency_ewma > self.latency_baseline * self.latency_factor and slowdown > self.latency_floor:
+            self._decrease(now, f"latency {self.latency_ewma:.2f}s vs baseline {self.latency_baseline:.2f}s")
+            return
+
+        # Roughly +increase req/s for every second of healthy traffic
+        self._refill(now)
+        self.rate = min(self.max_rate, self.rate + self.increase / max(self.rate, 1.0))
+
+    @property
+    def queue_depth(self) -> int:
+        return self.waiting
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "queue_depth": self.waiting,
+            "tokens": round(self.tokens, 3),
+            "latency_ewma": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+            "throttled": self.throttled
+        }
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+
+
+def get_rate_limiter(base_url: str, **config: Any) -> AdaptiveRateLimiter:
+    """Process-wide limiter for `base_url`. `config` only applies when the limiter is first created."""
+    key = (base_url or "").rstrip("/")
+    if key not in _limiters:
+        _limiters[key] = AdaptiveRateLimiter(**config)
+    return _limiters[key]
+
+
+def rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    return {url: limiter.stats() for url, limiter in _limiters.items()}
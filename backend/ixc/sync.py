@@ -1,42 +1,147 @@
 import asyncio
-from typing import List, Dict, Any
+from datetime import date, timedelta
+from typing import List, Dict, Any, AsyncIterator, Optional, Callable
 from loguru import logger
 from ixc.client import IxcClient
+from ixc.orchestrator import SyncOrchestrator
+from ixc.watermarks import WatermarkStore
 from config.settings import settings
+from utils.history import record_history
 from utils.storage import get_storage
 
+def _watermarks() -> WatermarkStore:
+    return WatermarkStore(settings.WATERMARKS_PATH)
+
+def _advance(mark: Dict[str, Any], records: List[Dict[str, Any]]) -> None:
+    """Raise the watermark to the newest `ultima_atualizacao` and highest id in `records`."""
+    for r in records:
+        ts = r.get('ultima_atualizacao') or ''
+        # IXC uses '' and zeroed dates for rows that were never edited
+        if ts[:4] not in ('', '0000') and ts > (mark.get('ultima_atualizacao') or ''):
+            mark['ultima_atualizacao'] = ts
+        try:
+            mark['max_id'] = max(mark.get('max_id') or 0, int(r.get('id')))
+        except (TypeError, ValueError):
+            pass
+
+async def _tracked(pages: AsyncIterator[List[Dict[str, Any]]], mark: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+    async for page in pages:
+        _advance(mark, page)
+        yield page
+
+async def _stream_to_storage(pages: AsyncIterator[List[Dict[str, Any]]], path: str) -> int:
+    """Write pages to storage as they arrive; the old data is only replaced once the listing completes."""
+    storage = get_storage(path)
+    with storage.writer() as writer:
+        async for page in pages:
+            writer.write_many(page)
+    return writer.count
+
+async def _sync_dataset(client: IxcClient, endpoint: str, query: Dict[str, Any], path: str,
+                        window_query: Optional[Callable[[date], Dict[str, Any]]] = None,
+                        due_after: Optional[str] = None) -> int:
+    """
+    Sync one endpoint into storage, as a delta when possible.
+
+    A full listing runs when there is no watermark yet, when IXC_SYNC_MODE is
+    'full', or every IXC_SYNC_FULL_RECONCILE_HOURS to catch deletions.
+    Otherwise only rows edited since the last `ultima_atualizacao`, rows
+    with ids above the last one seen (IXC leaves the timestamp blank on
+    some inserts) and, for windowed listings, rows that entered the window
+    since the last run are fetched and upserted; with `due_after`, stored
+    rows due on or before that day are dropped.
+    """
+    watermarks = _watermarks()
+    previous = watermarks.get(endpoint) or {}
+    mark = {'ultima_atualizacao': previous.get('ultima_atualizacao'), 'max_id': previous.get('max_id'),
+            'window_end': date.today().isoformat()}
+
+    full = settings.SYNC_MODE != 'delta' or watermarks.needs_full_sync(endpoint, settings.SYNC_FULL_RECONCILE_HOURS * 3600)
+    if full:
+        mark.update({'ultima_atualizacao': None, 'max_id': None})
+        count = await _stream_to_storage(_tracked(client.iter_pages(endpoint, query), mark), path)
+        watermarks.save(endpoint, mark, full=True)
+        logger.info(f"Full sync of {endpoint}: {count} records")
+        return count
+
+    table = query['sortname'].split('.')[0]
+    queries = [
+        client.with_filter(query, f"{table}.ultima_atualizacao", ">=", previous['ultima_atualizacao']),
+        client.with_filter(query, f"{table}.id", ">", previous['max_id'])
+    ]
+    window_end = previous.get('window_end')
+    if window_query is not None and window_end and window_end < mark['window_end']:
+        queries.append(window_query(date.fromisoformat(window_end)))
+
+    changes: List[Dict[str, Any]] = []
+    for q in queries:
+        async for page in client.iter_pages(endpoint, q):
+            changes.extend(page)
+    _advance(mark, changes)
+
+    result = get_storage(path).upsert_many(changes, due_after=due_after)
+    watermarks.save(endpoint, mark)
+    logger.info(f"Delta sync of {endpoint}: {len(changes)} rows fetched; {result.inserted} inserted, "
+                f"{result.updated} updated, {result.unchanged} unchanged, {result.deleted} deleted; {result.total} stored")
+    return result.total
+
+def _bills_window_start() -> str:
+    return (date.today() - timedelta(days=settings.REPORT_DAYS)).isoformat()
+
+def _record_history(*paths: str) -> None:
+    """
+    Keep today's state of the datasets in the daily history; a failure there never fails the sync.
+
+    Blocking (it reads, diffs and writes whole datasets): run it off the event loop.
+    """
+    for path in paths:
+        try:
+            record_history(path, get_storage(path).iter_all())
+        except Exception as e:
+            logger.warning(f"Could not record the history of {path}: {e}")
+
 async def sync_customers():
     """Syncs customers from IXC to TinyDB."""
     logger.info("Starting customer sync...")
-    client = IxcClient(settings.IXC_CONFIG)
     try:
-        customers = await client.list_customers(refresh=True)
-        storage = get_storage(settings.STORAGE_PATH_CLIENTES)
-        storage.save_all(customers)
-        logger.success(f"Synced {len(customers)} customers.")
+        async with IxcClient(settings.IXC_CONFIG) as client:
+            count = await _sync_dataset(client, "cliente", client.customers_query(), settings.STORAGE_PATH_CLIENTES)
+        logger.success(f"Synced {count} customers.")
     except Exception as e:
-        logger.error(f"Error syncing customers: {e}")
+        logger.error(f"Error syncing customers: {e}. Keeping previously stored data.")
+        raise
 
 async def sync_contracts_and_bills():
     """Syncs contracts and bills from IXC to TinyDB."""
     logger.info("Starting contracts and bills sync...")
-    client = IxcClient(settings.IXC_CONFIG)
     try:
-        # Fetch data in parallel
-        tasks = [
-            client.list_contracts(refresh=True),
-            client.list_bills(refresh=True)
-        ]
-        contracts, bills = await asyncio.gather(*tasks)
-        
-        # Save contracts
-        contracts_storage = get_storage(settings.STORAGE_PATH_CONTRATOS)
-        contracts_storage.save_all(contracts)
+        window_start = _bills_window_start()
+        # Sync both datasets in parallel over a single pooled connection set
+        async with IxcClient(settings.IXC_CONFIG) as client:
+            tasks = [
+                _sync_dataset(client, "cliente_contrato", client.contracts_query(), settings.STORAGE_PATH_CONTRATOS),
+                _sync_dataset(
+                    client, "fn_areceber", client.bills_query(), settings.STORAGE_PATH_BOLETOS,
+                    # Bills whose due date entered the window since the last run, edited or not
+                    window_query=lambda prev_end: client.bills_query(start_date=(prev_end - timedelta(days=1)).isoformat()),
+                    # ...and bills that left it
+                    due_after=window_start
+                )
+            ]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0]
+        contracts, bills = results
         
-        # Save bills
-        bills_storage = get_storage(settings.STORAGE_PATH_BOLETOS)
-        bills_storage.save_all(bills)
-        
-        logger.success(f"Synced {len(contracts)} contracts and {len(bills)} bills.")
+        logger.success(f"Synced {contracts} contracts and {bills} bills.")
+        await asyncio.to_thread(_record_history, settings.STORAGE_PATH_CONTRATOS, settings.STORAGE_PATH_BOLETOS)
     except Exception as e:
-        logger.error(f"Error syncing contracts and bills: {e}")
+        logger.error(f"Error syncing contracts and bills: {e}. Keeping previously stored data.")
+        raise
+
+# Every trigger (scheduler, startup, /sync, cold reports) goes through here: one run per dataset at a time
+orchestrator = SyncOrchestrator({
+    "customers": sync_customers,
+    "contracts_and_bills": sync_contracts_and_bills
+})
@@ -0,0 +1,108 @@
+import json
+import os
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+
+class PageSizeTuner:
+    """
+    Chooses the `rp` (rows per page) of each endpoint from observed throughput.
+
+    Every completed listing that spans more than one page reports how many
+    rows per second its page size achieved; a listing that fits in one page
+    (a delta sync) says nothing about the page size and is ignored. The tuner hill-climbs: it keeps moving `rp` by `step` in the
+    same direction while throughput improves, and goes back to the best size
+    seen (probing the other side next) when it does not. Pages that come
+    close to the HTTP timeout or exceed `max_page_bytes` shrink `rp` right
+    away. The state is persisted, so each run starts from the best size
+    found so far.
+    """
+
+    def __init__(self, path: Optional[str], initial: int = 100, min_size: int = 50, max_size: int = 2000,
+                 step: float = 1.5, timeout: float = 120.0, max_page_bytes: int = 8 * 1024 * 1024):
+        self.path = path
+        self.initial = initial
+        self.min_size = min_size
+        self.max_size = max_size
+        self.step = step
+        self.timeout = timeout
+        self.max_page_bytes = max_page_bytes
+        self.state: Dict[str, Dict[str, Any]] = self._load()
+        self._runs: Dict[str, Dict[str, float]] = {}
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _clamp(self, size: float) -> int:
+        return int(min(self.max_size, max(self.min_size, size)))
+
+    def page_size(self, endpoint: str) -> int:
+        entry = self.state.get(endpoint)
+        return self._clamp(entry["rp"]) if entry else self._clamp(self.initial)
+
+    def observe(self, endpoint: str, rp: int, rows: int, seconds: float, nbytes: int) -> None:
+        """Record one page fetched with `rp`."""
+        run = self._runs.setdefault(endpoint, {"rp": rp, "rows": 0, "seconds": 0.0, "max_seconds": 0.0, "max_bytes": 0})
+        run["rows"] += rows
+        run["seconds"] += seconds
+        run["max_seconds"] = max(run["max_seconds"], seconds)
+        run["max_bytes"] = max(run["max_bytes"], nbytes)
+
+    def observe_timeout(self, endpoint: str, rp: int) -> None:
+        """A page of this size timed out: halve it for the next listing."""
+        entry = self.state.setdefault(endpoint, {"rp": rp, "direction": -1})
+        entry.update({"rp": self._clamp(rp / 2), "direction": -1, "best_rp": None, "best_rate": 0.0})
+        self.save()
+        logger.warning(f"Page size for {endpoint} reduced to {entry['rp']} after a timeout")
+
+    def finish(self, endpoint: str) -> None:
+        """Close the current listing of `endpoint` and pick the `rp` for the next one."""
+        run = self._runs.pop(endpoint, None)
+        if not run or run["seconds"] <= 0 or run["rows"] <= 0:
+            return
+        rp = int(run["rp"])
+        rate = run["rows"] / run["seconds"]
+        too_slow = run["max_seconds"] > self.timeout * 0.5 or run["max_bytes"] > self.max_page_bytes
+        if not too_slow and run["rows"] <= rp:
+            return
+        entry = self.state.setdefault(endpoint, {"rp": rp, "direction": 1, "best_rp": None, "best_rate": 0.0})
+
+        if too_slow:
+            # Too close to the timeout or too heavy per page, whatever the throughput
+            entry.update({"rp": self._clamp(rp / self.step), "direction": -1, "best_rp": None, "best_rate": 0.0})
+        elif rate > (entry.get("best_rate") or 0.0) * 1.05:
+            entry.update({"best_rp": rp, "best_rate": rate})
+            entry["rp"] = self._clamp(rp * self.step if entry.get("direction", 1) > 0 else rp / self.step)
+        else:
+            best = entry.get("best_rp") or rp
+            if rp == best:
+                # Re-measured the best size: refresh its rate and probe the next neighbour
+                entry["best_rate"] = rate
+                entry["rp"] = self._clamp(best * self.step if entry.get("direction", 1) > 0 else best / self.step)
+                if entry["rp"] == best:
+                    entry["direction"] = -entry.get("direction", 1)
+            else:
+                # The probe did not pay off: return to the best size and probe the other side next time
+                entry["direction"] = -entry.get("direction", 1)
+                entry["rp"] = best
+
+        entry["rows_per_second"] = round(rate, 1)
+        entry["bytes_per_row"] = round(run["max_bytes"] / max(1, rp), 1)
+        self.save()
+        logger.debug(f"Page size for {endpoint}: {rp} -> {entry['rp']} ({rate:.0f} rows/s)")
@@ -0,0 +1,47 @@
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+
+class WatermarkStore:
+    """
+    Per-endpoint sync progress, persisted as a small JSON file.
+
+    For each endpoint it remembers the highest `ultima_atualizacao` and id
+    seen, when the last full sync happened and, for windowed listings such
+    as bills, where the due-date window ended.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def get(self, endpoint: str) -> Optional[Dict[str, Any]]:
+        return self._read().get(endpoint)
+
+    def save(self, endpoint: str, mark: Dict[str, Any], full: bool = False) -> None:
+        data = self._read()
+        entry = dict(data.get(endpoint, {}))
+        entry.update({k: v for k, v in mark.items() if v is not None})
+        if full:
+            entry["last_full_sync"] = time.time()
+        data[endpoint] = entry
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def needs_full_sync(self, endpoint: str, reconcile_seconds: float) -> bool:
+        entry = self.get(endpoint)
+        if not entry or not entry.get("ultima_atualizacao") or not entry.get("max_id"):
+            return True
+        return time.time() - entry.get("last_full_sync", 0) >= reconcile_seconds
+
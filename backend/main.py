@@ -1,46 +1,55 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Any, Optional
 from config.settings import settings
 from loguru import logger
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from datetime import datetime, timedelta
 import pandas as pd
 import asyncio
-from ixc.sync import sync_customers, sync_contracts_and_bills
-from utils.storage import get_storage
+from ixc.sync import orchestrator
+from utils.storage import current_generation
+from utils.cache import dataset_cache
+from utils.conditional import cache_headers, not_modified, report_validators
+from ixc.ratelimit import rate_limiter_stats
+from processing.delinquency import bill_details, delinquency_reports
+from processing.materialized import materialized_metrics
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Inicializa o agendador
     scheduler = AsyncIOScheduler()
     scheduler.add_job(
-        sync_contracts_and_bills, 
+        orchestrator.run, 
         'interval', 
+        args=["contracts_and_bills", "scheduler"],
         minutes=settings.SYNC_INTERVAL_MINUTES
     )
     scheduler.add_job(
-        sync_customers,
+        orchestrator.run,
         'cron',
+        args=["customers", "scheduler"],
         hour=settings.SYNC_CUSTOMERS_HOUR,
         minute=0
     )
+    # The report views depend on the date: rebuild them when the day rolls over
+    scheduler.add_job(refresh_materialized, 'cron', args=["midnight"], hour=0, minute=0)
     scheduler.start()
     logger.info(f"🚀 Agendador APScheduler iniciado. Sincronização IXC ativa (Clie: {settings.SYNC_CUSTOMERS_HOUR}h, Cont/Bol: {settings.SYNC_INTERVAL_MINUTES}m).")
     
     # 🔄 Verificação proativa na inicialização
-    bills_storage = get_storage(settings.STORAGE_PATH_BOLETOS)
-    contracts_storage = get_storage(settings.STORAGE_PATH_CONTRATOS)
-    customers_storage = get_storage(settings.STORAGE_PATH_CLIENTES)
+    # Also warms the dataset cache
+    datasets = [dataset_cache.get(path) for path in (settings.STORAGE_PATH_BOLETOS, settings.STORAGE_PATH_CONTRATOS, settings.STORAGE_PATH_CLIENTES)]
     
-    if not bills_storage.get_all() or not contracts_storage.get_all() or not customers_storage.get_all():
+    if any(df.empty for df in datasets):
         logger.warning("Dados não encontrados. Iniciando sincronização forçada de inicialização.")
-        asyncio.create_task(sync_customers())
-        asyncio.create_task(sync_contracts_and_bills())
+        orchestrator.trigger("customers", "startup")
+        orchestrator.trigger("contracts_and_bills", "startup")
     else:
         logger.info("Dados locais encontrados. Aguardando próximo agendamento ou comando manual.")
+        if materialized_metrics.lookup("total") is None:
+            asyncio.create_task(refresh_materialized("startup"))
     
     yield
     
@@ -78,7 +87,18 @@ def serialize_data(data: Any) -> Any:
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "ixc_rate_limit": rate_limiter_stats(),
+        "storage_generations": {
+            "clientes": current_generation(settings.STORAGE_PATH_CLIENTES),
+            "contratos": current_generation(settings.STORAGE_PATH_CONTRATOS),
+            "boletos": current_generation(settings.STORAGE_PATH_BOLETOS)
+        },
+        "dataset_cache": dataset_cache.stats(),
+        "materialized_metrics": materialized_metrics.stats(),
+        "report_cache": delinquency_reports.stats()
+    }
 
 @app.post("/sync")
 async def force_sync(services: str = "all"):
@@ -95,22 +115,28 @@ async def force_sync(services: str = "all"):
         sync_contracts_flag = sync_all or "contracts" in requested
         sync_bills_flag = sync_all or "bills" in requested or "boletos" in requested
         
+        if not any([sync_customers_flag, sync_contracts_flag, sync_bills_flag]):
+            raise HTTPException(status_code=400, detail=f"Invalid services requested: {services}. Available: all, customers, contracts, bills")
+
+        # A dataset that is already syncing is joined rather than started again
+        joined = {}
         if sync_customers_flag:
-            asyncio.create_task(sync_customers())
+            joined["customers"] = orchestrator.is_busy("customers")
+            orchestrator.trigger("customers", "api")
         if sync_contracts_flag or sync_bills_flag:
             # Note: Both are handled by the same background task
-            asyncio.create_task(sync_contracts_and_bills())
-            
-        if not any([sync_customers_flag, sync_contracts_flag, sync_bills_flag]):
-            raise HTTPException(status_code=400, detail=f"Invalid services requested: {services}. Available: all, customers, contracts, bills")
-            
+            joined["contracts_and_bills"] = orchestrator.is_busy("contracts_and_bills")
+            orchestrator.trigger("contracts_and_bills", "api")
+
         return {
             "message": "Sync started in background",
             "services_triggered": {
                 "customers": sync_customers_flag,
                 "contracts": sync_contracts_flag,
                 "bills": sync_bills_flag
-            }
+            },
+            "joined_running_sync": joined,
+            "sync_status": orchestrator.status()
         }
     except HTTPException:
         raise
@@ -118,223 +144,107 @@ async def force_sync(services: str = "all"):
         logger.error(f"Error triggering force sync: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/sync")
+def sync_status():
+    """
+    Reports the queued/running state and the outcome of the last run of each sync job.
+    """
+    return orchestrator.status()
+
+
+async def refresh_materialized(reason: str = "scheduler") -> None:
+    """Recompute the materialized report views off the event loop."""
+    if not settings.MATERIALIZE_METRICS:
+        return
+    logger.info(f"Refreshing materialized delinquency metrics ({reason})")
+    await asyncio.to_thread(materialized_metrics.refresh)
+
+# Every successful sync publishes new generations the views must be rebuilt from
+orchestrator.add_listener(refresh_materialized)
+
+def parse_day(value: Optional[str], name: str) -> Optional[pd.Timestamp]:
+    """A dd-mm-yyyy query parameter as a day, or a 400."""
+    if value is None:
+        return None
+    day = pd.to_datetime(value, format="%d-%m-%Y", errors='coerce')
+    if pd.isna(day):
+        raise HTTPException(status_code=400, detail=f"Invalid {name} format. Use dd-mm-yyyy")
+    return day
 
 @app.get("/financial/inadiplencia")
-async def get_delinquency_metrics(view: str = "by_date"):
+async def get_delinquency_metrics(request: Request, response: Response, view: str = "by_date",
+                                  start: Optional[str] = None, end: Optional[str] = None, as_of: Optional[str] = None):
     """
     Returns specific delinquency metrics based on stored IXC data.
     - view='by_date': Returns an array with daily breakdown.
     - view='total': Returns a single object with aggregated totals.
+    Optional dd-mm-yyyy params:
+    - as_of: the day days late are counted up to (default: today).
+    - start/end: bound the bills' due dates. by_date defaults to the REPORT_DAYS
+      days up to as_of, total to every bill.
     """
-    logger.info(f"API Request: /financial/inadiplencia?view={view}")
+    logger.info(f"API Request: /financial/inadiplencia?view={view}&start={start}&end={end}&as_of={as_of}")
     try:
-        # 1. Load data from TinyDB
-        bills_storage = get_storage(settings.STORAGE_PATH_BOLETOS)
-        contracts_storage = get_storage(settings.STORAGE_PATH_CONTRATOS)
-        
-        bills_data = bills_storage.get_all()
-        contracts_data = contracts_storage.get_all()
-        
-        if not bills_data or not contracts_data:
-            logger.warning("Acesso ao endpoint /financial/inadiplencia sem dados. Iniciando sincronização em background.")
-            asyncio.create_task(sync_customers())
-            asyncio.create_task(sync_contracts_and_bills())
-            return [] if view == "by_date" else {}
-            
-        df_bills = pd.DataFrame(bills_data)
-        df_contracts = pd.DataFrame(contracts_data)
-        
-        # 2. Setup dates and calculate days late
-        today = pd.Timestamp.now().normalize()
-        df_bills['data_vencimento'] = pd.to_datetime(df_bills['data_vencimento'], errors='coerce')
-        df_bills['days_late'] = (today - df_bills['data_vencimento']).dt.days
-        
-        # Get unique clients with trust unlock
-        trust_unlock_clients = set()
-        if not df_contracts.empty and 'desbloqueio_confianca_ativo' in df_contracts.columns:
-            trust_unlock_clients = set(df_contracts[df_contracts['desbloqueio_confianca_ativo'] == 'S']['id_cliente'].astype(str).unique())
+        view = "total" if view == "total" else "by_date"
+        start_day, end_day, as_of_day = parse_day(start, "start"), parse_day(end, "end"), parse_day(as_of, "as_of")
+        if start_day is not None and end_day is not None and start_day > end_day:
+            raise HTTPException(status_code=400, detail="start must not be after end")
+        params = {"view": view}
+        params.update({name: day.strftime("%Y-%m-%d") for name, day in
+                       (("start", start_day), ("end", end_day), ("as_of", as_of_day)) if day is not None})
 
-        # Get mapping of client_id to internet_status
-        client_internet_status = {}
-        if not df_contracts.empty and 'id_cliente' in df_contracts.columns and 'status_internet' in df_contracts.columns:
-            # Ensure index is string for consistent mapping
-            client_internet_status = df_contracts.copy()
-            client_internet_status['id_cliente'] = client_internet_status['id_cliente'].astype(str)
-            client_internet_status = client_internet_status.set_index('id_cliente')['status_internet'].to_dict()
+        # Pollers revalidate: an unchanged report costs a 304, before anything is computed
+        validators = report_validators("inadiplencia", params)
+        if not_modified(request.headers, validators):
+            return Response(status_code=304, headers=cache_headers(validators))
 
-        df_bills['category'] = 'em_dia'
-        overdue_mask = (df_bills['status'] == 'A') & (df_bills['days_late'] >= 1)
-        trust_mask = df_bills['id_cliente'].astype(str).isin(trust_unlock_clients)
-        
-        df_bills.loc[overdue_mask & trust_mask, 'category'] = 'desbloqueio_confianca'
-        non_trust_overdue = overdue_mask & ~trust_mask
-        
-        df_bills.loc[non_trust_overdue & (df_bills['days_late'] >= 1) & (df_bills['days_late'] <= 6), 'category'] = 'vencimento_padrao'
-        df_bills.loc[non_trust_overdue & (df_bills['days_late'] >= 7) & (df_bills['days_late'] <= 10), 'category'] = 'transicao'
-        df_bills.loc[non_trust_overdue & (df_bills['days_late'] >= 11), 'category'] = 'cronico'
+        # The default report is served as precomputed JSON while it matches today and the stored generations
+        default_params = len(params) == 1
+        content = materialized_metrics.lookup(view) if settings.MATERIALIZE_METRICS and default_params else None
+        if content is not None:
+            return Response(content=content, media_type="application/json", headers=cache_headers(validators))
 
-        if view == "total":
-            return {
-                "date": today.strftime("%d-%m-%Y"),
-                "total_boletos": len(df_bills),
-                "report_days": settings.REPORT_DAYS,
-                "status": {
-                    "em_dia": int((df_bills['category'] == 'em_dia').sum()),
-                    "vencimento_padrao": int((df_bills['category'] == 'vencimento_padrao').sum()),
-                    "transicao": int((df_bills['category'] == 'transicao').sum()),
-                    "cronico": int((df_bills['category'] == 'cronico').sum()),
-                    "desbloqueio_confianca": int((df_bills['category'] == 'desbloqueio_confianca').sum())
-                }
-            }
+        # Otherwise from the due-date sorted bills, cached per params until the next sync
+        today = pd.Timestamp.now().normalize()
+        result = delinquency_reports.view(view, as_of_day if as_of_day is not None else today, start_day, end_day)
+        if result is None:
+            logger.warning("Acesso ao endpoint /financial/inadiplencia sem dados. Iniciando sincronização em background.")
+            orchestrator.trigger("customers", "inadiplencia")
+            orchestrator.trigger("contracts_and_bills", "inadiplencia")
+            return [] if view == "by_date" else {}
 
-        # Default: by_date
-        results = []
-        for i in range(settings.REPORT_DAYS + 1):
-            target_date = today - timedelta(days=i)
-            target_date_str = target_date.strftime("%d-%m-%Y")
-            
-            date_mask = df_bills['data_vencimento'].dt.normalize() == target_date
-            df_date = df_bills[date_mask]
-            
-            if df_date.empty:
-                continue
-            
-            results.append({
-                "date": target_date_str,
-                "total_boletos": len(df_date),
-                "status": {
-                    "em_dia": int((df_date['category'] == 'em_dia').sum()),
-                    "vencimento_padrao": int((df_date['category'] == 'vencimento_padrao').sum()),
-                    "transicao": int((df_date['category'] == 'transicao').sum()),
-                    "cronico": int((df_date['category'] == 'cronico').sum()),
-                    "desbloqueio_confianca": int((df_date['category'] == 'desbloqueio_confianca').sum())
-                }
-            })
-            
-        return results
+        response.headers.update(cache_headers(validators))
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error calculating delinquency metrics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/financial/detalhes")
-async def get_bill_details(date: str):
+async def get_bill_details(request: Request, response: Response, date: str):
     """
     Returns detailed open bill records for a specific date (dd-mm-yyyy).
     Enriches with customer name and internet status.
     """
     logger.info(f"API Request: /financial/detalhes?date={date}")
     try:
-        # 1. Load data
-        bills_storage = get_storage(settings.STORAGE_PATH_BOLETOS)
-        contracts_storage = get_storage(settings.STORAGE_PATH_CONTRATOS)
-        customers_storage = get_storage(settings.STORAGE_PATH_CLIENTES)
-        
-        bills_data = bills_storage.get_all()
-        contracts_data = contracts_storage.get_all()
-        customers_data = customers_storage.get_all()
-        
-        if not bills_data:
-            return []
-            
-        df_bills = pd.DataFrame(bills_data)
-        
-        # 2. Filter by date and status 'A' (Open)
-        df_bills['data_vencimento_dt'] = pd.to_datetime(df_bills['data_vencimento'], errors='coerce')
         target_dt = pd.to_datetime(date, format="%d-%m-%Y", errors='coerce')
         
         if pd.isna(target_dt):
             raise HTTPException(status_code=400, detail="Invalid date format. Use dd-mm-yyyy")
-            
-        mask = (df_bills['data_vencimento_dt'].dt.normalize() == target_dt.normalize()) & (df_bills['status'] == 'A')
-        df_filtered = df_bills[mask].copy()
-        
-        if df_filtered.empty:
-            return []
-            
-        # 3. Enrich with Customer Names
-        if customers_data:
-            df_cust = pd.DataFrame(customers_data)
-            if 'id' in df_cust.columns and 'razao' in df_cust.columns:
-                cust_map = df_cust.set_index('id')['razao'].apply(str).to_dict() # ensure values are strings
-                # Actually we need keys to be strings
-                cust_map = {str(k): v for k, v in df_cust.set_index('id')['razao'].to_dict().items()}
-                df_filtered['cliente_nome'] = df_filtered['id_cliente'].astype(str).map(lambda x: cust_map.get(x, "Desconhecido"))
-        
-        # 4. Enrich with Internet Status and Trust Unlock
-        df_contracts = pd.DataFrame()
-        if contracts_data:
-            df_cont = pd.DataFrame(contracts_data)
-            df_contracts = df_cont.copy()
-            if 'id_cliente' in df_cont.columns:
-                cont_status_map = df_cont.set_index('id_cliente')['status_internet'].to_dict()
-                trust_map = df_cont.set_index('id_cliente')['desbloqueio_confianca_ativo'].to_dict()
-                
-                df_filtered['status_internet'] = df_filtered['id_cliente'].astype(str).map(lambda x: cont_status_map.get(x, "N/A"))
-                df_filtered['desbloqueio_confianca_ativo'] = df_filtered['id_cliente'].astype(str).map(lambda x: trust_map.get(x, "N"))
-
-        # 5. Enrich with Phone and Neighborhood
-        if customers_data:
-            df_cust = pd.DataFrame(customers_data)
-            if 'id' in df_cust.columns:
-                phone_map = {str(k): v for k, v in df_cust.set_index('id')['telefone_celular'].to_dict().items()}
-                # fallback to fone if celular is empty
-                fone_map = {str(k): v for k, v in df_cust.set_index('id')['fone'].to_dict().items()}
-                bairro_map = {str(k): v for k, v in df_cust.set_index('id')['bairro'].to_dict().items()}
-                
-                def get_phone(x):
-                    cel = phone_map.get(str(x), "")
-                    return cel if cel else fone_map.get(str(x), "")
-                
-                df_filtered['telefone'] = df_filtered['id_cliente'].astype(str).map(get_phone)
-                df_filtered['bairro'] = df_filtered['id_cliente'].astype(str).map(lambda x: bairro_map.get(str(x), ""))
-
-        # Calculate days_late exactly as in the inadiplencia endpoint
-        today = pd.Timestamp.now().normalize()
-        df_filtered['days_late'] = (today - df_filtered['data_vencimento_dt'].dt.normalize()).dt.days
-
-        # Define category exactly as in the inadiplencia endpoint for the UI status mapping
-        df_filtered['category'] = 'em_dia'
-        
-        # Get mapping variables for trust
-        trust_unlock_clients = set()
-        if not df_contracts.empty and 'desbloqueio_confianca_ativo' in df_contracts.columns:
-            trust_unlock_clients = set(df_contracts[df_contracts['desbloqueio_confianca_ativo'] == 'S']['id_cliente'].astype(str).unique())
-
-        client_internet_status = {}
-        if not df_contracts.empty and 'id_cliente' in df_contracts.columns and 'status_internet' in df_contracts.columns:
-            client_internet_status = df_contracts.drop_duplicates('id_cliente').set_index('id_cliente')['status_internet'].to_dict()
 
-        # Vectorized status categorization
-        if not df_filtered.empty:
-            overdue_mask = df_filtered['days_late'] > 0
-            
-            # Helper to check trust unlock
-            df_filtered['has_trust'] = df_filtered['id_cliente'].astype(str).isin(trust_unlock_clients)
-            df_filtered['conn_status'] = df_filtered['id_cliente'].astype(str).map(client_internet_status)
-            
-            trust_mask = (df_filtered['has_trust'] == True) & (df_filtered['conn_status'] == 'A') & overdue_mask
-            df_filtered.loc[trust_mask, 'category'] = 'desbloqueio_confianca'
-            
-            # Non-trust overdue logic
-            non_trust_overdue = overdue_mask & ~trust_mask
-            
-            df_filtered.loc[non_trust_overdue & (df_filtered['days_late'] >= 1) & (df_filtered['days_late'] <= 6), 'category'] = 'vencimento_padrao'
-            df_filtered.loc[non_trust_overdue & (df_filtered['days_late'] >= 7) & (df_filtered['days_late'] <= 10), 'category'] = 'transicao'
-            df_filtered.loc[non_trust_overdue & (df_filtered['days_late'] >= 11), 'category'] = 'cronico'
+        day = target_dt.strftime("%Y-%m-%d")
+        validators = report_validators("detalhes", {"date": day})
+        if not_modified(request.headers, validators):
+            return Response(status_code=304, headers=cache_headers(validators))
 
-        # Structure final output to exact specifications
-        final_results = []
-        for index, row in df_filtered.iterrows():
-            final_results.append({
-                "status": row.get('category', 'em_dia'), # E.g., 'em_dia', 'vencimento_padrao', 'transicao', etc.
-                "Nome do Cliente": row.get('cliente_nome', 'Desconhecido'),
-                "Dias de Atraso": row.get('days_late', 0),
-                "Telefone": row.get('telefone', ''),
-                "Bairro": row.get('bairro', ''),
-                "Status da Conexão": row.get('status_internet', 'N/A')
-            })
+        content = materialized_metrics.lookup("details", day) if settings.MATERIALIZE_METRICS else None
+        if content is not None:
+            return Response(content=content, media_type="application/json", headers=cache_headers(validators))
 
-        return final_results
+        response.headers.update(cache_headers(validators))
+        return bill_details(target_dt, pd.Timestamp.now().normalize())
         
     except HTTPException:
         raise
@@ -0,0 +1,80 @@
+from typing import Any, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+
+# Delinquency categories, in the order the reports list them; a category's code is its position
+CATEGORIES = ["em_dia", "vencimento_padrao", "transicao", "cronico", "desbloqueio_confianca"]
+EM_DIA, VENCIMENTO_PADRAO, TRANSICAO, CRONICO, DESBLOQUEIO_CONFIANCA = range(len(CATEGORIES))
+
+
+class Thresholds(NamedTuple):
+    """
+    Bucket boundaries of the classification, in days late.
+
+    Open bills 1..`padrao_max` days late are vencimento_padrao, up to
+    `transicao_max` transicao and cronico after that. Overdue bills of
+    clients with trust unlock are desbloqueio_confianca instead, provided
+    (with `trust_requires_active`) their first contract's connection is
+    active ('A').
+    """
+    padrao_max: int = 6
+    transicao_max: int = 10
+    trust_requires_active: bool = True
+
+
+def default_thresholds() -> Thresholds:
+    return Thresholds(settings.CLASSIFIER_PADRAO_MAX_DAYS, settings.CLASSIFIER_TRANSICAO_MAX_DAYS,
+                      settings.CLASSIFIER_TRUST_REQUIRES_ACTIVE)
+
+
+def classify_codes(days_late: Any, is_open: Any, trusted: Any, thresholds: Optional[Thresholds] = None) -> np.ndarray:
+    """
+    Category codes (positions in CATEGORIES) of bills, in one vectorized pass.
+
+    `days_late` may hold NaN for bills without a due date; those, bills
+    that are not open and bills not yet late are em_dia.
+    """
+    thresholds = thresholds or default_thresholds()
+    days = np.asarray(days_late, dtype="float64")
+    overdue = np.asarray(is_open, dtype=bool) & (days >= 1)
+    aging = VENCIMENTO_PADRAO + np.digitize(days, [thresholds.padrao_max + 1, thresholds.transicao_max + 1])
+    return np.select([~overdue, np.asarray(trusted, dtype=bool)], [EM_DIA, DESBLOQUEIO_CONFIANCA], default=aging).astype(np.int8)
+
+
+def is_trusted(has_trust: bool, first_status: Optional[str], thresholds: Optional[Thresholds] = None) -> bool:
+    """Trust rule for one client, from the contract lookup index (see `utils.indexes.ContractIndex`)."""
+    thresholds = thresholds or default_thresholds()
+    return bool(has_trust) and (first_status == 'A' or not thresholds.trust_requires_active)
+
+
+def trusted_clients(df_contracts: pd.DataFrame, thresholds: Optional[Thresholds] = None) -> np.ndarray:
+    """Ids of the clients whose overdue bills count as desbloqueio_confianca."""
+    thresholds = thresholds or default_thresholds()
+    if df_contracts.empty or 'desbloqueio_confianca_ativo' not in df_contracts.columns:
+        return np.array([])
+    clients = df_contracts.loc[df_contracts['desbloqueio_confianca_ativo'] == 'S', 'id_cliente'].unique()
+    if not thresholds.trust_requires_active:
+        return np.asarray(clients)
+    if 'status_internet' not in df_contracts.columns:
+        return np.array([])
+    first = df_contracts.drop_duplicates('id_cliente', keep='first')
+    active = first.loc[first['status_internet'] == 'A', 'id_cliente']
+    return np.asarray(active[active.isin(clients)])
+
+
+def classify_frame(df_bills: pd.DataFrame, df_contracts: pd.DataFrame, today: pd.Timestamp,
+                   thresholds: Optional[Thresholds] = None) -> pd.DataFrame:
+    """Add `days_late` and `category` (a categorical over CATEGORIES) to the bills."""
+    thresholds = thresholds or default_thresholds()
+    df_bills['days_late'] = (today - df_bills['data_vencimento']).dt.days
+    codes = classify_codes(
+        df_bills['days_late'].to_numpy(dtype="float64", na_value=np.nan),
+        (df_bills['status'] == 'A').to_numpy(dtype=bool, na_value=False),
+        df_bills['id_cliente'].isin(trusted_clients(df_contracts, thresholds)).to_numpy(dtype=bool, na_value=False),
+        thresholds
+    )
+    df_bills['category'] = pd.Categorical.from_codes(codes, categories=CATEGORIES)
+    return df_bills
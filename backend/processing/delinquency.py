@@ -0,0 +1,217 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from processing.classifier import CATEGORIES, EM_DIA, classify_codes, default_thresholds, is_trusted
+from processing.timeline import BillTimeline, day_number
+from utils.cache import dataset_cache
+from utils.indexes import bill_entry
+from utils.storage import current_generation, get_storage
+
+
+def load_frames() -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Bills and contracts for the metrics (cached until the next sync publishes a new generation)."""
+    # Only the columns the metrics use (read column-wise when a columnar snapshot exists)
+    df_bills = dataset_cache.get(settings.STORAGE_PATH_BOLETOS, columns=["id", "id_cliente", "data_vencimento", "status"])
+    df_contracts = dataset_cache.get(settings.STORAGE_PATH_CONTRATOS, columns=["id_cliente", "desbloqueio_confianca_ativo", "status_internet"])
+    return df_bills, df_contracts
+
+
+def total_view(timeline: BillTimeline, as_of: pd.Timestamp, start: Optional[pd.Timestamp] = None,
+               end: Optional[pd.Timestamp] = None) -> Dict[str, Any]:
+    """Category totals of the bills due from `start` to `end` (every bill when neither is given)."""
+    window = timeline.window(None if start is None else day_number(start), None if end is None else day_number(end))
+    counts = np.bincount(timeline.codes(window, day_number(as_of)), minlength=len(CATEGORIES))
+    total = window.stop - window.start
+    if start is None and end is None:
+        counts[EM_DIA] += timeline.undated
+        total += timeline.undated
+    return {
+        "date": as_of.strftime("%d-%m-%Y"),
+        "total_boletos": int(total),
+        "report_days": settings.REPORT_DAYS,
+        "status": {category: int(n) for category, n in zip(CATEGORIES, counts)}
+    }
+
+
+def by_date_view(timeline: BillTimeline, as_of: pd.Timestamp, start: Optional[pd.Timestamp] = None,
+                 end: Optional[pd.Timestamp] = None) -> List[Dict[str, Any]]:
+    """
+    Daily breakdown of the bills due from `start` to `end`, newest day first,
+    as one crosstab of due day x category. `end` defaults to `as_of` and
+    `start` to REPORT_DAYS days before `end`.
+    """
+    end = as_of if end is None else end
+    start = end - timedelta(days=settings.REPORT_DAYS) if start is None else start
+    if start > end:
+        return []
+    first, last = day_number(start), day_number(end)
+    window = timeline.window(first, last)
+    cells = (last - timeline.due[window]) * len(CATEGORIES) + timeline.codes(window, day_number(as_of))
+    counts = np.bincount(cells, minlength=(last - first + 1) * len(CATEGORIES)).reshape(-1, len(CATEGORIES))
+
+    results = []
+    for i in np.flatnonzero(counts.sum(axis=1)):
+        target_date = end - timedelta(days=int(i))
+        results.append({
+            "date": target_date.strftime("%d-%m-%Y"),
+            "total_boletos": int(counts[i].sum()),
+            "status": {category: int(n) for category, n in zip(CATEGORIES, counts[i])}
+        })
+    return results
+
+
+VIEWS = {"total": total_view, "by_date": by_date_view}
+
+
+class DelinquencyReports:
+    """
+    The inadiplencia views for arbitrary `as_of`, `start` and `end`.
+
+    Answered from the `BillTimeline` of the stored generations, which is
+    built once per generation, and kept in an LRU of `size` views keyed by
+    the query params and the generations (and thresholds) they were
+    computed from. A sync that publishes new data makes every entry stale
+    and they are dropped with the old timeline.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._timeline: Optional[Tuple[Tuple[Any, ...], BillTimeline]] = None
+        self._views: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key() -> Tuple[Any, ...]:
+        paths = (settings.STORAGE_PATH_BOLETOS, settings.STORAGE_PATH_CONTRATOS)
+        return paths, tuple(current_generation(path) for path in paths), default_thresholds(), settings.REPORT_DAYS
+
+    def timeline(self, key: Optional[Tuple[Any, ...]] = None) -> Optional[BillTimeline]:
+        """The timeline of the stored bills; None when there is no data to report on yet."""
+        key = key or self._key()
+        entry = self._timeline
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        df_bills, df_contracts = load_frames()
+        if df_bills.empty or df_contracts.empty:
+            return None
+        timeline = BillTimeline.build(df_bills, df_contracts, key[2])
+        with self._lock:
+            self._timeline = (key, timeline)
+            self._views.clear()
+        return timeline
+
+    def view(self, view: str, as_of: pd.Timestamp, start: Optional[pd.Timestamp] = None,
+             end: Optional[pd.Timestamp] = None) -> Optional[Any]:
+        """`view` ('total' or 'by_date') for the params; None when there is no data yet."""
+        key = self._key()
+        cache_key = (key, view, as_of, start, end)
+        with self._lock:
+            if cache_key in self._views:
+                self._views.move_to_end(cache_key)
+                self.hits += 1
+                return self._views[cache_key]
+        self.misses += 1
+        timeline = self.timeline(key)
+        if timeline is None:
+            return None
+        result = VIEWS[view](timeline, as_of, start, end)
+        with self._lock:
+            self._views[cache_key] = result
+            while len(self._views) > self.size:
+                self._views.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        entry = self._timeline
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "views": len(self._views),
+            "timeline_bills": len(entry[1].due) + entry[1].undated if entry else None
+        }
+
+
+delinquency_reports = DelinquencyReports(settings.REPORT_CACHE_SIZE)
+
+
+def _lookups() -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    return (dataset_cache.index(settings.STORAGE_PATH_BOLETOS)["by_due"],
+            dataset_cache.index(settings.STORAGE_PATH_CLIENTES)["by_id"],
+            dataset_cache.index(settings.STORAGE_PATH_CONTRATOS)["by_cliente"])
+
+
+def _detail_rows(bills_due: List[List[Any]], days_late: int, customers: Dict[str, Any],
+                 contracts: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Enrich with customer name, phone (celular, else fone), neighborhood and internet status,
+    # and categorize with the same classifier as the inadiplencia endpoint for the UI status mapping
+    clients = [id_cliente for _, id_cliente, status in bills_due if status == 'A']
+    if not clients:
+        return []
+    thresholds = default_thresholds()
+    entries = [contracts.get(id_cliente, ("N/A", None, False)) for id_cliente in clients]
+    trusted = [is_trusted(has_trust, first_status, thresholds) for _, first_status, has_trust in entries]
+    codes = classify_codes(np.full(len(clients), days_late), np.ones(len(clients), dtype=bool), trusted, thresholds)
+
+    rows = []
+    for id_cliente, (status_internet, _, _), code in zip(clients, entries, codes):
+        name, phone, bairro = customers.get(id_cliente, ("Desconhecido", "", ""))
+        rows.append({
+            "status": CATEGORIES[code],
+            "Nome do Cliente": name,
+            "Dias de Atraso": days_late,
+            "Telefone": phone,
+            "Bairro": bairro,
+            "Status da Conexão": status_internet
+        })
+    return rows
+
+
+def bill_details(day: pd.Timestamp, today: pd.Timestamp) -> List[Dict[str, Any]]:
+    """
+    Open bills due on `day`, enriched for /financial/detalhes.
+
+    The day's bills come from the bills-by-due-date index the sync persists
+    (on SQLite, from an indexed query for that day), and customers and
+    contracts are looked up per returned bill, so nothing is rebuilt per
+    request. days_late is the same for every bill of the day.
+    """
+    key = day.strftime("%Y-%m-%d")
+    if settings.STORAGE_BACKEND == "sqlite":
+        # An indexed query loads only the day's open bills
+        bills_due = [bill_entry(r) for r in get_storage(settings.STORAGE_PATH_BOLETOS).find(key, key, 'A')]
+    else:
+        bills_due = dataset_cache.index(settings.STORAGE_PATH_BOLETOS)["by_due"].get(key, [])
+    return _detail_rows(bills_due, (today - day.normalize()).days,
+                        dataset_cache.index(settings.STORAGE_PATH_CLIENTES)["by_id"],
+                        dataset_cache.index(settings.STORAGE_PATH_CONTRATOS)["by_cliente"])
+
+
+def details_partitions(today: pd.Timestamp) -> Dict[str, List[Dict[str, Any]]]:
+    """`bill_details` of every due day that has open bills, keyed by YYYY-MM-DD."""
+    by_due, customers, contracts = _lookups()
+    partitions = {}
+    for day, bills_due in by_due.items():
+        rows = _detail_rows(bills_due, (today - pd.Timestamp(day)).days, customers, contracts)
+        if rows:
+            partitions[day] = rows
+    return partitions
+
+
+def compute_all(today: pd.Timestamp) -> Optional[Dict[str, Any]]:
+    """Every view of the delinquency reports for `today`; None when there is no data yet."""
+    timeline = delinquency_reports.timeline()
+    if timeline is None:
+        return None
+    return {
+        "total": total_view(timeline, today),
+        "by_date": by_date_view(timeline, today),
+        "details": details_partitions(today)
+    }
@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+import pandas as pd
+from loguru import logger
+
+from config.settings import settings
+from processing.classifier import default_thresholds
+from processing.delinquency import compute_all
+from utils import fastjson
+from utils.storage import current_generation
+
+EMPTY_LIST = b"[]"
+
+
+def render(content: Any) -> bytes:
+    """JSON exactly as FastAPI's default JSONResponse renders it, so served bytes do not change."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class Materialized(NamedTuple):
+    key: Dict[str, Any]
+    computed_at: float
+    views: Dict[str, bytes]
+    details: Dict[str, bytes]
+
+
+class MaterializedMetrics:
+    """
+    The delinquency report views, computed ahead of the requests.
+
+    `refresh()` computes the total and by_date views and the details of
+    every due day (after each sync and at midnight), keeps them rendered as
+    JSON in memory and writes them to `path` so a restart starts warm.
+    They are valid for one key: the day, REPORT_DAYS, the classifier
+    thresholds and the published generation of each dataset. `lookup()`
+    returns None for any other key, and the endpoints then compute the view
+    on demand.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entry: Optional[Materialized] = None
+        self._disk_checked: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def current_key(today: Optional[pd.Timestamp] = None) -> Dict[str, Any]:
+        today = today if today is not None else pd.Timestamp.now().normalize()
+        return {
+            "day": today.strftime("%Y-%m-%d"),
+            "report_days": settings.REPORT_DAYS,
+            "thresholds": list(default_thresholds()),
+            "generations": {
+                "clientes": current_generation(settings.STORAGE_PATH_CLIENTES),
+                "contratos": current_generation(settings.STORAGE_PATH_CONTRATOS),
+                "boletos": current_generation(settings.STORAGE_PATH_BOLETOS)
+            }
+        }
+
+    @staticmethod
+    def _render(document: Dict[str, Any]) -> Materialized:
+        return Materialized(
+            key=document["key"],
+            computed_at=document["computed_at"],
+            views={"total": render(document["total"]), "by_date": render(document["by_date"])},
+            details={day: render(rows) for day, rows in document["details"].items()}
+        )
+
+    def _load(self, key: Dict[str, Any]) -> Optional[Materialized]:
+        # The file is read once per key: a restart picks it up, a stale one is not re-read per request
+        if self._disk_checked == key:
+            return None
+        self._disk_checked = key
+        try:
+            with open(self.path, "rb") as f:
+                document = fastjson.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if document.get("key") != key:
+            return None
+        self._entry = self._render(document)
+        logger.info(f"Loaded materialized delinquency metrics for {key['day']} from {self.path}")
+        return self._entry
+
+    def lookup(self, view: str, day: Optional[str] = None) -> Optional[bytes]:
+        """
+        The rendered `view` ('total', 'by_date' or 'details' of `day`, YYYY-MM-DD)
+        if it is materialized for the current key, else None.
+        """
+        key = self.current_key()
+        entry = self._entry
+        if entry is None or entry.key != key:
+            entry = self._load(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if view == "details":
+            return entry.details.get(day, EMPTY_LIST)
+        return entry.views[view]
+
+    def refresh(self, today: Optional[pd.Timestamp] = None) -> bool:
+        """Compute and store every view for `today`; False when there is no data to report on yet."""
+        today = today if today is not None else pd.Timestamp.now().normalize()
+        with self._lock:
+            started = time.perf_counter()
+            # Keyed by the generations read before computing: a publish landing meanwhile makes it stale, never wrong
+            key = self.current_key(today)
+            views = compute_all(today)
+            if views is None:
+                return False
+            document = {"key": key, "computed_at": time.time(), **views}
+            self._entry = self._render(document)
+            self._write(document)
+        logger.info(f"Materialized delinquency metrics for {key['day']} ({len(views['details'])} detail days) "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return True
+
+    def _write(self, document: Dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(document, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        entry = self._entry
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "key": entry.key if entry else None,
+            "computed_at": entry.computed_at if entry else None,
+            "fresh": entry is not None and entry.key == self.current_key()
+        }
+
+
+materialized_metrics = MaterializedMetrics(settings.MATERIALIZED_PATH)
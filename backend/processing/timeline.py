@@ -0,0 +1,48 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from processing.classifier import Thresholds, classify_codes, trusted_clients
+
+
+def day_number(day: pd.Timestamp) -> int:
+    """Days since the epoch of a calendar day, the unit the timeline is sorted in."""
+    return int(np.datetime64(day.strftime("%Y-%m-%d"), "D").astype(np.int64))
+
+
+class BillTimeline(NamedTuple):
+    """
+    Bills sorted by due day, with what the classifier needs of each.
+
+    Built once per generation of bills and contracts (and thresholds); a
+    due-date window is then two binary searches and a slice, so a query
+    costs time in proportion to the bills in the window, not the table.
+    Bills without a due date are only counted in `undated` (they are
+    always em_dia).
+    """
+    due: np.ndarray  # int64 day numbers, ascending
+    is_open: np.ndarray
+    trusted: np.ndarray
+    undated: int
+    thresholds: Thresholds
+
+    @classmethod
+    def build(cls, df_bills: pd.DataFrame, df_contracts: pd.DataFrame, thresholds: Thresholds) -> "BillTimeline":
+        due = df_bills['data_vencimento'].to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+        dated = ~np.isnat(due)
+        is_open = (df_bills['status'] == 'A').to_numpy(dtype=bool, na_value=False)
+        trusted = df_bills['id_cliente'].isin(trusted_clients(df_contracts, thresholds)).to_numpy(dtype=bool, na_value=False)
+        days = due[dated].astype(np.int64)
+        order = np.argsort(days, kind="stable")
+        return cls(days[order], is_open[dated][order], trusted[dated][order], int((~dated).sum()), thresholds)
+
+    def window(self, start: Optional[int] = None, end: Optional[int] = None) -> slice:
+        """Positions of the bills due from `start` to `end` (day numbers, inclusive; None is unbounded)."""
+        lo = 0 if start is None else int(np.searchsorted(self.due, start, side="left"))
+        hi = len(self.due) if end is None else int(np.searchsorted(self.due, end, side="right"))
+        return slice(lo, max(lo, hi))
+
+    def codes(self, window: slice, as_of: int) -> np.ndarray:
+        """Category codes of the bills in `window`, with days late counted up to `as_of`."""
+        return classify_codes(as_of - self.due[window], self.is_open[window], self.trusted[window], self.thresholds)
@@ -0,0 +1,123 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from loguru import logger
+
+from utils.columnar import read_columns
+from utils.indexes import build_index, read_index
+from utils.schema import column_types, typed_frame
+from utils.storage import current_generation, get_storage, snapshot_file
+
+
+
+class DatasetCache:
+    """
+    Process-wide cache of the stored datasets as DataFrames.
+
+    Entries are keyed by the published storage generation (plus the
+    snapshot's mtime, which covers the legacy generation-0 file), so they
+    stay valid until a sync publishes new data and requests skip the disk
+    read and JSON parse entirely. `get` hands out shallow copies: with
+    pandas Copy-on-Write, callers can add or overwrite columns without
+    touching the cached frame.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Tuple[int, int], pd.DataFrame]] = {}
+        self._indexes: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(path: str, generation: int) -> Tuple[int, int]:
+        try:
+            mtime = os.stat(snapshot_file(path, generation)).st_mtime_ns
+        except FileNotFoundError:
+            mtime = 0
+        return generation, mtime
+
+    @staticmethod
+    def _load(path: str, storage_records: Any) -> pd.DataFrame:
+        # Typed once here (ids, categoricals, dates, valor), never per request
+        return typed_frame(storage_records, column_types(path))
+
+    def get(self, path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        The dataset at `path` as a DataFrame.
+
+        With `columns`, and a columnar snapshot for the current generation,
+        only those columns are loaded (typed, from the memory-mapped Arrow
+        file); otherwise the full records come from the row store.
+        """
+        generation = current_generation(path)
+        key = self._key(path, generation)
+        name = path if columns is None else f"{path}[{','.join(columns)}]"
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1].copy(deep=False)
+
+        self.misses += 1
+        df = read_columns(path, generation, columns) if columns is not None else None
+        if df is None:
+            storage = get_storage(path)
+            df = self._load(path, storage.get_all())
+            # Key by the generation actually read, in case a publish landed in between
+            generation = storage.generation
+            key = self._key(path, generation)
+        self._entries[name] = (key, df)
+        logger.debug(f"Dataset cache loaded {name} (generation {generation}, {len(df)} rows)")
+        return df.copy(deep=False)
+
+    def index(self, path: str) -> Dict[str, Any]:
+        """
+        The lookup indexes of the dataset at `path` (see `utils.indexes`).
+
+        They are persisted by the sync with each generation and loaded once
+        per generation; data without them (the legacy generation 0) has them
+        built from the row store instead. Raises LookupError for a path that
+        is not a configured dataset. The dicts are shared: callers must not
+        modify them.
+        """
+        generation = current_generation(path)
+        key = self._key(path, generation)
+        entry = self._indexes.get(path)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        index = read_index(path, generation)
+        if index is None:
+            storage = get_storage(path)
+            index = build_index(path, storage.get_all())
+            if index is None:
+                raise LookupError(f"{path} is not a configured dataset with lookup indexes")
+            generation = storage.generation
+            key = self._key(path, generation)
+        self._indexes[path] = (key, index)
+        logger.debug(f"Dataset cache loaded the lookup indexes of {path} (generation {generation})")
+        return index
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        if path is None:
+            self._entries.clear()
+            self._indexes.clear()
+        else:
+            self._entries.pop(path, None)
+            self._indexes.pop(path, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": {
+                path: {"generation": key[0], "rows": len(df), "memory_bytes": int(df.memory_usage(deep=True).sum())}
+                for path, (key, df) in self._entries.items()
+            },
+            "indexes": {path: {"generation": key[0]} for path, (key, _) in self._indexes.items()}
+        }
+
+
+dataset_cache = DatasetCache()
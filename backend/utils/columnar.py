@@ -0,0 +1,148 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+from loguru import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+    pc = None
+
+from config.settings import settings
+from utils.schema import column_types, derived_root, typed_frame
+
+
+def arrow_schema(types: Dict[str, str]) -> "pa.Schema":
+    arrow_types = {
+        "int": pa.int64(), "float": pa.float64(), "date": pa.date32(),
+        "category": pa.string(), "str": pa.string()
+    }
+    return pa.schema([(name, arrow_types[kind]) for name, kind in types.items()])
+
+
+def columnar_path(storage_path: str, generation: int) -> str:
+    """Arrow IPC snapshot written next to generation `generation` of `storage_path`."""
+    return f"{derived_root(storage_path)}.{generation:06d}.arrow"
+
+
+def _number(value: Optional[str], kind: str) -> Any:
+    try:
+        return int(value) if kind == "int" else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _column(values: List[Any], kind: str) -> "pa.Array":
+    """Convert one column of raw IXC values (mostly strings) with vectorized Arrow kernels."""
+    raw = pa.array([None if v is None else str(v) for v in values], pa.string())
+    # IXC uses '' for missing values and zeroed dates for unset ones
+    missing = pc.or_kleene(pc.equal(raw, ""), pc.starts_with(raw, "0000-00-00"))
+    raw = pc.if_else(missing, pa.scalar(None, pa.string()), raw)
+    if kind in ("int", "float"):
+        target = pa.int64() if kind == "int" else pa.float64()
+        try:
+            return pc.cast(raw, target)
+        except pa.ArrowInvalid:
+            # A stray non-numeric value nulls that cell rather than failing the snapshot
+            return pa.array([_number(v, kind) for v in raw.to_pylist()], target)
+    if kind == "date":
+        day = pc.strptime(pc.utf8_slice_codeunits(raw, 0, 10), format="%Y-%m-%d", unit="s", error_is_null=True)
+        return pc.cast(day, pa.date32())
+    return raw
+
+
+class ColumnarWriter:
+    """
+    Writes a dataset's Arrow IPC snapshot batch by batch, alongside the row store.
+
+    Each `write_many` call becomes one record batch converted to the
+    dataset's schema; `commit()` fsyncs and renames the file into place and
+    must run before the generation is published.
+    """
+
+    def __init__(self, storage_path: str, generation: int, types: Dict[str, str]):
+        self.types = types
+        self.schema = arrow_schema(types)
+        self.path = columnar_path(storage_path, generation)
+        self.tmp_path = f"{self.path}.tmp"
+        self._sink = pa.OSFile(self.tmp_path, "wb")
+        self._writer = pa.ipc.new_file(self._sink, self.schema)
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        records = list(records)
+        if not records:
+            return
+        arrays = [_column([r.get(name) for r in records], kind) for name, kind in self.types.items()]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def commit(self) -> None:
+        self._writer.close()
+        self._sink.close()
+        with open(self.tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        try:
+            self._writer.close()
+            self._sink.close()
+        finally:
+            try:
+                os.remove(self.tmp_path)
+            except FileNotFoundError:
+                pass
+
+
+def columnar_writer(storage_path: str, generation: int) -> Optional[ColumnarWriter]:
+    """Writer for the columnar snapshot of `storage_path`, or None when it has no schema or pyarrow is missing."""
+    types = column_types(storage_path)
+    if pa is None or types is None or not settings.STORAGE_COLUMNAR:
+        return None
+    return ColumnarWriter(storage_path, generation, types)
+
+
+def prune_columnar(storage_path: str, keep_from: int) -> None:
+    """Remove columnar snapshots of generations older than `keep_from`."""
+    directory = os.path.dirname(storage_path) or "."
+    prefix = os.path.basename(derived_root(storage_path)) + "."
+    for name in os.listdir(directory):
+        if not (name.startswith(prefix) and name.endswith(".arrow")):
+            continue
+        try:
+            generation = int(name[len(prefix):-len(".arrow")])
+        except ValueError:
+            continue
+        if generation < keep_from:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def read_columns(storage_path: str, generation: int, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    """
+    Load `columns` of a generation's columnar snapshot, memory-mapped.
+
+    Only the selected columns are materialised: the file is mapped and the
+    other columns' pages are never touched. The frame has the same dtypes
+    as `typed_frame` gives the row store. Returns None when there is no
+    snapshot for that generation (older data, or pyarrow is missing).
+    """
+    path = columnar_path(storage_path, generation)
+    if pa is None or generation <= 0 or not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select([c for c in columns if c in table.column_names])
+            # Codes are stored as plain strings (the IPC file format cannot carry a
+            # different dictionary per batch); the loader makes them categoricals
+            df = table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get, date_as_object=False)
+        return typed_frame(df, column_types(storage_path))
+    except (OSError, pa.ArrowInvalid) as e:
+        logger.warning(f"Columnar snapshot {path} unreadable ({e}); falling back to the row store")
+        return None
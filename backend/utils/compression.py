@@ -0,0 +1,113 @@
+import gzip
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+
+from loguru import logger
+
+from utils import fastjson
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - depends on the environment
+    ijson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - depends on the environment
+    lz4_frame = None
+
+# Snapshot codecs by preference, with the suffix their files get (boletos.000007.json.zst)
+EXTENSIONS = {"zstd": ".zst", "lz4": ".lz4", "gzip": ".gz"}
+
+ZSTD_LEVEL = 3
+GZIP_LEVEL = 3
+
+
+def available(codec: str) -> bool:
+    return {"zstd": zstandard is not None, "lz4": lz4_frame is not None, "gzip": True}.get(codec, False)
+
+
+def resolve_codec(name: Optional[str]) -> Optional[str]:
+    """
+    The codec to write snapshots with for a `STORAGE_COMPRESSION` value.
+
+    'none' (or empty) writes plain TinyDB files; 'auto' takes the fastest
+    codec installed; a codec whose module is missing falls back to gzip,
+    which the standard library always has.
+    """
+    name = (name or "none").strip().lower()
+    if name in ("", "none", "off", "false"):
+        return None
+    if name == "auto":
+        return next(codec for codec in EXTENSIONS if available(codec))
+    if name not in EXTENSIONS:
+        raise ValueError(f"Unknown snapshot compression '{name}'; use none, auto, {', '.join(EXTENSIONS)}")
+    if not available(name):
+        logger.warning(f"Snapshot compression '{name}' is not installed; using gzip")
+        return "gzip"
+    return name
+
+
+def codec_of(path: str) -> Optional[str]:
+    for codec, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return codec
+    return None
+
+
+def compress_stream(raw: BinaryIO, codec: str) -> BinaryIO:
+    """
+    A writable stream compressing into the open file `raw`.
+
+    Closing it finishes the compressed frame but leaves `raw` open, so the
+    caller can fsync the file before closing it.
+    """
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False)
+    if codec == "lz4":
+        return lz4_frame.LZ4FrameFile(raw, mode="wb")
+    return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decompress_stream(raw: BinaryIO, codec: str) -> BinaryIO:
+    """A readable stream of the decompressed contents of the open file `raw`."""
+    if not available(codec):
+        raise RuntimeError(f"Snapshot {getattr(raw, 'name', '')} is {codec}-compressed but {codec} is not installed")
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+    if codec == "lz4":
+        return lz4_frame.LZ4FrameFile(raw, mode="rb")
+    return gzip.GzipFile(fileobj=raw, mode="rb")
+
+
+@contextmanager
+def open_snapshot(path: str) -> Iterator[BinaryIO]:
+    """Open a snapshot file for reading, decompressing it when its suffix names a codec."""
+    codec = codec_of(path)
+    with open(path, "rb") as raw:
+        if codec is None:
+            yield raw
+            return
+        with decompress_stream(raw, codec) as stream:
+            yield stream
+
+
+def iter_snapshot(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the records of a TinyDB-layout snapshot (plain or compressed).
+
+    Records are parsed one at a time as the file is decompressed, so the
+    whole dataset is never held as text or as a parsed document. Without
+    ijson the snapshot is parsed in one piece instead.
+    """
+    with open_snapshot(path) as f:
+        if ijson is None:
+            yield from fastjson.loads(f.read()).get("_default", {}).values()
+            return
+        for _, record in ijson.kvitems(f, "_default", use_float=True):
+            yield record
@@ -0,0 +1,60 @@
+import hashlib
+import json
+from datetime import date, datetime, time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+
+from config.settings import settings
+from utils.storage import current_generation, published_at
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: float
+
+
+def report_validators(endpoint: str, params: Dict[str, Any], today: Optional[date] = None) -> Validators:
+    """
+    HTTP validators of a report response, computed without computing the report.
+
+    The ETag covers everything the response is derived from: the published
+    generation of each dataset, the day the report is anchored on (days
+    late change at midnight without a new generation), REPORT_DAYS, the
+    classifier thresholds and the normalized query params. Last-Modified
+    is the latest of the datasets' publish times and that midnight.
+    """
+    today = today or date.today()
+    paths = (settings.STORAGE_PATH_CLIENTES, settings.STORAGE_PATH_CONTRATOS, settings.STORAGE_PATH_BOLETOS)
+    generations = [current_generation(path) for path in paths]
+    tag = json.dumps([endpoint, today.isoformat(), settings.REPORT_DAYS, settings.CLASSIFIER_PADRAO_MAX_DAYS,
+                      settings.CLASSIFIER_TRANSICAO_MAX_DAYS, settings.CLASSIFIER_TRUST_REQUIRES_ACTIVE,
+                      generations, sorted(params.items())], default=str)
+    midnight = datetime.combine(today, time()).timestamp()
+    last_modified = max([midnight] + [published_at(path) or 0 for path in paths])
+    return Validators(f'"{hashlib.blake2b(tag.encode(), digest_size=12).hexdigest()}"', last_modified)
+
+
+def not_modified(headers: Mapping[str, str], validators: Validators) -> bool:
+    """Whether the request's If-None-Match (or, without it, If-Modified-Since) still matches."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison, as for GET: W/"x" matches "x"
+        return "*" in tags or any(tag.removeprefix("W/") == validators.etag for tag in tags)
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have second precision
+        return int(validators.last_modified) <= since
+    return False
+
+
+def cache_headers(validators: Validators) -> Dict[str, str]:
+    return {
+        "ETag": validators.etag,
+        "Last-Modified": formatdate(validators.last_modified, usegmt=True),
+        "Cache-Control": settings.REPORT_CACHE_CONTROL
+    }
@@ -0,0 +1,156 @@
+import json
+import os
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from loguru import logger
+
+from config.settings import settings
+from utils import fastjson
+from utils.compression import EXTENSIONS, compress_stream, open_snapshot, resolve_codec
+from utils.schema import dataset_name
+
+# 2024-03-01.key.json.zst / 2024-03-01.delta.json.gz
+_FILE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.(key|delta)\.json(\.\w+)?$")
+
+
+class HistoryDay(NamedTuple):
+    day: date
+    kind: str  # 'key' (every record) or 'delta' (changes since the previous recorded day)
+    path: str
+
+
+class HistoryStore:
+    """
+    One snapshot per day of a dataset, delta-encoded.
+
+    Each recorded day is a file holding either every record (a keyframe)
+    or only what changed since the previous recorded day: the records
+    inserted or modified, by id, and the ids deleted. A keyframe is written
+    every `keyframe_days` days (or when a delta would not be much smaller),
+    so rebuilding any day reads at most one keyframe and the deltas after
+    it. Recording a day again replaces it, so the last sync of the day is
+    what the history keeps.
+    """
+
+    def __init__(self, root: str, dataset: str, keyframe_days: int = 7, retention_days: int = 400):
+        self.directory = os.path.join(root, dataset)
+        self.keyframe_days = max(1, keyframe_days)
+        self.retention_days = retention_days
+        os.makedirs(self.directory, exist_ok=True)
+
+    def days(self) -> List[HistoryDay]:
+        """Recorded days, oldest first."""
+        found = []
+        for name in os.listdir(self.directory):
+            match = _FILE.match(name)
+            if match:
+                found.append(HistoryDay(date.fromisoformat(match.group(1)), match.group(2), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    @staticmethod
+    def _load(path: str) -> Dict[str, Any]:
+        with open_snapshot(path) as f:
+            return fastjson.loads(f.read())
+
+    def _write(self, day: date, kind: str, document: Dict[str, Any]) -> str:
+        codec = resolve_codec(settings.HISTORY_COMPRESSION)
+        path = os.path.join(self.directory, f"{day.isoformat()}.{kind}.json{EXTENSIONS[codec] if codec else ''}")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as raw:
+            stream = compress_stream(raw, codec) if codec else raw
+            stream.write(json.dumps(document, separators=(",", ":")).encode())
+            if stream is not raw:
+                stream.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+        # A day is stored once: drop the file of the other kind (or codec) it may have had
+        for other in self.days():
+            if other.day == day and other.path != path:
+                os.remove(other.path)
+        return path
+
+    def _rebuild(self, chain: List[HistoryDay]) -> Dict[str, Dict[str, Any]]:
+        records: Dict[str, Dict[str, Any]] = {}
+        for entry in chain:
+            document = self._load(entry.path)
+            if entry.kind == "key":
+                records = document["records"]
+                continue
+            for record_id in document["deletes"]:
+                records.pop(record_id, None)
+            records.update(document["upserts"])
+        return records
+
+    @staticmethod
+    def _chain(days: List[HistoryDay], until: date) -> List[HistoryDay]:
+        """The keyframe at or before `until` and the deltas after it, up to `until`."""
+        chain = [d for d in days if d.day <= until]
+        starts = [i for i, d in enumerate(chain) if d.kind == "key"]
+        return chain[starts[-1]:] if starts else []
+
+    def as_of(self, day: date) -> Optional[List[Dict[str, Any]]]:
+        """
+        The records as they were at the end of `day`, rebuilt from its keyframe
+        and deltas; the latest recorded day before it stands in for a day that
+        was not recorded. None when the history starts after `day`.
+        """
+        chain = self._chain(self.days(), day)
+        if not chain:
+            return None
+        return list(self._rebuild(chain).values())
+
+    def record(self, records: Iterable[Dict[str, Any]], day: Optional[date] = None, key: str = 'id') -> HistoryDay:
+        """Record `records` as the state of `day` (today by default) and apply the retention policy."""
+        day = day or date.today()
+        current = {str(r.get(key)): r for r in records}
+        days = self.days()
+        if days and days[-1].day > day:
+            raise ValueError(f"History of {self.directory} already has days after {day}")
+
+        # The base is the previous recorded day; recording `day` again replaces it
+        chain = self._chain([d for d in days if d.day < day], day)
+        kind, document = "key", {"records": current}
+        if chain and len(chain) < self.keyframe_days:
+            previous = self._rebuild(chain)
+            upserts = {k: r for k, r in current.items() if previous.get(k) != r}
+            deletes = [k for k in previous if k not in current]
+            # Mass changes (e.g. a new billing cycle) are cheaper to store in full
+            if len(upserts) + len(deletes) < len(current) // 2:
+                kind, document = "delta", {"base": chain[-1].day.isoformat(), "upserts": upserts, "deletes": deletes}
+
+        path = self._write(day, kind, document)
+        self.prune(day)
+        logger.info(f"Recorded {len(current)} records of {self.directory} for {day} as a {kind} ({os.path.getsize(path)} bytes)")
+        return HistoryDay(day, kind, path)
+
+    def prune(self, today: Optional[date] = None) -> int:
+        """
+        Drop days older than the retention window. The keyframe that the
+        oldest retained day is rebuilt from is kept with its deltas, so
+        every retained day can still be rebuilt.
+        """
+        cutoff = (today or date.today()) - timedelta(days=self.retention_days)
+        days = self.days()
+        chain = self._chain(days, cutoff)
+        keep_from = chain[0].day if chain else cutoff
+        removed = 0
+        for entry in days:
+            if entry.day < keep_from:
+                os.remove(entry.path)
+                removed += 1
+        return removed
+
+
+def history_store(storage_path: str) -> HistoryStore:
+    return HistoryStore(settings.HISTORY_PATH, dataset_name(storage_path),
+                        settings.HISTORY_KEYFRAME_DAYS, settings.HISTORY_RETENTION_DAYS)
+
+
+def record_history(storage_path: str, records: Iterable[Dict[str, Any]], day: Optional[date] = None) -> Optional[HistoryDay]:
+    """Record today's state of a dataset in its history, when history is enabled."""
+    if not settings.HISTORY_ENABLED:
+        return None
+    return history_store(storage_path).record(records, day)
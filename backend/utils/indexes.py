@@ -0,0 +1,182 @@
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from utils import fastjson
+from utils.schema import dataset_role, derived_root
+
+
+def index_path(storage_path: str, generation: int) -> str:
+    """Lookup indexes persisted next to generation `generation` of `storage_path`."""
+    return f"{derived_root(storage_path)}.{generation:06d}.index.json"
+
+
+def _id(value: Any) -> Optional[str]:
+    # Ids as the typed loader reads them (integers), spelled as JSON object keys
+    try:
+        return str(int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value: Any) -> Any:
+    return "" if value is None else value
+
+
+class CustomerIndex:
+    """clientes: id -> [razao, telefone (celular, else fone), bairro]; the last record per id wins."""
+
+    def __init__(self):
+        self.by_id: Dict[str, List[Any]] = {}
+
+    def add(self, record: Dict[str, Any]) -> None:
+        key = _id(record.get('id'))
+        if key is not None:
+            phone = _text(record.get('telefone_celular')) or _text(record.get('fone'))
+            self.by_id[key] = [_text(record.get('razao')), phone, _text(record.get('bairro'))]
+
+    def data(self) -> Dict[str, Any]:
+        return {"by_id": self.by_id}
+
+
+class ContractIndex:
+    """
+    contratos: id_cliente -> [status_internet of the last contract,
+    status_internet of the first contract, any contract with trust unlock].
+    """
+
+    def __init__(self):
+        self.by_cliente: Dict[str, List[Any]] = {}
+
+    def add(self, record: Dict[str, Any]) -> None:
+        key = _id(record.get('id_cliente'))
+        if key is None:
+            return
+        status = _text(record.get('status_internet'))
+        trust = record.get('desbloqueio_confianca_ativo') == 'S'
+        entry = self.by_cliente.get(key)
+        if entry is None:
+            self.by_cliente[key] = [status, status, trust]
+        else:
+            entry[0] = status
+            entry[2] = entry[2] or trust
+
+    def data(self) -> Dict[str, Any]:
+        return {"by_cliente": self.by_cliente}
+
+
+def bill_entry(record: Dict[str, Any]) -> List[Any]:
+    """A bill as the by_due index holds it: [id, id_cliente, status]."""
+    return [record.get('id'), _id(record.get('id_cliente')), _text(record.get('status'))]
+
+
+class BillIndex:
+    """boletos: due day (YYYY-MM-DD) -> [[id, id_cliente, status], ...] in storage order."""
+
+    def __init__(self):
+        self.by_due: Dict[str, List[List[Any]]] = {}
+        self._days: Dict[str, Optional[str]] = {}
+
+    def _day(self, value: Any) -> Optional[str]:
+        day = str(value)[:10] if value else ""
+        if day not in self._days:
+            # Same rule as the loader: anything that is not a real date (0000-00-00, '') has no day
+            try:
+                self._days[day] = datetime.strptime(day, "%Y-%m-%d").strftime("%Y-%m-%d")
+            except ValueError:
+                self._days[day] = None
+        return self._days[day]
+
+    def add(self, record: Dict[str, Any]) -> None:
+        day = self._day(record.get('data_vencimento'))
+        if day is not None:
+            self.by_due.setdefault(day, []).append(bill_entry(record))
+
+    def data(self) -> Dict[str, Any]:
+        return {"by_due": self.by_due}
+
+
+# Keyed by dataset role (see `utils.schema.dataset_role`)
+INDEXES = {"clientes": CustomerIndex, "contratos": ContractIndex, "boletos": BillIndex}
+
+
+def build_index(storage_path: str, records: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The lookup indexes of `records`, or None when the dataset has none."""
+    index_type = INDEXES.get(dataset_role(storage_path))
+    if index_type is None:
+        return None
+    index = index_type()
+    for record in records:
+        index.add(record)
+    return index.data()
+
+
+class IndexWriter:
+    """
+    Builds a dataset's lookup indexes from the records of a generation as
+    they are written; `commit()` persists them and must run before the
+    generation is published, like the columnar snapshot.
+    """
+
+    def __init__(self, storage_path: str, generation: int):
+        self.index = INDEXES[dataset_role(storage_path)]()
+        self.path = index_path(storage_path, generation)
+        self.tmp_path = f"{self.path}.tmp"
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.index.add(record)
+
+    def commit(self) -> None:
+        with open(self.tmp_path, "w") as f:
+            json.dump(self.index.data(), f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def index_writer(storage_path: str, generation: int) -> Optional[IndexWriter]:
+    """Writer for the lookup indexes of `storage_path`, or None when the dataset has none."""
+    if dataset_role(storage_path) not in INDEXES:
+        return None
+    return IndexWriter(storage_path, generation)
+
+
+def prune_indexes(storage_path: str, keep_from: int) -> None:
+    """Remove lookup indexes of generations older than `keep_from`."""
+    directory = os.path.dirname(storage_path) or "."
+    prefix = os.path.basename(derived_root(storage_path)) + "."
+    for name in os.listdir(directory):
+        if not (name.startswith(prefix) and name.endswith(".index.json")):
+            continue
+        try:
+            generation = int(name[len(prefix):-len(".index.json")])
+        except ValueError:
+            continue
+        if generation < keep_from:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def read_index(storage_path: str, generation: int) -> Optional[Dict[str, Any]]:
+    """The persisted lookup indexes of a generation, or None when there are none (older data)."""
+    path = index_path(storage_path, generation)
+    if generation <= 0 or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return fastjson.loads(f.read())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Lookup index {path} unreadable ({e}); rebuilding it from the row store")
+        return None
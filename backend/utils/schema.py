@@ -0,0 +1,111 @@
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+
+# Logical column types of the synced datasets, keyed by dataset role (see `dataset_role`).
+# 'int' is a nullable id (Int32, or Int64 when the values need it), 'float' a
+# number, 'date' a calendar day (datetime64), 'category' a low-cardinality
+# code (pandas categorical) and 'str' free text. Columns not listed keep
+# whatever type they were loaded with.
+COLUMN_TYPES: Dict[str, Dict[str, str]] = {
+    "boletos": {
+        "id": "int", "id_cliente": "int", "data_emissao": "date", "data_vencimento": "date",
+        "pagamento_data": "date", "valor": "float", "status": "category", "ultima_atualizacao": "str"
+    },
+    "contratos": {
+        "id": "int", "id_cliente": "int", "status": "category", "status_internet": "category",
+        "desbloqueio_confianca": "category", "desbloqueio_confianca_ativo": "category", "ultima_atualizacao": "str"
+    },
+    "clientes": {
+        "id": "int", "razao": "str", "fantasia": "str", "bairro": "category", "fone": "str",
+        "telefone_celular": "str", "telefone_comercial": "str", "telefone_residencial": "str",
+        "id_tipo_cliente": "int", "ativo": "category", "ultima_atualizacao": "str"
+    }
+}
+
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+def dataset_name(storage_path: str) -> str:
+    """The storage file's name without extension; prefixes the files derived from it."""
+    return os.path.splitext(os.path.basename(storage_path))[0]
+
+
+def derived_root(storage_path: str) -> str:
+    """
+    Path prefix of the files derived from the generations of `storage_path`.
+
+    The backend is part of it: SQLite numbers its generations from 1 again,
+    so its files must never resolve to ones TinyDB left behind.
+    """
+    root, _ = os.path.splitext(storage_path)
+    return f"{root}.sqlite" if settings.STORAGE_BACKEND == "sqlite" else root
+
+
+def dataset_role(storage_path: str) -> Optional[str]:
+    """
+    Which synced dataset ('boletos', 'contratos' or 'clientes') `storage_path` holds.
+
+    The configured IXC_STORAGE_PATH_* decide, whatever the files are called;
+    a path that is not configured falls back to its file name.
+    """
+    configured = {
+        os.path.abspath(settings.STORAGE_PATH_BOLETOS): "boletos",
+        os.path.abspath(settings.STORAGE_PATH_CONTRATOS): "contratos",
+        os.path.abspath(settings.STORAGE_PATH_CLIENTES): "clientes"
+    }
+    role = configured.get(os.path.abspath(storage_path))
+    if role is None and dataset_name(storage_path) in COLUMN_TYPES:
+        role = dataset_name(storage_path)
+    return role
+
+
+def column_types(storage_path: str) -> Optional[Dict[str, str]]:
+    return COLUMN_TYPES.get(dataset_role(storage_path))
+
+
+def _int_column(column: pd.Series) -> pd.Series:
+    numbers = pd.to_numeric(column, errors='coerce')
+    largest = numbers.abs().max()
+    return numbers.astype("Int32" if pd.isna(largest) or largest <= _INT32_MAX else "Int64")
+
+
+def _date_column(column: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column
+    # IXC sends 'YYYY-MM-DD' or 'YYYY-MM-DD hh:mm:ss'; '' and 0000-00-00 become NaT
+    return pd.to_datetime(column.astype("string").str.slice(0, 10), format="%Y-%m-%d", errors='coerce')
+
+
+def _text_column(column: pd.Series) -> pd.Series:
+    # IXC's convention for "no value" is ''; the columnar snapshot stores it as null
+    return column.where(column.notna(), "")
+
+
+def typed_frame(data: Any, types: Optional[Dict[str, str]]) -> pd.DataFrame:
+    """
+    Build a DataFrame from records (or normalize an existing one) to `types`.
+
+    This is the single place where stored IXC data gets its dtypes; the
+    endpoints rely on ids being integers, codes categoricals and dates
+    datetime64, and never convert them again per request.
+    """
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    for column, kind in (types or {}).items():
+        if column not in df.columns:
+            continue
+        if kind == "int":
+            df[column] = _int_column(df[column])
+        elif kind == "float":
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype("float64")
+        elif kind == "date":
+            df[column] = _date_column(df[column])
+        elif kind == "category":
+            df[column] = _text_column(df[column]).astype("category")
+        elif kind == "str":
+            df[column] = _text_column(df[column])
+    return df
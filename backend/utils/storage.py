@@ -1,24 +1,728 @@
+import itertools
 import os
+import re
+import json
+import sqlite3
+import time
+from contextlib import closing, contextmanager
 from tinydb import TinyDB, Query
+from tinydb.storages import Storage as TinyDBStorage
 from loguru import logger
-from typing import List, Dict, Any
+import hashlib
+from typing import List, Dict, Any, Iterable, Iterator, Callable, NamedTuple, Optional, Union
+from config.settings import settings
+from utils import fastjson
+from utils.columnar import columnar_writer, prune_columnar
+from utils.compression import EXTENSIONS, codec_of, compress_stream, decompress_stream, iter_snapshot, resolve_codec
+from utils.indexes import index_writer, prune_indexes
+
+CURRENT_SUFFIX = ".current"
+
+class UpsertResult(NamedTuple):
+    """What an upsert or delete did; `total` is the number of records stored afterwards."""
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    total: int = 0
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated + self.deleted
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Stable digest of a record's content, independent of key order."""
+    return hashlib.blake2b(json.dumps(record, sort_keys=True, separators=(",", ":")).encode(), digest_size=16).hexdigest()
+
+def snapshot_path(storage_path: str, generation: int, codec: Optional[str] = None) -> str:
+    """File holding generation `generation` of `storage_path` (generation 0 is the legacy file itself)."""
+    if generation <= 0:
+        return storage_path
+    root, ext = os.path.splitext(storage_path)
+    return f"{root}.{generation:06d}{ext}{EXTENSIONS[codec] if codec else ''}"
+
+def snapshot_file(storage_path: str, generation: int) -> str:
+    """The snapshot file generation `generation` was written to, plain or compressed."""
+    for codec in (None, *EXTENSIONS):
+        path = snapshot_path(storage_path, generation, codec)
+        if os.path.exists(path):
+            return path
+    return snapshot_path(storage_path, generation)
+
+def current_generation(storage_path: str) -> int:
+    """Generation currently published for `storage_path`; cheap enough to call per request."""
+    if settings.STORAGE_BACKEND == "sqlite":
+        return _sqlite_storage(storage_path).generation
+    return _tinydb_generation(storage_path)
+
+def _tinydb_generation(storage_path: str) -> int:
+    """Generation the TinyDB `.current` pointer publishes, whichever backend is selected."""
+    try:
+        with open(storage_path + CURRENT_SUFFIX, "r") as f:
+            return int(json.load(f)["generation"])
+    except (FileNotFoundError, ValueError, KeyError):
+        return 0
+
+def derived_writers(storage_path: str, generation: int) -> list:
+    """Writers of the files derived from a generation: its columnar snapshot and lookup indexes."""
+    return [w for w in (columnar_writer(storage_path, generation), index_writer(storage_path, generation)) if w is not None]
+
+def prune_derived(storage_path: str, keep_from: int) -> None:
+    prune_columnar(storage_path, keep_from)
+    prune_indexes(storage_path, keep_from)
+
+def published_at(storage_path: str) -> Optional[float]:
+    """When the current generation of `storage_path` was published (the legacy file's mtime for generation 0)."""
+    if settings.STORAGE_BACKEND == "sqlite":
+        return _sqlite_storage(storage_path).published_at()
+    try:
+        with open(storage_path + CURRENT_SUFFIX, "r") as f:
+            return float(json.load(f)["published_at"])
+    except (FileNotFoundError, ValueError, KeyError):
+        try:
+            return os.path.getmtime(storage_path)
+        except OSError:
+            return None
+
+def _fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:  # pragma: no cover - directories cannot be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class StorageWriter:
+    """
+    Streams records into the next generation of a dataset.
+
+    Records are written as they arrive, in TinyDB's own JSON layout, so a
+    sync never has to hold a whole dataset in memory; with
+    `STORAGE_COMPRESSION` the layout is compressed on the fly (zstd, lz4
+    or gzip). `commit()` fsyncs the new snapshot file and then atomically
+    swaps the `.current` pointer to it; until then readers keep using the
+    previous generation.
+    """
+
+    def __init__(self, storage_path: str, keep_generations: int = 2):
+        self.storage_path = storage_path
+        self.keep_generations = keep_generations
+        self.generation = _tinydb_generation(storage_path) + 1
+        self.codec = resolve_codec(settings.STORAGE_COMPRESSION)
+        self.path = snapshot_path(storage_path, self.generation, self.codec)
+        self.tmp_path = f"{self.path}.tmp"
+        self.count = 0
+        self.derived = derived_writers(storage_path, self.generation)
+        self._file = open(self.tmp_path, "wb")
+        self._stream = compress_stream(self._file, self.codec) if self.codec else self._file
+        self._stream.write(b'{"_default": {')
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        records = list(records)
+        for derived in self.derived:
+            derived.write_many(records)
+        chunk = []
+        for record in records:
+            self.count += 1
+            chunk.append(f'{"," if self.count > 1 else ""}\n"{self.count}": {json.dumps(record)}')
+        # One write per batch: compressors are much faster fed large blocks
+        self._stream.write("".join(chunk).encode())
+
+    def commit(self) -> None:
+        self._stream.write(b"\n}}")
+        if self._stream is not self._file:
+            self._stream.close()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        for derived in self.derived:
+            derived.commit()
+
+        pointer_tmp = f"{self.storage_path}{CURRENT_SUFFIX}.tmp"
+        with open(pointer_tmp, "w") as f:
+            json.dump({"generation": self.generation, "file": os.path.basename(self.path),
+                       "count": self.count, "published_at": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_tmp, self.storage_path + CURRENT_SUFFIX)
+        _fsync_dir(self.storage_path)
+        self._prune()
+
+    def _prune(self) -> None:
+        # Readers that still hold an old snapshot open keep reading it after the unlink.
+        # Generation 0 is the legacy file itself, which the fallback paths still read: never pruned.
+        for generation in range(max(1, self.generation - self.keep_generations - 2), self.generation - self.keep_generations + 1):
+            for codec in (None, *EXTENSIONS):
+                try:
+                    os.remove(snapshot_path(self.storage_path, generation, codec))
+                except FileNotFoundError:
+                    pass
+        prune_derived(self.storage_path, self.generation - self.keep_generations + 1)
+
+    def abort(self) -> None:
+        try:
+            if self._stream is not self._file:
+                self._stream.close()
+        finally:
+            self._file.close()
+        for derived in self.derived:
+            derived.abort()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+class CompressedSnapshotStorage(TinyDBStorage):
+    """
+    Read-only TinyDB storage over a compressed snapshot file.
+
+    Like TinyDB's own JSON storage it keeps the file open, so a reader can
+    still read its generation after a newer publish pruned the file.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        self.path = path
+        self.codec = codec_of(path)
+        self._handle = open(path, "rb")
+
+    def read(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        self._handle.seek(0)
+        with decompress_stream(self._handle, self.codec) as f:
+            return fastjson.loads(f.read())
+
+    def write(self, data: Dict[str, Dict[str, Any]]) -> None:
+        raise IOError(f"Snapshot {self.path} is published and read-only")
+
+    def close(self) -> None:
+        self._handle.close()
 
 class Storage:
+    """
+    One dataset, stored as generations of TinyDB snapshot files.
+
+    An instance reads the generation that was current when it was opened
+    (`self.generation`); writers publish a new generation without touching
+    the one being read.
+    """
+
     def __init__(self, storage_path: str):
         self.storage_path = storage_path
         os.makedirs(os.path.dirname(storage_path), exist_ok=True)
-        self.db = TinyDB(storage_path)
+        self._open(_tinydb_generation(storage_path))
+
+    def _open(self, generation: int) -> None:
+        if generation > 0:
+            # Published snapshots are immutable; opening read-only also avoids
+            # recreating one that a newer publish has just pruned
+            try:
+                path = snapshot_file(self.storage_path, generation)
+                if codec_of(path):
+                    self.db = TinyDB(path, storage=CompressedSnapshotStorage)
+                else:
+                    self.db = TinyDB(path, access_mode="r")
+                self.generation = generation
+                return
+            except FileNotFoundError:
+                latest = _tinydb_generation(self.storage_path)
+                if latest == generation:
+                    raise
+                return self._open(latest)
+        self.generation = generation
+        self.db = TinyDB(snapshot_path(self.storage_path, generation))
 
     def save_all(self, data: List[Dict[str, Any]]):
-        """Overwrites the entire database with new data."""
-        self.db.truncate()
-        if data:
-            self.db.insert_multiple(data)
-        logger.info(f"Saved {len(data)} records to {self.storage_path}")
+        """Overwrites the entire database with new data, as a new generation."""
+        with self.writer() as writer:
+            writer.write_many(data)
+
+    @contextmanager
+    def writer(self) -> Iterator[StorageWriter]:
+        """
+        Replace the database with records streamed in batches.
+
+        The previous data stays in place until the block finishes without
+        an error; on failure the partial file is discarded.
+        """
+        writer = StorageWriter(self.storage_path)
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+        # Move this instance to the generation it just published
+        self.db.close()
+        self._open(writer.generation)
+        logger.info(f"Saved {writer.count} records to {self.storage_path} (generation {writer.generation})")
+
+    def upsert_many(self, records: Iterable[Dict[str, Any]], key: str = 'id',
+                    due_after: Optional[str] = None) -> UpsertResult:
+        """
+        Insert or replace records by `key`, keeping every other stored record.
+
+        Records whose content hash matches the stored one count as unchanged;
+        when nothing changed no new generation is written at all. With
+        `due_after` (YYYY-MM-DD), stored and incoming records due on or
+        before that day (or without a due date) are dropped, e.g. bills that
+        aged out of the report window. Changes are written through
+        `writer()`, so readers never see a half-applied delta.
+
+        Snapshots are immutable files, so any change rewrites the whole
+        dataset as a new generation: a delta costs O(stored records) here.
+        The SQLite backend applies it in place.
+        """
+        keep = None if due_after is None else (lambda doc: _due(doc) > due_after)
+        merged = {str(doc.get(key)): doc for doc in self.db.all()}
+        inserted = updated = unchanged = deleted = 0
+        for record in records:
+            record_key = str(record.get(key))
+            old = merged.get(record_key)
+            if keep is not None and not keep(record):
+                if old is not None:
+                    del merged[record_key]
+                    deleted += 1
+                continue
+            if old is None:
+                inserted += 1
+            elif content_hash(old) == content_hash(record):
+                unchanged += 1
+                continue
+            else:
+                updated += 1
+            merged[record_key] = record
+        if keep is not None:
+            stale = [k for k, doc in merged.items() if not keep(doc)]
+            for k in stale:
+                del merged[k]
+            deleted += len(stale)
+
+        result = UpsertResult(inserted, updated, unchanged, deleted, len(merged))
+        if result.changed:
+            with self.writer() as writer:
+                writer.write_many(merged.values())
+        logger.info(f"Upsert into {self.storage_path}: {result._asdict()}")
+        return result
+
+    def delete_ids(self, ids: Iterable[Any], key: str = 'id') -> UpsertResult:
+        """Remove the records whose `key` is in `ids`; writes a new generation only if any existed."""
+        doomed = {str(i) for i in ids}
+        docs = self.db.all()
+        remaining = [doc for doc in docs if str(doc.get(key)) not in doomed]
+        result = UpsertResult(deleted=len(docs) - len(remaining), total=len(remaining))
+        if result.deleted:
+            with self.writer() as writer:
+                writer.write_many(remaining)
+        logger.info(f"Deleted {result.deleted} records from {self.storage_path}")
+        return result
 
     def get_all(self) -> List[Dict[str, Any]]:
         """Retrieves all records from the database."""
         return self.db.all()
 
-def get_storage(path: str) -> Storage:
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        """Streams the records of the open generation without loading the whole snapshot."""
+        path = snapshot_file(self.storage_path, self.generation)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            yield from iter_snapshot(path)
+
+    def find(self, due_from: Optional[str] = None, due_to: Optional[str] = None,
+             status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Records due between `due_from` and `due_to` (inclusive, YYYY-MM-DD) with `status`."""
+        return [doc for doc in self.db.all() if _matches(doc, due_from, due_to, status)]
+
+def _due(doc: Dict[str, Any]) -> str:
+    return (doc.get('data_vencimento') or '')[:10]
+
+def _matches(doc: Dict[str, Any], due_from: Optional[str], due_to: Optional[str], status: Optional[str]) -> bool:
+    due = _due(doc)
+    if due_from is not None and not (due and due >= due_from):
+        return False
+    if due_to is not None and not (due and due <= due_to):
+        return False
+    return status is None or doc.get('status') == status
+
+_initialized = set()
+
+class SqliteWriter:
+    """
+    Streams records into a staging table of the SQLite database.
+
+    Batches are committed as they go, so a long listing does not hold the
+    write lock; `commit()` builds the indexes and swaps the staging table in
+    with renames inside one short transaction, bumping the generation.
+    Readers see either the old table or the new one.
+    """
+
+    def __init__(self, storage: "SqliteStorage"):
+        self.storage = storage
+        self.table = storage.table
+        self.staging = f"{storage.table}__next"
+        self.conn = storage.connect()
+        self.count = 0
+        self.generation = storage.published_generation() + 1
+        self.derived = derived_writers(storage.dataset_path, self.generation) if storage.dataset_path else []
+        self.conn.execute(f'DROP TABLE IF EXISTS "{self.staging}"')
+        self.conn.execute(SqliteStorage.TABLE_SQL.format(table=self.staging))
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        records = list(records)
+        if not records:
+            return
+        for derived in self.derived:
+            derived.write_many(records)
+        rows = [SqliteStorage.row(record) for record in records]
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany(SqliteStorage.UPSERT_SQL.format(table=self.staging), rows)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.count += len(rows)
+
+    def commit(self) -> None:
+        # Indexes are built once over the full staging table, not maintained row by row
+        SqliteStorage.create_indexes(self.conn, self.staging, f"{self.table}_g{self.generation}")
+        for derived in self.derived:
+            derived.commit()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(f'DROP TABLE IF EXISTS "{self.table}"')
+            self.conn.execute(f'ALTER TABLE "{self.staging}" RENAME TO "{self.table}"')
+            self.storage.publish(self.conn, self.generation)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        finally:
+            self.conn.close()
+        self.storage.prune_derived()
+
+    def abort(self) -> None:
+        for derived in self.derived:
+            derived.abort()
+        try:
+            self.conn.execute(f'DROP TABLE IF EXISTS "{self.staging}"')
+        finally:
+            self.conn.close()
+
+class SqliteStorage:
+    """
+    `Storage` backed by one table of a shared SQLite database (WAL mode).
+
+    Each record is kept as its JSON document plus the columns reports
+    filter on, which are indexed, so `find` loads only the matching rows.
+    Every publish bumps the table's generation in `_generations`, which
+    `current_generation` reads for cache keys.
+    """
+
+    INDEXED = ("data_vencimento", "status", "id_cliente")
+    TABLE_SQL = (
+        'CREATE TABLE IF NOT EXISTS "{table}" ('
+        'id TEXT UNIQUE, id_cliente TEXT, status TEXT, data_vencimento TEXT, doc TEXT NOT NULL, hash TEXT)'
+    )
+    UPSERT_SQL = (
+        'INSERT INTO "{table}" (id, id_cliente, status, data_vencimento, doc, hash) VALUES (?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT(id) DO UPDATE SET id_cliente = excluded.id_cliente, status = excluded.status, '
+        'data_vencimento = excluded.data_vencimento, doc = excluded.doc, hash = excluded.hash'
+    )
+
+    def __init__(self, db_path: str, table: str, dataset_path: Optional[str] = None):
+        self.db_path = db_path
+        self.table = table
+        # Dataset path the columnar snapshots and lookup indexes are written next to
+        self.dataset_path = dataset_path
+        self.storage_path = f"{db_path}#{table}"
+        if db_path not in _initialized:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            with closing(self.connect()) as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS _generations (name TEXT PRIMARY KEY, generation INTEGER NOT NULL, published_at REAL)")
+            _initialized.add(db_path)
+        self.generation = self.published_generation()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @classmethod
+    def create_indexes(cls, conn: sqlite3.Connection, table: str, prefix: str) -> None:
+        for column in cls.INDEXED:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "{prefix}_{column}" ON "{table}" ({column})')
+
+    @staticmethod
+    def row(record: Dict[str, Any]) -> tuple:
+        def text(value: Any) -> Optional[str]:
+            return None if value is None else str(value)
+        due = record.get('data_vencimento')
+        return (text(record.get('id')), text(record.get('id_cliente')), text(record.get('status')),
+                str(due)[:10] if due else None, json.dumps(record), content_hash(record))
+
+    def published_generation(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        if conn is None:
+            with closing(self.connect()) as conn:
+                return self.published_generation(conn)
+        try:
+            row = conn.execute("SELECT generation FROM _generations WHERE name = ?", (self.table,)).fetchone()
+        except sqlite3.OperationalError:
+            return 0
+        return row[0] if row else 0
+
+    def published_at(self) -> Optional[float]:
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT published_at FROM _generations WHERE name = ?", (self.table,)).fetchone()
+        return row[0] if row else None
+
+    def write_derived(self, conn: sqlite3.Connection, generation: int, batch_size: int = 50000) -> None:
+        """Write the columnar snapshot and lookup indexes of `generation` from the table as `conn` sees it."""
+        writers = derived_writers(self.dataset_path, generation) if self.dataset_path else []
+        if not writers:
+            return
+        try:
+            cursor = conn.execute(f'SELECT doc FROM "{self.table}" ORDER BY rowid')
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                records = [fastjson.loads(doc) for (doc,) in batch]
+                for writer in writers:
+                    writer.write_many(records)
+        except BaseException:
+            for writer in writers:
+                writer.abort()
+            raise
+        for writer in writers:
+            writer.commit()
+
+    def prune_derived(self, keep: int = 2) -> None:
+        if self.dataset_path:
+            prune_derived(self.dataset_path, self.generation - keep + 1)
+
+    def publish(self, conn: sqlite3.Connection, generation: int) -> None:
+        conn.execute("INSERT OR REPLACE INTO _generations (name, generation, published_at) VALUES (?, ?, ?)",
+                     (self.table, generation, time.time()))
+
+    def _select(self, where: str = "", params: tuple = ()) -> List[Dict[str, Any]]:
+        with closing(self.connect()) as conn:
+            # One read transaction: the generation and the rows come from the same snapshot
+            conn.execute("BEGIN")
+            self.generation = self.published_generation(conn)
+            try:
+                rows = conn.execute(f'SELECT doc FROM "{self.table}" {where} ORDER BY rowid', params).fetchall()
+            except sqlite3.OperationalError:
+                rows = []  # nothing published yet
+            conn.execute("COMMIT")
+        return [fastjson.loads(doc) for (doc,) in rows]
+
+    def get_all(self) -> List[Dict[str, Any]]:
+        return self._select()
+
+    def iter_all(self, batch_size: int = 50000) -> Iterator[Dict[str, Any]]:
+        """Streams the published rows in batches, from one read transaction; see `Storage.iter_all`."""
+        with closing(self.connect()) as conn:
+            conn.execute("BEGIN")
+            try:
+                try:
+                    cursor = conn.execute(f'SELECT doc FROM "{self.table}" ORDER BY rowid')
+                except sqlite3.OperationalError:
+                    return  # nothing published yet
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    for (doc,) in batch:
+                        yield fastjson.loads(doc)
+            finally:
+                conn.execute("COMMIT")
+
+    def find(self, due_from: Optional[str] = None, due_to: Optional[str] = None,
+             status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Records due between `due_from` and `due_to` (inclusive, YYYY-MM-DD) with `status`, via the indexes."""
+        clauses, params = [], []
+        if due_from is not None:
+            clauses.append("data_vencimento >= ?")
+            params.append(due_from)
+        if due_to is not None:
+            clauses.append("data_vencimento <= ?")
+            params.append(due_to)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        return self._select(f"WHERE {' AND '.join(clauses)}" if clauses else "", tuple(params))
+
+    def save_all(self, data: List[Dict[str, Any]]):
+        """Overwrites the entire table with new data, as a new generation."""
+        with self.writer() as writer:
+            writer.write_many(data)
+
+    @contextmanager
+    def writer(self) -> Iterator[SqliteWriter]:
+        """Replace the table with records streamed in batches; see `Storage.writer`."""
+        writer = SqliteWriter(self)
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+        self.generation = writer.generation
+        logger.info(f"Saved {writer.count} records to {self.storage_path} (generation {writer.generation})")
+
+    def _ensure_table(self, conn: sqlite3.Connection) -> None:
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{self.table}")')]
+        if not columns:
+            conn.execute(self.TABLE_SQL.format(table=self.table))
+            self.create_indexes(conn, self.table, f"{self.table}_g0")
+        elif "hash" not in columns:
+            # Tables from before change detection; their rows hash as unknown and count as updated once
+            conn.execute(f'ALTER TABLE "{self.table}" ADD COLUMN hash TEXT')
+
+    def _stored_hashes(self, conn: sqlite3.Connection, ids: List[Optional[str]], chunk: int = 500) -> Dict[str, Optional[str]]:
+        ids = [i for i in ids if i is not None]
+        hashes: Dict[str, Optional[str]] = {}
+        for start in range(0, len(ids), chunk):
+            batch = ids[start:start + chunk]
+            query = f'SELECT id, hash FROM "{self.table}" WHERE id IN ({",".join("?" * len(batch))})'
+            hashes.update(conn.execute(query, batch).fetchall())
+        return hashes
+
+    def _delete(self, conn: sqlite3.Connection, ids: List[str], chunk: int = 500) -> int:
+        deleted = 0
+        for start in range(0, len(ids), chunk):
+            batch = ids[start:start + chunk]
+            deleted += conn.execute(f'DELETE FROM "{self.table}" WHERE id IN ({",".join("?" * len(batch))})', batch).rowcount
+        return deleted
+
+    def _apply(self, change: Callable[[sqlite3.Connection], UpsertResult]) -> UpsertResult:
+        """
+        Run `change` in one write transaction; publish a generation only if it changed rows.
+        """
+        with closing(self.connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._ensure_table(conn)
+                result = change(conn)
+                total = conn.execute(f'SELECT COUNT(*) FROM "{self.table}"').fetchone()[0]
+                result = result._replace(total=total)
+                if not result.changed:
+                    conn.execute("ROLLBACK")
+                    return result
+                generation = self.published_generation(conn) + 1
+                self.publish(conn, generation)
+                conn.execute("COMMIT")
+                self.generation = generation
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._derive(generation)
+        return result
+
+    def _derive(self, generation: int) -> None:
+        """
+        Write the derived files of a published generation, outside the write lock.
+
+        Readers that look for them before they land fall back to the row
+        store, as for data without them. Skipped when a newer generation was
+        published meanwhile: its writer derives its own.
+        """
+        with closing(self.connect()) as conn:
+            # One read transaction: the rows are exactly those of `generation`
+            conn.execute("BEGIN")
+            try:
+                if self.published_generation(conn) == generation:
+                    self.write_derived(conn, generation)
+            finally:
+                conn.execute("COMMIT")
+        self.prune_derived()
+
+    def upsert_many(self, records: Iterable[Dict[str, Any]], key: str = 'id',
+                    due_after: Optional[str] = None) -> UpsertResult:
+        """
+        Insert or replace records by `key` in a single transaction; see `Storage.upsert_many`.
+
+        Only inserted and updated rows are written: the stored content hash
+        of each incoming id is compared first. The `due_after` prune is one
+        DELETE on the indexed data_vencimento column, so a delta costs time
+        in proportion to the rows it touches, not the table.
+        """
+        if key != 'id':
+            raise ValueError("SqliteStorage upserts are keyed by 'id'")
+        incoming = {None if r.get('id') is None else str(r.get('id')): r for r in records}
+
+        def change(conn: sqlite3.Connection) -> UpsertResult:
+            stored = self._stored_hashes(conn, list(incoming))
+            rows, gone = [], []
+            inserted = updated = unchanged = 0
+            for record_id, record in incoming.items():
+                if due_after is not None and not _due(record) > due_after:
+                    if record_id in stored:
+                        gone.append(record_id)
+                    continue
+                row = self.row(record)
+                if record_id not in stored:
+                    inserted += 1
+                elif stored[record_id] == row[-1]:
+                    unchanged += 1
+                    continue
+                else:
+                    updated += 1
+                rows.append(row)
+            conn.executemany(self.UPSERT_SQL.format(table=self.table), rows)
+            deleted = self._delete(conn, gone)
+            if due_after is not None:
+                deleted += conn.execute(f'DELETE FROM "{self.table}" WHERE data_vencimento IS NULL OR data_vencimento <= ?',
+                                        (due_after,)).rowcount
+            return UpsertResult(inserted, updated, unchanged, deleted)
+
+        result = self._apply(change)
+        logger.info(f"Upsert into {self.storage_path}: {result._asdict()} (generation {self.generation})")
+        return result
+
+    def delete_ids(self, ids: Iterable[Any], key: str = 'id') -> UpsertResult:
+        """Remove the rows whose `key` is in `ids`, in one transaction."""
+        if key != 'id':
+            raise ValueError("SqliteStorage deletes are keyed by 'id'")
+        doomed = [str(i) for i in ids]
+        result = self._apply(lambda conn: UpsertResult(deleted=self._delete(conn, doomed)))
+        logger.info(f"Deleted {result.deleted} records from {self.storage_path}")
+        return result
+
+def _table_name(path: str) -> str:
+    return re.sub(r"\W", "_", os.path.splitext(os.path.basename(path))[0])
+
+_migrated = set()
+
+def _migrate_from_tinydb(storage: SqliteStorage, path: str) -> None:
+    """Import the TinyDB dataset at `path` the first time its SQLite table is used."""
+    key = (storage.db_path, storage.table)
+    if key in _migrated:
+        return
+    _migrated.add(key)
+    if storage.generation > 0:
+        return
+    if not (os.path.exists(path + CURRENT_SUFFIX) or os.path.exists(path)):
+        return
+    records = Storage(path).iter_all()
+    batch = list(itertools.islice(records, 50000))
+    if not batch:
+        return
+    with storage.writer() as writer:
+        while batch:
+            writer.write_many(batch)
+            batch = list(itertools.islice(records, 50000))
+    logger.info(f"Migrated {writer.count} records from {path} to SQLite table '{storage.table}'")
+
+def _sqlite_storage(path: str) -> SqliteStorage:
+    storage = SqliteStorage(settings.STORAGE_SQLITE_PATH, _table_name(path), dataset_path=path)
+    _migrate_from_tinydb(storage, path)
+    return storage
+
+def get_storage(path: str) -> Union[Storage, SqliteStorage]:
+    """Storage for the dataset at `path`, on the backend selected by STORAGE_BACKEND."""
+    if settings.STORAGE_BACKEND == "sqlite":
+        return _sqlite_storage(path)
     return Storage(path)
@@ -0,0 +1,87 @@
+"""
+Benchmark: /financial/inadiplencia?view=by_date, per-day loop vs. one crosstab.
+
+  loop      - one `.dt.normalize()` + mask + five category counts per report day,
+              as the endpoint used to do (O(days x rows))
+  crosstab  - one `np.bincount` over (days ago x category) cells, as it does now
+
+Both run on the same classified bills and must produce the same JSON.
+
+    python benchmarks/bench_by_date.py --bills 500000 --days 45 180 365
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from bench_columnar import make_bills  # noqa: E402
+from bench_typed_frames import classify_typed, make_contracts  # noqa: E402
+from utils.schema import COLUMN_TYPES, typed_frame  # noqa: E402
+
+CATEGORIES = ["em_dia", "vencimento_padrao", "transicao", "cronico", "desbloqueio_confianca"]
+
+
+def by_date_loop(bills: pd.DataFrame, today: pd.Timestamp, report_days: int) -> list:
+    results = []
+    for i in range(report_days + 1):
+        target_date = today - timedelta(days=i)
+        df_date = bills[bills['data_vencimento'].dt.normalize() == target_date]
+        if df_date.empty:
+            continue
+        results.append({
+            "date": target_date.strftime("%d-%m-%Y"),
+            "total_boletos": len(df_date),
+            "status": {category: int((df_date['category'] == category).sum()) for category in CATEGORIES}
+        })
+    return results
+
+
+def by_date_crosstab(bills: pd.DataFrame, today: pd.Timestamp, report_days: int) -> list:
+    offsets = bills['days_late'].to_numpy(dtype="float64", na_value=np.nan)
+    in_window = (offsets >= 0) & (offsets <= report_days)
+    codes = pd.Categorical(bills['category'], categories=CATEGORIES).codes
+    cells = offsets[in_window].astype(np.int64) * len(CATEGORIES) + codes[in_window]
+    counts = np.bincount(cells, minlength=(report_days + 1) * len(CATEGORIES)).reshape(-1, len(CATEGORIES))
+    return [{
+        "date": (today - timedelta(days=int(i))).strftime("%d-%m-%Y"),
+        "total_boletos": int(counts[i].sum()),
+        "status": {category: int(n) for category, n in zip(CATEGORIES, counts[i])}
+    } for i in np.flatnonzero(counts.sum(axis=1))]
+
+
+def timed(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(args):
+    today = pd.Timestamp.now().normalize()
+    bills = typed_frame(list(make_bills(args.bills)), COLUMN_TYPES["boletos"])
+    contracts = typed_frame(make_contracts(args.bills // 8 + 1), COLUMN_TYPES["contratos"])
+    bills['days_late'] = (today - bills['data_vencimento']).dt.days
+    bills['category'] = classify_typed(bills, contracts, today)
+
+    print(f"{args.bills} bills")
+    print(f"{'days':>5} {'loop (s)':>9} {'crosstab (s)':>13} {'speedup':>8}")
+    for days in args.days:
+        assert by_date_loop(bills, today, days) == by_date_crosstab(bills, today, days)
+        loop = timed(by_date_loop, bills, today, days, repeat=1)
+        crosstab = timed(by_date_crosstab, bills, today, days)
+        print(f"{days:>5} {loop:>9.3f} {crosstab:>13.4f} {loop / crosstab:>7.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bills", type=int, default=500000)
+    parser.add_argument("--days", type=int, nargs="+", default=[45, 180, 365])
+    main(parser.parse_args())
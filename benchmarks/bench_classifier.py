@@ -0,0 +1,62 @@
+"""
+Benchmark: delinquency classification, chained masks vs. one pass.
+
+  chained   - five boolean masks assigned into an object Series with
+              `category[mask] = ...`, as the endpoints used to do
+  one-pass  - `processing.classifier.classify_frame`: bucket codes from
+              `np.digitize` over the thresholds, then one `np.select`,
+              stored as a categorical
+
+Both run on the same bills and must agree (the trust rule is compared with
+trust_requires_active off, which is what the chained version implements).
+
+    python benchmarks/bench_classifier.py --bills 500000
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+from loguru import logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from bench_columnar import make_bills  # noqa: E402
+from bench_typed_frames import classify_typed, make_contracts  # noqa: E402
+from processing.classifier import Thresholds, classify_frame  # noqa: E402
+from utils.schema import COLUMN_TYPES, typed_frame  # noqa: E402
+
+
+def timed(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(args):
+    logger.remove()
+    today = pd.Timestamp.now().normalize()
+    bills = typed_frame(list(make_bills(args.bills)), COLUMN_TYPES["boletos"])
+    contracts = typed_frame(make_contracts(args.bills // 8 + 1), COLUMN_TYPES["contratos"])
+    thresholds = Thresholds(trust_requires_active=False)
+
+    one_pass = classify_frame(bills.copy(), contracts, today, thresholds)['category']
+    assert (classify_typed(bills, contracts, today) == one_pass.astype(object)).all()
+
+    chained = timed(classify_typed, bills, contracts, today)
+    single = timed(lambda: classify_frame(bills.copy(), contracts, today, thresholds))
+    active = timed(lambda: classify_frame(bills.copy(), contracts, today, Thresholds()))
+    print(f"{args.bills} bills")
+    print(f"chained masks          {chained:.3f}s")
+    print(f"one pass               {single:.3f}s ({chained / single:.1f}x)")
+    print(f"one pass, active trust {active:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bills", type=int, default=500000)
+    main(parser.parse_args())
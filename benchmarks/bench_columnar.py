@@ -0,0 +1,116 @@
+"""
+Benchmark: loading bills from the TinyDB snapshot vs. the columnar Arrow snapshot.
+
+Writes N synthetic bills (the fields kept by the ingest allowlist) through
+`Storage.writer()`, which produces both snapshots of the same generation,
+then loads them in fresh subprocesses:
+
+  tinydb   - `Storage.get_all()` + `pd.DataFrame`, as the endpoints did
+  columnar - `read_columns()` of the columns the delinquency metrics use
+
+Each load reports wall time and, over an interpreter that already
+imported pandas/pyarrow, the peak RSS reached while loading and the RSS
+still held afterwards with the frame alive (touched mmap pages included).
+
+    python benchmarks/bench_columnar.py --rows 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND)
+
+METRIC_COLUMNS = ["id_cliente", "data_vencimento", "status", "valor"]
+
+
+def make_bills(count: int):
+    rnd = random.Random(42)
+    today = date.today()
+    for i in range(1, count + 1):
+        due = today - timedelta(days=rnd.randint(-30, 400))
+        paid = rnd.random() < 0.6
+        yield {
+            "id": str(i), "id_cliente": str(rnd.randint(1, count // 8 + 1)),
+            "data_emissao": (due - timedelta(days=20)).isoformat(), "data_vencimento": due.isoformat(),
+            "pagamento_data": (due + timedelta(days=rnd.randint(-5, 10))).isoformat() if paid else "0000-00-00",
+            "valor": f"{rnd.uniform(49.9, 299.9):.2f}", "status": "R" if paid else rnd.choice("AAC"),
+            "ultima_atualizacao": f"{due.isoformat()} 10:{rnd.randint(10, 59)}:00"
+        }
+
+
+def write(path: str, count: int) -> None:
+    from utils.storage import get_storage
+    batch = []
+    with get_storage(path).writer() as writer:
+        for bill in make_bills(count):
+            batch.append(bill)
+            if len(batch) == 50000:
+                writer.write_many(batch)
+                batch = []
+        writer.write_many(batch)
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(mode: str, path: str) -> None:
+    """Runs in a subprocess; prints a JSON line with seconds, RSS growth (peak and held) and shape."""
+    import pandas as pd
+    import pyarrow  # noqa: F401 - imported up front so it is part of the baseline
+    from utils.columnar import read_columns
+    from utils.storage import Storage, current_generation
+
+    base = rss_mb()
+    started = time.perf_counter()
+    if mode == "tinydb":
+        df = pd.DataFrame(Storage(path).get_all())
+    else:
+        df = read_columns(path, current_generation(path), METRIC_COLUMNS)
+    seconds = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": seconds, "peak_mb": max(0.0, peak - base), "held_mb": rss_mb() - base,
+                      "rows": len(df), "columns": len(df.columns)}))
+
+
+def main(args):
+    from loguru import logger
+    logger.remove()
+    print(f"{'rows':>9} {'format':<9} {'file (MB)':>10} {'load (s)':>9} {'peak (MB)':>10} {'held (MB)':>10} {'columns':>8}")
+    for count in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "boletos.json")
+            write(path, count)
+            sizes = {"tinydb": os.path.getsize(os.path.join(tmp, "boletos.000001.json")),
+                     "columnar": os.path.getsize(os.path.join(tmp, "boletos.000001.arrow"))}
+            for mode in ("tinydb", "columnar"):
+                out = subprocess.run([sys.executable, __file__, "--measure", mode, path],
+                                     capture_output=True, text=True, check=True).stdout
+                result = json.loads(out.strip().splitlines()[-1])
+                print(f"{count:>9} {mode:<9} {sizes[mode] / 1e6:>10.1f} {result['seconds']:>9.2f} "
+                      f"{result['peak_mb']:>10.0f} {result['held_mb']:>10.0f} {result['columns']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    parsed = parser.parse_args()
+    if parsed.measure:
+        from loguru import logger
+        logger.remove()
+        measure(*parsed.measure)
+    else:
+        main(parsed)
@@ -0,0 +1,84 @@
+"""
+Benchmark: snapshot write time, read time and size per compression codec.
+
+Writes N synthetic bills as one dataset generation and reads it back:
+
+  tinydb  - `TinyDB.insert_multiple` into a single file, as storage used to
+  plain   - `Storage.writer()` with STORAGE_COMPRESSION=none
+  gzip / zstd / lz4 - the same writer compressing on the fly (codecs that
+            are not installed are skipped)
+
+Reads are timed both as `Storage.get_all()` (whole snapshot parsed at once)
+and as `Storage.iter_all()` (records streamed while decompressing). The
+derived columnar/index files are not written, so only the snapshot is
+measured.
+
+    python benchmarks/bench_compression.py --rows 100000 500000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from bench_columnar import make_bills  # noqa: E402
+from config.settings import settings  # noqa: E402
+from utils import compression  # noqa: E402
+from utils.storage import Storage, snapshot_file  # noqa: E402
+
+
+def write_tinydb(path: str, bills) -> str:
+    from tinydb import TinyDB
+    db = TinyDB(path)
+    db.insert_multiple(bills)
+    db.close()
+    return path
+
+
+def write_snapshot(path: str, bills, codec: str) -> str:
+    settings.STORAGE_COMPRESSION = codec
+    storage = Storage(path)
+    with storage.writer() as writer:
+        for start in range(0, len(bills), 50000):
+            writer.write_many(bills[start:start + 50000])
+    return snapshot_file(path, storage.generation)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main(args):
+    from loguru import logger
+    logger.remove()
+    settings.STORAGE_COLUMNAR = False
+    codecs = ["plain"] + [c for c in compression.EXTENSIONS if compression.available(c)]
+    print(f"{'rows':>9} {'format':<7} {'file (MB)':>10} {'write (s)':>10} {'read (s)':>9} {'stream (s)':>11}")
+    for count in args.rows:
+        bills = list(make_bills(count))
+        for codec in ["tinydb"] + codecs:
+            with tempfile.TemporaryDirectory() as tmp:
+                # 'snapshot' has no schema or lookup index, so only the snapshot file is written
+                path = os.path.join(tmp, "snapshot.json")
+                if codec == "tinydb":
+                    write_seconds, written = timed(write_tinydb, path, bills)
+                    read_seconds, rows = timed(lambda: Storage(path).get_all())
+                    stream_seconds = None
+                else:
+                    write_seconds, written = timed(write_snapshot, path, bills, "none" if codec == "plain" else codec)
+                    read_seconds, rows = timed(lambda: Storage(path).get_all())
+                    stream_seconds, streamed = timed(lambda: sum(1 for _ in Storage(path).iter_all()))
+                    assert streamed == count
+                assert len(rows) == count
+                print(f"{count:>9} {codec:<7} {os.path.getsize(written) / 1e6:>10.1f} {write_seconds:>10.2f} "
+                      f"{read_seconds:>9.2f} {'-' if stream_seconds is None else f'{stream_seconds:.2f}':>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 500000])
+    main(parser.parse_args())
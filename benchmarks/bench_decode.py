@@ -0,0 +1,89 @@
+"""
+Benchmark: buffered vs. incremental decoding of one large IXC page.
+
+Feeds a single wide `fn_areceber` page through `IxcClient._fetch_page` in
+64 KiB chunks, once with the body buffered and decoded as a whole
+(`stream_decode` off) and once with `PageDecoder` yielding projected rows
+as they arrive. Reports the tracemalloc peak above the baseline (the
+encoded body itself is allocated before measuring) and the wall time of
+an untraced run. The push parser costs more CPU than one orjson call; on a
+real sync that work overlaps with the transfer itself.
+
+    python benchmarks/bench_decode.py --rows 5000 --width 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import httpx
+from loguru import logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from ixc.client import IxcClient  # noqa: E402
+from ixc.decoding import ijson  # noqa: E402
+from utils import fastjson  # noqa: E402
+from ixc_standin import make_rows  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+def make_config(stream: bool) -> dict:
+    return {'erp': {
+        'base_url': 'http://ixc.bench',
+        'auth': {'user_id': '1', 'user_token': 'bench'},
+        'http': {'stream_decode': stream},
+        'rate_limit': {'rate': 10000, 'max_rate': 10000, 'burst': 10000}
+    }}
+
+
+def make_transport(body: bytes) -> httpx.MockTransport:
+    chunks = [body[i:i + CHUNK] for i in range(0, len(body), CHUNK)]
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    return httpx.MockTransport(lambda request: httpx.Response(200, content=stream()))
+
+
+async def fetch(body: bytes, stream: bool):
+    async with IxcClient(make_config(stream), transport=make_transport(body)) as client:
+        return await client._fetch_page("fn_areceber", {"rp": "5000"}, 1)
+
+
+def measure(body: bytes, stream: bool):
+    started = time.perf_counter()
+    asyncio.run(fetch(body, stream))
+    wall = time.perf_counter() - started
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    data = asyncio.run(fetch(body, stream))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(data["registros"]), peak - base, wall
+
+
+def main(args):
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    rows = make_rows(args.rows, width=args.width)
+    body = json.dumps({"page": "1", "total": str(len(rows)), "registros": rows}).encode()
+    del rows
+    print(f"page: {args.rows} rows, {len(body) / 1e6:.1f} MB; "
+          f"ijson backend: {ijson.backend if ijson else 'missing'}; json: {fastjson.BACKEND}")
+    print(f"{'mode':<9} {'records':>8} {'peak (MB)':>10} {'wall (s)':>9}")
+    for name, stream in (("buffered", False), ("streamed", True)):
+        count, peak, wall = measure(body, stream)
+        print(f"{name:<9} {count:>8} {peak / 1e6:>10.1f} {wall:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--width", type=int, default=60)
+    main(parser.parse_args())
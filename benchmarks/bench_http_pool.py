@@ -0,0 +1,82 @@
+"""
+Benchmark: per-page `httpx.AsyncClient` vs. the pooled IxcClient.
+
+Runs a full listing of a synthetic `fn_areceber` table against the local
+stand-in server and reports TCP connections opened and wall time for both
+strategies. `--connect-delay` emulates the handshake cost of a remote,
+TLS-terminated IXC instance (the stand-in itself is plain HTTP on loopback).
+
+    python benchmarks/bench_http_pool.py --rows 20000 --page-size 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from loguru import logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from config.settings import settings  # noqa: E402
+from ixc.client import IxcClient  # noqa: E402
+from ixc_standin import IxcStandin, make_rows  # noqa: E402
+
+
+class PerPageClient(IxcClient):
+    """The previous behaviour: a brand-new AsyncClient (and connection) per page."""
+
+    async def _fetch_page(self, endpoint, query_params, page):
+        params = query_params.copy()
+        params['page'] = str(page)
+        params.setdefault('rp', str(self.default_page_size))
+        await self._rate_limit()
+        async with httpx.AsyncClient(timeout=settings.HTTP_TIMEOUT) as client:
+            response = await client.post(f"{self.base_url}/webservice/v1/{endpoint}", headers=self._get_headers(), json=params)
+            response.raise_for_status()
+            return response.json()
+
+
+def make_config(base_url: str, page_size: int) -> dict:
+    return {'erp': {
+        'base_url': base_url,
+        'auth': {'user_id': '1', 'user_token': 'bench'},
+        'request_param': {'default_page_size': page_size},
+        'http': settings.IXC_CONFIG['erp'].get('http', {}),
+        # Measure transport cost only
+        'rate_limit': {'rate': 10000, 'max_rate': 10000, 'burst': 10000}
+    }}
+
+
+async def run(client_cls, server: IxcStandin, page_size: int):
+    server.reset_counters()
+    client = client_cls(make_config(server.base_url, page_size))
+    start = time.perf_counter()
+    try:
+        records = await client.list_all("fn_areceber", {"sortname": "fn_areceber.id", "sortorder": "asc"})
+    finally:
+        await client.aclose()
+    return len(records), server.connections, server.requests, time.perf_counter() - start
+
+
+async def main(args):
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    server = IxcStandin({"fn_areceber": make_rows(args.rows, width=20)}, connect_delay=args.connect_delay / 1000)
+    await server.start()
+    try:
+        print(f"{'strategy':<12} {'records':>8} {'conns':>6} {'reqs':>6} {'wall (s)':>9}")
+        for name, cls in (("per-page", PerPageClient), ("pooled", IxcClient)):
+            records, conns, reqs, wall = await run(cls, server, args.page_size)
+            print(f"{name:<12} {records:>8} {conns:>6} {reqs:>6} {wall:>9.3f}")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--connect-delay", type=float, default=20.0, help="emulated handshake cost per connection, in ms")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,80 @@
+"""
+Benchmark: offset (`page`/`rp`) vs. keyset (`id > last_id`) pagination.
+
+Lists a large synthetic `fn_areceber` table from the local stand-in, whose
+offset handling walks and discards every row before the requested page the
+way OFFSET does in SQL, while the keyset filter seeks the id index. Reports
+wall time plus the median and last-page latency for each mode.
+
+    python benchmarks/bench_keyset.py --rows 300000 --page-size 1000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from loguru import logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from ixc.client import IxcClient  # noqa: E402
+from ixc_standin import IxcStandin, make_rows  # noqa: E402
+
+
+def make_config(base_url: str, page_size: int, keyset: bool) -> dict:
+    return {'erp': {
+        'base_url': base_url,
+        'auth': {'user_id': '1', 'user_token': 'bench'},
+        'request_param': {
+            'default_page_size': page_size,
+            'page_concurrency': 1,
+            'keyset_endpoints': ['fn_areceber'] if keyset else []
+        },
+        'fields': {'fn_areceber': ['*']},
+        'rate_limit': {'rate': 10000, 'max_rate': 10000, 'burst': 10000}
+    }}
+
+
+class TimedClient(IxcClient):
+    async def _fetch_page(self, endpoint, query_params, page):
+        started = time.perf_counter()
+        data = await super()._fetch_page(endpoint, query_params, page)
+        self.page_times.append(time.perf_counter() - started)
+        return data
+
+
+async def run(server: IxcStandin, page_size: int, keyset: bool):
+    client = TimedClient(make_config(server.base_url, page_size, keyset))
+    client.page_times = []
+    query = {"sortname": "fn_areceber.id", "sortorder": "asc"}
+    start = time.perf_counter()
+    count = 0
+    try:
+        async for page in client.iter_pages("fn_areceber", query):
+            count += len(page)
+    finally:
+        await client.aclose()
+    return count, time.perf_counter() - start, client.page_times
+
+
+async def main(args):
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    server = IxcStandin({"fn_areceber": make_rows(args.rows, width=4)})
+    await server.start()
+    try:
+        print(f"{'mode':<8} {'records':>8} {'pages':>6} {'wall (s)':>9} {'p50 (ms)':>9} {'last (ms)':>10}")
+        for name, keyset in (("offset", False), ("keyset", True)):
+            count, wall, times = await run(server, args.page_size, keyset)
+            print(f"{name:<8} {count:>8} {len(times):>6} {wall:>9.2f} {statistics.median(times) * 1000:>9.1f} {times[-1] * 1000:>10.1f}")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,113 @@
+"""
+Benchmark: raw string DataFrames vs. the schema-typed loader.
+
+Builds bills and contracts the way the endpoints used to (every column a
+Python string, `pd.to_datetime`/`.astype(str)` per request) and through
+`utils.schema.typed_frame`, then compares:
+
+  memory          - `memory_usage(deep=True)` of bills + contracts
+  join            - bills mapped to their client's contract status
+  classification  - days late + trust/aging masks of /financial/inadiplencia
+
+    python benchmarks/bench_typed_frames.py --bills 500000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from bench_columnar import make_bills  # noqa: E402
+from utils.schema import COLUMN_TYPES, typed_frame  # noqa: E402
+
+
+def make_contracts(count: int):
+    rnd = random.Random(7)
+    return [{"id": str(i), "id_cliente": str(i), "status": "A", "status_internet": rnd.choice("AAAACFD"),
+             "desbloqueio_confianca": "N", "desbloqueio_confianca_ativo": rnd.choice("SNNNNNNNNN"),
+             "ultima_atualizacao": "2024-01-01 00:00:00"} for i in range(1, count + 1)]
+
+
+def classify_raw(bills: pd.DataFrame, contracts: pd.DataFrame, today: pd.Timestamp) -> pd.Series:
+    due = pd.to_datetime(bills['data_vencimento'], errors='coerce')
+    days_late = (today - due).dt.days
+    trust = set(contracts[contracts['desbloqueio_confianca_ativo'] == 'S']['id_cliente'].astype(str).unique())
+    overdue = (bills['status'] == 'A') & (days_late >= 1)
+    trust_mask = bills['id_cliente'].astype(str).isin(trust)
+    category = pd.Series('em_dia', index=bills.index)
+    category[overdue & trust_mask] = 'desbloqueio_confianca'
+    late = overdue & ~trust_mask
+    category[late & (days_late <= 6)] = 'vencimento_padrao'
+    category[late & (days_late >= 7) & (days_late <= 10)] = 'transicao'
+    category[late & (days_late >= 11)] = 'cronico'
+    return category
+
+
+def classify_typed(bills: pd.DataFrame, contracts: pd.DataFrame, today: pd.Timestamp) -> pd.Series:
+    days_late = (today - bills['data_vencimento']).dt.days
+    trust = contracts.loc[contracts['desbloqueio_confianca_ativo'] == 'S', 'id_cliente'].unique()
+    overdue = (bills['status'] == 'A') & (days_late >= 1)
+    trust_mask = bills['id_cliente'].isin(trust)
+    category = pd.Series('em_dia', index=bills.index)
+    category[overdue & trust_mask] = 'desbloqueio_confianca'
+    late = overdue & ~trust_mask
+    category[late & (days_late <= 6)] = 'vencimento_padrao'
+    category[late & (days_late >= 7) & (days_late <= 10)] = 'transicao'
+    category[late & (days_late >= 11)] = 'cronico'
+    return category
+
+
+def join_raw(bills: pd.DataFrame, contracts: pd.DataFrame) -> pd.Series:
+    status = {str(k): v for k, v in contracts.set_index('id_cliente')['status_internet'].to_dict().items()}
+    return bills['id_cliente'].astype(str).map(lambda x: status.get(x, "N/A"))
+
+
+def join_typed(bills: pd.DataFrame, contracts: pd.DataFrame) -> pd.Series:
+    status = contracts.drop_duplicates('id_cliente', keep='last').set_index('id_cliente')['status_internet']
+    return bills['id_cliente'].map(status)
+
+
+def timed(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def mb(*frames: pd.DataFrame) -> float:
+    return sum(df.memory_usage(deep=True).sum() for df in frames) / 1e6
+
+
+def main(args):
+    bill_rows = list(make_bills(args.bills))
+    contract_rows = make_contracts(args.bills // 8 + 1)
+    today = pd.Timestamp.now().normalize()
+
+    raw_bills, raw_contracts = pd.DataFrame(bill_rows), pd.DataFrame(contract_rows)
+    started = time.perf_counter()
+    bills = typed_frame(bill_rows, COLUMN_TYPES["boletos"])
+    contracts = typed_frame(contract_rows, COLUMN_TYPES["contratos"])
+    load = time.perf_counter() - started
+
+    assert (classify_raw(raw_bills, raw_contracts, today) == classify_typed(bills, contracts, today)).all()
+    print(f"{args.bills} bills, {len(contract_rows)} contracts (typed load, once per generation: {load:.2f}s)")
+    print(f"{'':<16} {'raw':>10} {'typed':>10} {'ratio':>7}")
+    rows = [
+        ("memory (MB)", mb(raw_bills, raw_contracts), mb(bills, contracts)),
+        ("join (s)", timed(join_raw, raw_bills, raw_contracts), timed(join_typed, bills, contracts)),
+        ("classify (s)", timed(classify_raw, raw_bills, raw_contracts, today), timed(classify_typed, bills, contracts, today)),
+    ]
+    for name, raw, typed in rows:
+        print(f"{name:<16} {raw:>10.3f} {typed:>10.3f} {raw / typed:>6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bills", type=int, default=500000)
+    main(parser.parse_args())
@@ -0,0 +1,69 @@
+"""
+Benchmark: inadiplencia over a due-date window, whole table vs. timeline.
+
+  table     - classify every bill, then count the window's days (what the
+              endpoint did for any request: cost grows with the table)
+  timeline  - two binary searches on the due-date sorted `BillTimeline`
+              and the window's slice only (cost grows with the window)
+
+Both produce the same by_date JSON.
+
+    python benchmarks/bench_windows.py --bills 500000 --days 7 90 365
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+from loguru import logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from bench_by_date import by_date_crosstab  # noqa: E402
+from bench_columnar import make_bills  # noqa: E402
+from bench_typed_frames import make_contracts  # noqa: E402
+from config.settings import settings  # noqa: E402
+from processing.classifier import classify_frame, default_thresholds  # noqa: E402
+from processing.delinquency import by_date_view  # noqa: E402
+from processing.timeline import BillTimeline  # noqa: E402
+from utils.schema import COLUMN_TYPES, typed_frame  # noqa: E402
+
+
+def timed(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def by_date_table(bills: pd.DataFrame, contracts: pd.DataFrame, today: pd.Timestamp, days: int) -> list:
+    return by_date_crosstab(classify_frame(bills.copy(deep=False), contracts, today), today, days)
+
+
+def main(args):
+    logger.remove()
+    today = pd.Timestamp.now().normalize()
+    bills = typed_frame(list(make_bills(args.bills)), COLUMN_TYPES["boletos"])
+    contracts = typed_frame(make_contracts(args.bills // 8 + 1), COLUMN_TYPES["contratos"])
+
+    started = time.perf_counter()
+    timeline = BillTimeline.build(bills, contracts, default_thresholds())
+    print(f"{args.bills} bills, timeline built once per generation in {time.perf_counter() - started:.3f}s")
+    print(f"{'days':>5} {'table (s)':>10} {'timeline (s)':>13} {'speedup':>8}")
+    for days in args.days:
+        settings.REPORT_DAYS = days
+        start = today - pd.Timedelta(days=days)
+        assert by_date_table(bills, contracts, today, days) == by_date_view(timeline, today, start, today)
+        table = timed(by_date_table, bills, contracts, today, days)
+        window = timed(by_date_view, timeline, today, start, today)
+        print(f"{days:>5} {table:>10.3f} {window:>13.4f} {table / window:>7.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bills", type=int, default=500000)
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 90, 365])
+    main(parser.parse_args())
@@ -0,0 +1,124 @@
+"""
+Local stand-in for the IXC webservice used by the benchmarks.
+
+Implements just enough of HTTP/1.1 (keep-alive, Content-Length bodies) and of
+the IXC listing protocol (`page`/`rp`, `total`, `registros`) to drive
+`IxcClient` without touching a real ERP. Connection and request counters let
+benchmarks report how many TCP connections a sync actually opened.
+"""
+import asyncio
+import bisect
+import json
+from typing import Any, Dict, List, Optional
+
+
+def make_rows(count: int, width: int = 40) -> List[Dict[str, Any]]:
+    """Build `count` IXC-like rows with `width` string columns each."""
+    rows = []
+    for i in range(1, count + 1):
+        row = {"id": str(i), "id_cliente": str(1000 + i % 5000), "status": "A"}
+        for c in range(width):
+            row[f"campo_{c}"] = f"valor {c} do registro {i}"
+        rows.append(row)
+    return rows
+
+
+class IxcStandin:
+    """Minimal asyncio HTTP server answering `POST /webservice/v1/<endpoint>`."""
+
+    def __init__(self, tables: Dict[str, List[Dict[str, Any]]], latency: float = 0.0, connect_delay: float = 0.0):
+        self.tables = tables
+        self.latency = latency              # per-request server think time
+        self.connect_delay = connect_delay  # emulates TCP/TLS handshake round trips
+        self.connections = 0
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._id_index: Dict[str, List[int]] = {}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def reset_counters(self) -> None:
+        self.connections = 0
+        self.requests = 0
+
+    def query(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer one listing request the way a SQL backend would.
+
+        Tables are stored in id order, like a clustered primary key. An
+        `<endpoint>.id > N` grid condition seeks straight to N (index range
+        scan); a `page` offset has to walk and discard every preceding row,
+        which is what makes deep offset pages slow on the real ERP.
+        """
+        rows = self.tables.get(endpoint, [])
+        page = int(params.get("page", 1))
+        rp = int(params.get("rp", 100))
+
+        start = 0
+        for cond in json.loads(params.get("grid_param") or "[]"):
+            if cond.get("TB") == f"{endpoint}.id" and cond.get("OP") == ">":
+                ids = self._ids(endpoint)
+                start = max(start, bisect.bisect_right(ids, int(cond["P"])))
+
+        offset = (page - 1) * rp
+        position = start
+        skipped = 0
+        # Row-by-row skip, as OFFSET does: every discarded row is still read
+        while skipped < offset and position < len(rows):
+            if rows[position]["status"] is not None:
+                skipped += 1
+            position += 1
+        return {"page": str(page), "total": str(len(rows) - start), "registros": rows[position:position + rp]}
+
+    def _ids(self, endpoint: str) -> List[int]:
+        if endpoint not in self._id_index:
+            self._id_index[endpoint] = [int(r["id"]) for r in self.tables[endpoint]]
+        return self._id_index[endpoint]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        if self.connect_delay:
+            await asyncio.sleep(self.connect_delay)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                path = lines[0].split(" ")[1]
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                endpoint = path.rstrip("/").rsplit("/", 1)[-1]
+                payload = json.dumps(self.query(endpoint, json.loads(body or b"{}"))).encode()
+                keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n".encode()
+                    + (b"Connection: keep-alive\r\n\r\n" if keep_alive else b"Connection: close\r\n\r\n")
+                    + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
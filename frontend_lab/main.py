@@ -1,8 +1,9 @@
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 import os
 import httpx
+from typing import Optional
 
 app = FastAPI(title="Servidor do Frontend Lab")
 
@@ -20,23 +21,33 @@ async def read_index():
             return f.read()
     return "<h1>index.html não encontrado na pasta static</h1>"
 
+# Conditional-request headers travel both ways, so browsers get the backend's 304s
+FORWARDED_REQUEST_HEADERS = ("if-none-match", "if-modified-since")
+FORWARDED_RESPONSE_HEADERS = ("etag", "last-modified", "cache-control")
+
+async def proxy_get(request: Request, path: str, params: dict, timeout: float = 5.0) -> Response:
+    headers = {name: request.headers[name] for name in FORWARDED_REQUEST_HEADERS if name in request.headers}
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        response = await client.get(f"{API_BASE_URL}{path}", params=params, headers=headers)
+    forwarded = {name: response.headers[name] for name in FORWARDED_RESPONSE_HEADERS if name in response.headers}
+    if response.status_code == 304:
+        return Response(status_code=304, headers=forwarded)
+    return Response(content=response.content, status_code=response.status_code, headers=forwarded,
+                    media_type=response.headers.get("content-type", "application/json"))
+
 @app.get("/api/metrics")
-async def get_metrics(view: str = "total"):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_BASE_URL}/financial/inadiplencia", params={"view": view})
-        return response.json()
+async def get_metrics(request: Request, view: str = "total", start: Optional[str] = None,
+                      end: Optional[str] = None, as_of: Optional[str] = None):
+    params = {"view": view, "start": start, "end": end, "as_of": as_of}
+    return await proxy_get(request, "/financial/inadiplencia", {k: v for k, v in params.items() if v is not None})
 
 @app.get("/api/details")
-async def get_details(date: str):
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(f"{API_BASE_URL}/financial/detalhes", params={"date": date})
-        return response.json()
+async def get_details(request: Request, date: str):
+    return await proxy_get(request, "/financial/detalhes", {"date": date}, timeout=30.0)
 
 @app.get("/api/detalhes")
-async def get_detalhes(date: str):
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(f"{API_BASE_URL}/financial/detalhes", params={"date": date})
-        return response.json()
+async def get_detalhes(request: Request, date: str):
+    return await proxy_get(request, "/financial/detalhes", {"date": date}, timeout=30.0)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Backend modules import each other as top-level packages (config, ixc, utils),
+# exactly as they do inside the backend container where PYTHONPATH=/app.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
@@ -0,0 +1,22 @@
+from utils.cache import DatasetCache
+from utils.storage import get_storage
+
+
+def test_cache_is_reused_until_a_new_generation_is_published(tmp_path):
+    path = str(tmp_path / "boletos.json")
+    get_storage(path).save_all([{"id": "1", "data_vencimento": "2024-01-10"}])
+    cache = DatasetCache()
+
+    first = cache.get(path)
+    first["days_late"] = 3  # callers may add columns to their copy
+    second = cache.get(path)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert "days_late" not in second.columns
+    assert str(second["data_vencimento"].dtype).startswith("datetime64")
+
+    get_storage(path).save_all([{"id": "1"}, {"id": "2"}])
+    assert len(cache.get(path)) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    stats = cache.stats()["entries"][path]
+    assert stats["generation"] == 2 and stats["rows"] == 2 and stats["memory_bytes"] > 0
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from processing.classifier import CATEGORIES, Thresholds, classify_codes, classify_frame
+
+
+def test_bucket_boundaries_and_em_dia():
+    days = [np.nan, -3, 0, 1, 6, 7, 10, 11, 400, 30]
+    is_open = [True] * 9 + [False]
+    codes = classify_codes(days, is_open, [False] * len(days), Thresholds())
+    assert [CATEGORIES[c] for c in codes] == [
+        "em_dia", "em_dia", "em_dia", "vencimento_padrao", "vencimento_padrao",
+        "transicao", "transicao", "cronico", "cronico", "em_dia"
+    ]
+    codes = classify_codes([3, 4, 9], [True] * 3, [False] * 3, Thresholds(padrao_max=3, transicao_max=8))
+    assert [CATEGORIES[c] for c in codes] == ["vencimento_padrao", "transicao", "cronico"]
+
+
+def test_trust_requires_the_first_contract_active():
+    today = pd.Timestamp("2026-10-17")
+    bills = pd.DataFrame({
+        "id_cliente": ["1", "2", "3"],
+        "status": ["A", "A", "A"],
+        "data_vencimento": pd.to_datetime(["2026-10-01", "2026-10-01", "2026-10-20"])
+    })
+    contracts = pd.DataFrame({
+        "id_cliente": ["1", "2", "2", "3"],
+        "desbloqueio_confianca_ativo": ["S", "N", "S", "S"],
+        "status_internet": ["A", "CM", "A", "A"]
+    })
+    categories = classify_frame(bills.copy(), contracts, today, Thresholds())['category'].tolist()
+    assert categories == ["desbloqueio_confianca", "cronico", "em_dia"]
+    categories = classify_frame(bills.copy(), contracts, today, Thresholds(trust_requires_active=False))['category'].tolist()
+    assert categories == ["desbloqueio_confianca", "desbloqueio_confianca", "em_dia"]
+
+
+def test_daily_report_buckets():
+    today = pd.Timestamp("2026-10-17")
+    bills = pd.DataFrame({
+        "id_cliente": ["1", "1", "1", "1", "1", "2"],
+        "status": ["R", "A", "A", "A", "A", "A"],
+        "data_vencimento": today - pd.to_timedelta([0, 2, 8, 12, 0, 3], unit="D")
+    })
+    contracts = pd.DataFrame({
+        "id_cliente": ["1", "2"],
+        "desbloqueio_confianca_ativo": ["N", "S"],
+        "status_internet": ["A", "A"]
+    })
+    categories = classify_frame(bills, contracts, today, Thresholds())['category']
+    assert categories.tolist() == ["em_dia", "vencimento_padrao", "transicao", "cronico", "em_dia", "desbloqueio_confianca"]
+    assert categories.value_counts()[CATEGORIES].tolist() == [2, 1, 1, 1, 1]
+
+
+def test_suspension_funnel_amounts():
+    today = pd.Timestamp("2026-10-17")
+    bills = pd.DataFrame({
+        "id_cliente": ["101", "102", "103", "104", "105", "106", "107"],
+        "valor": [100.0, 200.0, 150.0, 300.0, 500.0, 120.0, 50.0],
+        "status": ["R", "R", "A", "A", "A", "A", "C"],
+        "data_vencimento": today - pd.to_timedelta([5, 10, 5, 7, 15, -5, 1], unit="D")
+    })
+    df = classify_frame(bills, pd.DataFrame(), today, Thresholds(padrao_max=6, transicao_max=9))
+    funnel = df.groupby('category', observed=False)['valor'].sum()
+    assert funnel.to_dict() == {"em_dia": 470.0, "vencimento_padrao": 150.0, "transicao": 300.0,
+                                "cronico": 500.0, "desbloqueio_confianca": 0.0}
@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from config.settings import settings  # noqa: E402
+from utils.columnar import columnar_path, read_columns  # noqa: E402
+from utils.storage import get_storage  # noqa: E402
+
+
+def test_sync_writes_a_typed_columnar_snapshot_per_generation(tmp_path):
+    path = str(tmp_path / "boletos.json")
+    with get_storage(path).writer() as writer:
+        writer.write_many([{"id": "1", "id_cliente": "10", "valor": "99.90", "status": "A",
+                            "data_vencimento": "2024-03-01", "pagamento_data": "0000-00-00", "obs": "ignored"}])
+        writer.write_many([{"id": "2", "id_cliente": "", "valor": "10", "status": "R",
+                            "data_vencimento": "2024-03-05 00:00:00", "pagamento_data": "2024-03-04"}])
+
+    df = read_columns(path, 1, ["id_cliente", "valor", "status", "data_vencimento", "pagamento_data"])
+    assert list(df.columns) == ["id_cliente", "valor", "status", "data_vencimento", "pagamento_data"]
+    assert df["id_cliente"].tolist()[0] == 10 and df["id_cliente"].isna().tolist() == [False, True]
+    assert df["valor"].tolist() == [99.9, 10.0]
+    assert str(df["status"].dtype) == "category"
+    assert df["data_vencimento"].dt.strftime("%Y-%m-%d").tolist() == ["2024-03-01", "2024-03-05"]
+    assert df["pagamento_data"].isna().tolist() == [True, False]
+
+    get_storage(path).save_all([{"id": "3"}])
+    get_storage(path).save_all([{"id": "4"}])
+    assert read_columns(path, 1) is None  # pruned with its generation
+    assert read_columns(path, 3, ["id"])["id"].tolist() == [4]
+    assert not (tmp_path / "boletos.000003.arrow.tmp").exists() and columnar_path(path, 3).endswith(".arrow")
+
+
+def test_backends_keep_their_columnar_snapshots_apart(tmp_path, monkeypatch):
+    path = str(tmp_path / "boletos.json")
+    get_storage(path).save_all([{"id": "1"}])
+    get_storage(path).save_all([{"id": "2"}])
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "STORAGE_SQLITE_PATH", str(tmp_path / "ixc.sqlite3"))
+    get_storage(path).save_all([{"id": "3"}])  # generation 2 again, after importing TinyDB's as 1
+    assert columnar_path(path, 1).endswith("boletos.sqlite.000001.arrow")
+    assert read_columns(path, 1, ["id"])["id"].tolist() == [2]
+    assert read_columns(path, 2, ["id"])["id"].tolist() == [3]
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "tinydb")
+    assert read_columns(path, 1, ["id"])["id"].tolist() == [1]
+    assert read_columns(path, 2, ["id"])["id"].tolist() == [2]
+
+
+def test_datasets_without_a_schema_get_no_columnar_snapshot(tmp_path):
+    path = str(tmp_path / "tipos.json")
+    get_storage(path).save_all([{"id": "1"}])
+    assert read_columns(path, 1) is None
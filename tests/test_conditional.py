@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+import main
+from config.settings import settings
+from utils.storage import get_storage
+
+
+def test_reports_answer_304_until_the_data_changes(tmp_path, monkeypatch):
+    for name, attr in (("clientes", "STORAGE_PATH_CLIENTES"), ("contratos", "STORAGE_PATH_CONTRATOS"), ("boletos", "STORAGE_PATH_BOLETOS")):
+        monkeypatch.setattr(settings, attr, str(tmp_path / f"{name}.json"))
+    monkeypatch.setattr(settings, "MATERIALIZE_METRICS", False)
+    due = date.today() - timedelta(days=3)
+    get_storage(settings.STORAGE_PATH_CONTRATOS).save_all([{"id": "1", "id_cliente": "1", "status_internet": "A"}])
+    get_storage(settings.STORAGE_PATH_BOLETOS).save_all([{"id": "1", "id_cliente": "1", "status": "A", "data_vencimento": due.isoformat()}])
+    client = TestClient(main.app)
+
+    first = client.get("/financial/inadiplencia", params={"view": "total"})
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["cache-control"] == settings.REPORT_CACHE_CONTROL
+    assert "last-modified" in first.headers
+
+    again = client.get("/financial/inadiplencia", params={"view": "total"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+    # Other params are other representations
+    by_date = client.get("/financial/inadiplencia", headers={"If-None-Match": etag})
+    assert by_date.status_code == 200 and by_date.headers["etag"] != etag
+
+    details = client.get("/financial/detalhes", params={"date": due.strftime("%d-%m-%Y")})
+    assert details.status_code == 200 and len(details.json()) == 1
+    assert client.get("/financial/detalhes", params={"date": due.strftime("%d-%m-%Y")},
+                      headers={"If-None-Match": details.headers["etag"]}).status_code == 304
+
+    get_storage(settings.STORAGE_PATH_BOLETOS).save_all([{"id": "2", "id_cliente": "1", "status": "R", "data_vencimento": due.isoformat()}])
+    changed = client.get("/financial/inadiplencia", params={"view": "total"}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers.get("etag") != etag
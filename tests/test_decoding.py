@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from ixc.decoding import PageDecoder, ijson
+
+
+def chunked(payload, size=7):
+    body = json.dumps(payload).encode()
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def decode(payload, fields=None, stream=True):
+    decoder = PageDecoder(fields, stream=stream)
+    records = []
+    for chunk in chunked(payload):
+        records.extend(decoder.feed(chunk))
+    data = decoder.close()
+    if decoder.stream:
+        data['registros'] = records
+    return data, decoder
+
+
+@pytest.mark.skipif(ijson is None, reason="ijson not installed")
+def test_records_are_yielded_while_the_body_arrives():
+    rows = [{"id": str(i), "status": "A", "obs": "x" * 50} for i in range(1, 21)]
+    body = json.dumps({"page": "1", "total": "20", "registros": rows}).encode()
+    decoder = PageDecoder(["id", "status"])
+
+    first = decoder.feed(body[:len(body) // 2])
+    rest = decoder.feed(body[len(body) // 2:])
+    data = decoder.close()
+
+    assert 0 < len(first) < 20
+    assert first + rest == [{"id": str(i), "status": "A"} for i in range(1, 21)]
+    assert data == {"registros": [], "total": 20}
+    assert decoder.nbytes == len(body)
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_streamed_and_buffered_decoding_agree(stream):
+    rows = [{"id": str(i), "valor": "10.50", "extra": i} for i in range(1, 6)]
+    data, _ = decode({"page": "1", "total": "5", "registros": rows}, ["id", "valor"], stream=stream)
+
+    assert data["registros"] == [{"id": str(i), "valor": "10.50"} for i in range(1, 6)]
+    assert int(data["total"]) == 5
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_error_and_empty_bodies_are_returned_whole(stream):
+    error, _ = decode({"type": "error", "message": "Sem permissão"}, stream=stream)
+    empty, _ = decode({"page": "1", "total": 0}, stream=stream)
+
+    assert error["type"] == "error" and error["message"] == "Sem permissão"
+    assert int(empty["total"]) == 0 and not empty.get("registros")
+
+
+@pytest.mark.skipif(ijson is None, reason="ijson not installed")
+def test_truncated_body_raises_value_error():
+    body = json.dumps({"total": "2", "registros": [{"id": "1"}, {"id": "2"}]}).encode()
+    decoder = PageDecoder()
+    decoder.feed(body[:-10])
+    with pytest.raises(ValueError):
+        decoder.close()
@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from utils.history import HistoryStore
+
+
+def test_days_are_delta_encoded_and_rebuilt_as_of(tmp_path):
+    history = HistoryStore(str(tmp_path), "boletos", keyframe_days=3, retention_days=365)
+    start = date(2024, 3, 1)
+    states = {}
+    bills = {str(i): {"id": str(i), "status": "A"} for i in range(10)}
+    for offset in range(5):
+        day = start + timedelta(days=offset)
+        bills[str(offset)] = {"id": str(offset), "status": "R"}  # one bill paid per day
+        if offset == 2:
+            bills.pop("9")
+        states[day] = list(bills.values())
+        history.record(states[day], day)
+
+    assert [d.kind for d in history.days()] == ["key", "delta", "delta", "key", "delta"]
+    for day, records in states.items():
+        assert history.as_of(day) == records
+    # Days without a snapshot read as the last recorded day before them
+    assert history.as_of(start + timedelta(days=30)) == states[start + timedelta(days=4)]
+    assert history.as_of(start - timedelta(days=1)) is None
+
+    # Recording a day again replaces it
+    history.record([{"id": "1", "status": "C"}], start + timedelta(days=4))
+    assert history.as_of(start + timedelta(days=4)) == [{"id": "1", "status": "C"}]
+    assert len(history.days()) == 5
+
+
+def test_retention_keeps_the_keyframe_of_the_oldest_retained_day(tmp_path):
+    history = HistoryStore(str(tmp_path), "contratos", keyframe_days=3, retention_days=1)
+    start = date(2024, 3, 1)
+    records = [{"id": str(i), "status_internet": "A"} for i in range(10)]
+    for offset in range(6):
+        records[offset] = {"id": str(offset), "status_internet": "CM"}
+        history.record(list(records), start + timedelta(days=offset))
+
+    # The oldest retained day (4) is a delta: the keyframe of day 3 it is rebuilt from stays
+    assert [(d.day - start).days for d in history.days()] == [3, 4, 5]
+    assert history.as_of(start + timedelta(days=4))[4] == {"id": "4", "status_internet": "CM"}
@@ -0,0 +1,57 @@
+import os
+
+from config.settings import settings
+from utils.cache import DatasetCache
+from utils.indexes import index_path, read_index
+from utils.storage import get_storage
+
+
+def test_sync_writes_lookup_indexes_per_generation(tmp_path):
+    contracts = str(tmp_path / "contratos.json")
+    get_storage(contracts).save_all([
+        {"id": "1", "id_cliente": "10", "status_internet": "A", "desbloqueio_confianca_ativo": "N"},
+        {"id": "2", "id_cliente": "10", "status_internet": "CM", "desbloqueio_confianca_ativo": "S"},
+        {"id": "3", "id_cliente": "", "status_internet": "A"},
+    ])
+    assert read_index(contracts, 1) == {"by_cliente": {"10": ["CM", "A", True]}}
+
+    bills = str(tmp_path / "boletos.json")
+    with get_storage(bills).writer() as writer:
+        writer.write_many([{"id": "1", "id_cliente": "10", "status": "A", "data_vencimento": "2024-03-01"}])
+        writer.write_many([{"id": "2", "id_cliente": "11", "status": "R", "data_vencimento": "2024-03-01 00:00:00"},
+                           {"id": "3", "id_cliente": "10", "status": "A", "data_vencimento": "0000-00-00"}])
+    assert read_index(bills, 1) == {"by_due": {"2024-03-01": [["1", "10", "A"], ["2", "11", "R"]]}}
+
+    get_storage(bills).save_all([])
+    get_storage(bills).save_all([])
+    assert not (tmp_path / "boletos.000001.index.json").exists()
+
+
+def test_backends_keep_their_indexes_apart(tmp_path, monkeypatch):
+    path = str(tmp_path / "clientes.json")
+    get_storage(path).save_all([{"id": "7", "razao": "Antigo"}])
+    get_storage(path).save_all([{"id": "7", "razao": "Cliente"}])
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "STORAGE_SQLITE_PATH", str(tmp_path / "ixc.sqlite3"))
+    get_storage(path).save_all([{"id": "7", "razao": "Novo"}])  # generation 2 again, after importing TinyDB's as 1
+    assert index_path(path, 1).endswith("clientes.sqlite.000001.index.json")
+    assert read_index(path, 1) == {"by_id": {"7": ["Cliente", "", ""]}}
+    assert read_index(path, 2) == {"by_id": {"7": ["Novo", "", ""]}}
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "tinydb")
+    assert read_index(path, 1) == {"by_id": {"7": ["Antigo", "", ""]}}
+    assert read_index(path, 2) == {"by_id": {"7": ["Cliente", "", ""]}}
+
+
+def test_cache_builds_indexes_for_data_without_them(tmp_path):
+    path = tmp_path / "clientes.json"
+    path.write_text('{"_default": {"1": {"id": "7", "razao": "Cliente", "telefone_celular": "", "fone": "3333"}}}')
+    cache = DatasetCache()
+
+    assert cache.index(str(path)) == {"by_id": {"7": ["Cliente", "3333", ""]}}
+    assert cache.index(str(path)) is cache.index(str(path))
+
+    get_storage(str(path)).save_all([{"id": "7", "razao": "Outro", "bairro": "Centro"}])
+    assert os.path.exists(index_path(str(path), 1))
+    assert cache.index(str(path)) == {"by_id": {"7": ["Outro", "", "Centro"]}}
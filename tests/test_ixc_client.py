@@ -0,0 +1,283 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from ixc.client import IxcClient
+from ixc.exceptions import IxcRequestError, PageBudgetExceeded
+
+
+def make_config(page_size=2, **request_param):
+    return {'erp': {
+        'base_url': 'http://ixc.test',
+        'auth': {'user_id': '1', 'user_token': 'token'},
+        'request_param': {'default_page_size': page_size, **request_param},
+        'rate_limit': {'rate': 1000, 'max_rate': 1000, 'burst': 1000},
+        'retry': {'max_retries': 2, 'backoff_base': 0.001, 'backoff_max': 0.001}
+    }}
+
+
+def make_transport(rows, calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        calls.append(params)
+        page, rp = int(params['page']), int(params['rp'])
+        chunk = rows[(page - 1) * rp:page * rp]
+        return httpx.Response(200, json={"page": str(page), "total": str(len(rows)), "registros": chunk})
+    return httpx.MockTransport(handler)
+
+
+def test_list_all_reuses_one_pooled_client():
+    rows = [{"id": str(i)} for i in range(1, 6)]
+    calls = []
+
+    async def scenario():
+        async with IxcClient(make_config(), transport=make_transport(rows, calls)) as client:
+            records = await client.list_all("cliente", {"sortname": "cliente.id", "sortorder": "asc"})
+            pooled = client.http
+            assert client.http is pooled
+            return records, pooled
+
+    records, pooled = asyncio.run(scenario())
+    assert [r["id"] for r in records] == ["1", "2", "3", "4", "5"]
+    assert [c["page"] for c in calls] == ["1", "2", "3"]
+    assert pooled.is_closed
+
+
+def test_aclose_is_idempotent_and_client_reopens():
+    async def scenario():
+        client = IxcClient(make_config(), transport=make_transport([], []))
+        first = client.http
+        await client.aclose()
+        await client.aclose()
+        assert first.is_closed
+        second = client.http
+        assert second is not first and not second.is_closed
+        await client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_fan_out_keeps_page_order():
+    rows = [{"id": str(i)} for i in range(1, 11)]
+    in_flight = {"now": 0, "peak": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        page, rp = int(params['page']), int(params['rp'])
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        # Later pages answer first, so order must come from reassembly
+        await asyncio.sleep(0.01 * (6 - page))
+        in_flight["now"] -= 1
+        chunk = rows[(page - 1) * rp:page * rp]
+        return httpx.Response(200, json={"page": str(page), "total": str(len(rows)), "registros": chunk})
+
+    async def scenario():
+        async with IxcClient(make_config(), transport=httpx.MockTransport(handler)) as client:
+            client.page_concurrency = 2
+            return await client.list_all("cliente", {"sortname": "cliente.id", "sortorder": "asc"})
+
+    records = asyncio.run(scenario())
+    assert [r["id"] for r in records] == [str(i) for i in range(1, 11)]
+    assert in_flight["peak"] == 2
+
+
+SORTED = {"sortname": "cliente.id", "sortorder": "asc"}
+
+
+def test_transient_errors_are_retried():
+    rows = [{"id": str(i)} for i in range(1, 5)]
+    attempts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        attempts.append(params['page'])
+        if params['page'] == "2" and attempts.count("2") < 3:
+            return httpx.Response(503)
+        page, rp = int(params['page']), int(params['rp'])
+        return httpx.Response(200, json={"total": len(rows), "registros": rows[(page - 1) * rp:page * rp]})
+
+    async def scenario():
+        async with IxcClient(make_config(), transport=httpx.MockTransport(handler)) as client:
+            return await client.list_all("cliente", SORTED)
+
+    assert len(asyncio.run(scenario())) == 4
+    assert attempts.count("2") == 3
+
+
+def test_failed_page_raises_instead_of_truncating():
+    rows = [{"id": str(i)} for i in range(1, 7)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        if params['page'] == "3":
+            raise httpx.ReadTimeout("timed out", request=request)
+        page, rp = int(params['page']), int(params['rp'])
+        return httpx.Response(200, json={"total": len(rows), "registros": rows[(page - 1) * rp:page * rp]})
+
+    async def scenario():
+        async with IxcClient(make_config(), transport=httpx.MockTransport(handler)) as client:
+            return await client.list_all("cliente", SORTED)
+
+    with pytest.raises(IxcRequestError):
+        asyncio.run(scenario())
+
+
+def test_page_budget_is_enforced():
+    rows = [{"id": str(i)} for i in range(1, 11)]
+
+    async def scenario():
+        config = make_config(page_budget=3)
+        async with IxcClient(config, transport=make_transport(rows, [])) as client:
+            return await client.list_all("cliente", SORTED)
+
+    with pytest.raises(PageBudgetExceeded):
+        asyncio.run(scenario())
+
+
+def test_interrupted_listing_resumes_from_checkpoint(tmp_path):
+    rows = [{"id": str(i)} for i in range(1, 9)]
+    calls = []
+    state = {"fail": True}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        calls.append(params['page'])
+        if params['page'] == "4" and state["fail"]:
+            return httpx.Response(400)
+        page, rp = int(params['page']), int(params['rp'])
+        return httpx.Response(200, json={"total": len(rows), "registros": rows[(page - 1) * rp:page * rp]})
+
+    async def scenario():
+        config = make_config(checkpoint_dir=str(tmp_path))
+        async with IxcClient(config, transport=httpx.MockTransport(handler)) as client:
+            client.page_concurrency = 1
+            return await client.list_all("cliente", SORTED)
+
+    with pytest.raises(IxcRequestError):
+        asyncio.run(scenario())
+    assert calls == ["1", "2", "3", "4"]
+
+    calls.clear()
+    state["fail"] = False
+    records = asyncio.run(scenario())
+    assert [r["id"] for r in records] == [str(i) for i in range(1, 9)]
+    # Page 1 is re-read for a fresh total; pages 2 and 3 come from the checkpoint
+    assert calls == ["1", "4"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_iter_pages_streams_with_bounded_read_ahead():
+    rows = [{"id": str(i)} for i in range(1, 13)]
+    calls = []
+
+    async def scenario():
+        seen = []
+        async with IxcClient(make_config(), transport=make_transport(rows, calls)) as client:
+            client.page_concurrency = 4
+            async for page in client.iter_pages("cliente", SORTED, prefetch=2):
+                # Never more than `prefetch` pages requested beyond the one being consumed
+                assert len(calls) <= len(seen) + 1 + 2
+                seen.append(page)
+        return seen
+
+    pages = asyncio.run(scenario())
+    assert [[r["id"] for r in p] for p in pages] == [[str(i), str(i + 1)] for i in range(1, 13, 2)]
+
+
+def test_iter_records_matches_list_all():
+    rows = [{"id": str(i)} for i in range(1, 8)]
+
+    async def scenario():
+        async with IxcClient(make_config(), transport=make_transport(rows, [])) as client:
+            streamed = [r async for r in client.iter_records("cliente", SORTED)]
+            listed = await client.list_all("cliente", SORTED)
+        return streamed, listed
+
+    streamed, listed = asyncio.run(scenario())
+    assert streamed == listed == rows
+
+
+def test_pages_are_projected_to_the_field_allowlist():
+    rows = [{"id": "1", "razao": "Cliente", "cnpj_cpf": "000", "obs": "x" * 100}]
+    config = make_config()
+    config['erp']['fields'] = {'cliente_contrato': ['*']}
+
+    async def scenario():
+        async with IxcClient(config, transport=make_transport(rows, [])) as client:
+            return await client.list_all("cliente", SORTED), await client.list_all("cliente_contrato", SORTED)
+
+    customers, contracts = asyncio.run(scenario())
+    assert customers == [{"id": "1", "razao": "Cliente"}]
+    assert contracts == rows
+
+
+def test_keyset_mode_pages_by_last_seen_id():
+    rows = [{"id": str(i)} for i in (3, 5, 8, 13, 21)]
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        calls.append(params)
+        floor = max([int(c['P']) for c in json.loads(params.get('grid_param', '[]'))
+                     if c['TB'] == 'cliente.id' and c['OP'] == '>'] or [0])
+        matching = [r for r in rows if int(r['id']) > floor]
+        return httpx.Response(200, json={"total": len(matching), "registros": matching[:int(params['rp'])]})
+
+    async def scenario():
+        config = make_config(keyset_endpoints=['cliente'])
+        async with IxcClient(config, transport=httpx.MockTransport(handler)) as client:
+            return await client.list_all("cliente", {"sortname": "cliente.razao", "sortorder": "desc"})
+
+    records = asyncio.run(scenario())
+    assert records == rows
+    assert all(c['page'] == "1" and c['sortname'] == "cliente.id" and c['sortorder'] == "asc" for c in calls)
+    assert [json.loads(c.get('grid_param', '[]')) for c in calls][1:] == [
+        [{"TB": "cliente.id", "OP": ">", "P": "5"}],
+        [{"TB": "cliente.id", "OP": ">", "P": "13"}]
+    ]
+
+
+def test_tuned_page_size_is_used_unless_rp_is_fixed(tmp_path):
+    rows = [{"id": str(i)} for i in range(1, 4)]
+    calls = []
+    config = make_config()
+    config['erp']['page_size_tuning'] = {'enabled': True, 'min_size': 1, 'max_size': 10}
+
+    async def scenario():
+        async with IxcClient(config, transport=make_transport(rows, calls)) as client:
+            client.tuner.state["cliente"] = {"rp": 3}
+            await client.list_all("cliente", SORTED)
+            await client.list_all("cliente", dict(SORTED, rp="1"))
+
+    asyncio.run(scenario())
+    assert [c['rp'] for c in calls] == ["3", "1", "1", "1"]
+
+
+def test_listings_sorted_by_a_non_unique_key_are_fetched_in_sequence(tmp_path):
+    # Bills sharing a due date have no fixed order across requests: no fan-out, no resuming by page
+    rows = [{"id": str(i)} for i in range(1, 11)]
+    in_flight = {"now": 0, "peak": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        page, rp = int(params['page']), int(params['rp'])
+        if page == 4:
+            return httpx.Response(400)
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.005)
+        in_flight["now"] -= 1
+        return httpx.Response(200, json={"total": str(len(rows)), "registros": rows[(page - 1) * rp:page * rp]})
+
+    async def scenario():
+        async with IxcClient(make_config(checkpoint_dir=str(tmp_path)), transport=httpx.MockTransport(handler)) as client:
+            client.page_concurrency = 4
+            return await client.list_all("fn_areceber", {"sortname": "fn_areceber.data_vencimento", "sortorder": "asc"})
+
+    with pytest.raises(IxcRequestError):
+        asyncio.run(scenario())
+    assert in_flight["peak"] == 1
+    assert list(tmp_path.iterdir()) == []
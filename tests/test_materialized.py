@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+import pytest
+
+from config.settings import settings
+from processing.materialized import MaterializedMetrics, render
+from utils.storage import get_storage
+
+
+@pytest.fixture
+def datasets(tmp_path, monkeypatch):
+    for name, attr in (("clientes", "STORAGE_PATH_CLIENTES"), ("contratos", "STORAGE_PATH_CONTRATOS"), ("boletos", "STORAGE_PATH_BOLETOS")):
+        monkeypatch.setattr(settings, attr, str(tmp_path / f"{name}.json"))
+    monkeypatch.setattr(settings, "REPORT_DAYS", 10)
+    get_storage(settings.STORAGE_PATH_CLIENTES).save_all([{"id": "1", "razao": "Ana", "telefone_celular": "9", "bairro": "Centro"}])
+    get_storage(settings.STORAGE_PATH_CONTRATOS).save_all([{"id": "1", "id_cliente": "1", "status_internet": "A", "desbloqueio_confianca_ativo": "N"}])
+    due = (date.today() - timedelta(days=8)).isoformat()
+    get_storage(settings.STORAGE_PATH_BOLETOS).save_all([{"id": "1", "id_cliente": "1", "status": "A", "data_vencimento": due}])
+    return tmp_path, due
+
+
+def test_views_are_served_until_a_sync_publishes_new_data(datasets):
+    tmp_path, due = datasets
+    metrics = MaterializedMetrics(str(tmp_path / "mat" / "inadiplencia.json"))
+    assert metrics.lookup("total") is None
+
+    assert metrics.refresh()
+    total = metrics.lookup("total")
+    assert b'"transicao":1' in total
+    assert metrics.lookup("details", due) == render([{
+        "status": "transicao", "Nome do Cliente": "Ana", "Dias de Atraso": 8,
+        "Telefone": "9", "Bairro": "Centro", "Status da Conexão": "A"
+    }])
+    assert metrics.lookup("details", "2000-01-01") == b"[]"
+
+    # A restart starts from the file on disk
+    assert MaterializedMetrics(metrics.path).lookup("total") == total
+
+    get_storage(settings.STORAGE_PATH_BOLETOS).save_all([])
+    assert metrics.lookup("total") is None
+    assert not metrics.stats()["fresh"]
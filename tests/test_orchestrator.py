@@ -0,0 +1,79 @@
+import asyncio
+
+from ixc.orchestrator import SyncOrchestrator
+
+
+def test_concurrent_triggers_join_the_in_flight_run():
+    started = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def job():
+            started.append(1)
+            await release.wait()
+
+        orchestrator = SyncOrchestrator({"bills": job})
+        first = orchestrator.trigger("bills", "scheduler")
+        assert orchestrator.status()["bills"]["state"] == "queued"
+        await asyncio.sleep(0)
+        assert orchestrator.status()["bills"]["state"] == "running"
+
+        second = orchestrator.trigger("bills", "api")
+        waiter = asyncio.create_task(orchestrator.run("bills", "startup"))
+        await asyncio.sleep(0)
+        assert second is first
+
+        release.set()
+        await waiter
+        return orchestrator.status()["bills"]
+
+    status = asyncio.run(scenario())
+    assert started == [1]
+    assert status["state"] == "idle"
+    assert status["source"] == "scheduler"
+    assert (status["runs"], status["joined"]) == (1, 2)
+    assert status["last_status"] == "success"
+
+
+def test_failed_run_is_recorded_and_next_trigger_starts_fresh():
+    calls = []
+
+    async def job():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("IXC unavailable")
+
+    async def scenario():
+        orchestrator = SyncOrchestrator({"customers": job})
+        await orchestrator.run("customers")
+        failed = orchestrator.status()["customers"]
+        await orchestrator.run("customers")
+        return failed, orchestrator.status()["customers"]
+
+    failed, recovered = asyncio.run(scenario())
+    assert failed["last_status"] == "error" and failed["last_error"] == "IXC unavailable"
+    assert recovered["last_status"] == "success" and recovered["last_error"] is None
+    assert recovered["runs"] == 2 and len(calls) == 2
+
+
+def test_listeners_run_after_successful_runs_only():
+    notified = []
+
+    async def ok():
+        pass
+
+    async def broken():
+        raise RuntimeError("down")
+
+    async def listener(name):
+        notified.append(name)
+
+    async def scenario():
+        orchestrator = SyncOrchestrator({"customers": ok, "bills": broken})
+        orchestrator.add_listener(listener)
+        await orchestrator.run("customers")
+        await orchestrator.run("bills")
+
+    asyncio.run(scenario())
+    assert notified == ["customers"]
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from ixc.ratelimit import AdaptiveRateLimiter, get_rate_limiter
+
+
+def test_concurrent_acquires_are_spaced_by_the_rate():
+    limiter = AdaptiveRateLimiter(rate=50, burst=1)
+
+    async def scenario():
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+        return time.monotonic() - start
+
+    # One token is available immediately, the other five wait 20ms apart
+    assert asyncio.run(scenario()) >= 0.09
+
+
+def test_queue_depth_reports_waiters():
+    limiter = AdaptiveRateLimiter(rate=20, burst=1)
+
+    async def scenario():
+        tasks = [asyncio.create_task(limiter.acquire()) for _ in range(4)]
+        await asyncio.sleep(0)
+        depth = limiter.queue_depth
+        await asyncio.gather(*tasks)
+        return depth
+
+    assert asyncio.run(scenario()) == 3
+    assert limiter.queue_depth == 0
+
+
+def test_aimd_backs_off_on_throttling_and_recovers():
+    limiter = AdaptiveRateLimiter(rate=10, min_rate=1, max_rate=12, increase=1.0, cooldown=0)
+    limiter.record(429, 0.1)
+    assert limiter.rate == 5
+    limiter.record(503, 0.1)
+    assert limiter.rate == 2.5
+    for _ in range(200):
+        limiter.record(200, 0.1)
+    assert limiter.rate == 12
+
+
+def test_aimd_backs_off_when_latency_rises():
+    limiter = AdaptiveRateLimiter(rate=10, cooldown=0, latency_factor=2.0)
+    for _ in range(5):
+        limiter.record(200, 0.1)
+    before = limiter.rate
+    for _ in range(10):
+        limiter.record(200, 2.0)
+    assert limiter.rate < before
+
+
+def test_limiter_is_shared_per_base_url():
+    a = get_rate_limiter("http://shared.test/")
+    b = get_rate_limiter("http://shared.test")
+    assert a is b
+    assert get_rate_limiter("http://other.test") is not a
@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from config.settings import settings
+from processing.delinquency import DelinquencyReports
+from utils.storage import get_storage
+
+
+def _day(days_ago: int) -> str:
+    return (date.today() - timedelta(days=days_ago)).isoformat()
+
+
+@pytest.fixture
+def datasets(tmp_path, monkeypatch):
+    for name, attr in (("clientes", "STORAGE_PATH_CLIENTES"), ("contratos", "STORAGE_PATH_CONTRATOS"), ("boletos", "STORAGE_PATH_BOLETOS")):
+        monkeypatch.setattr(settings, attr, str(tmp_path / f"{name}.json"))
+    monkeypatch.setattr(settings, "MATERIALIZE_METRICS", False)
+    monkeypatch.setattr(settings, "REPORT_DAYS", 10)
+    get_storage(settings.STORAGE_PATH_CONTRATOS).save_all([{"id": "1", "id_cliente": "1", "status_internet": "A"}])
+    get_storage(settings.STORAGE_PATH_BOLETOS).save_all([
+        {"id": str(i), "id_cliente": "1", "status": "A", "data_vencimento": _day(days_ago)}
+        for i, days_ago in enumerate([1, 3, 8, 8, 20, 60, -2], start=1)
+    ] + [{"id": "99", "id_cliente": "1", "status": "A", "data_vencimento": "0000-00-00"}])
+
+
+def test_windows_and_as_of(datasets):
+    reports = DelinquencyReports(size=2)
+    today = pd.Timestamp.now().normalize()
+
+    total = reports.view("total", today)
+    assert total["total_boletos"] == 8
+    assert total["status"] == {"em_dia": 2, "vencimento_padrao": 2, "transicao": 2, "cronico": 2, "desbloqueio_confianca": 0}
+
+    # Days late are counted up to as_of: ten days ago, the 20- and 60-day-old bills were 10 and 50 days late
+    window = reports.view("total", today - timedelta(days=10), today - timedelta(days=60), today - timedelta(days=20))
+    assert window["total_boletos"] == 2 and window["status"]["transicao"] == 1 and window["status"]["cronico"] == 1
+
+    by_date = reports.view("by_date", today, today - timedelta(days=8), today - timedelta(days=2))
+    assert [(row["date"], row["total_boletos"]) for row in by_date] == [
+        ((today - timedelta(days=3)).strftime("%d-%m-%Y"), 1), ((today - timedelta(days=8)).strftime("%d-%m-%Y"), 2)]
+    assert reports.view("by_date", today, today, today - timedelta(days=1)) == []
+
+    # Only the last two views are kept
+    assert reports.view("by_date", today, today - timedelta(days=8), today - timedelta(days=2)) is by_date
+    assert reports.hits == 1
+    assert reports.view("total", today) == total and reports.misses == 5
+
+    # A new generation drops the cached views
+    get_storage(settings.STORAGE_PATH_BOLETOS).save_all([{"id": "1", "id_cliente": "1", "status": "R", "data_vencimento": _day(1)}])
+    assert reports.view("total", today)["status"]["em_dia"] == 1
+
+
+def test_endpoint_params(datasets):
+    client = TestClient(main.app)
+    default = client.get("/financial/inadiplencia").json()
+    assert [row["total_boletos"] for row in default] == [1, 1, 2]
+
+    as_of = (date.today() - timedelta(days=10)).strftime("%d-%m-%Y")
+    shifted = client.get("/financial/inadiplencia", params={"as_of": as_of}).json()
+    assert [row["total_boletos"] for row in shifted] == [1]
+
+    start = (date.today() - timedelta(days=90)).strftime("%d-%m-%Y")
+    total = client.get("/financial/inadiplencia", params={"view": "total", "start": start}).json()
+    assert total["total_boletos"] == 7
+
+    assert client.get("/financial/inadiplencia", params={"start": "31-02-2026"}).status_code == 400
+    assert client.get("/financial/inadiplencia", params={"start": "10-10-2026", "end": "01-10-2026"}).status_code == 400
+
+
+@pytest.mark.parametrize("backend", ["tinydb", "sqlite"])
+def test_reports_with_renamed_storage_files(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", backend)
+    monkeypatch.setattr(settings, "STORAGE_SQLITE_PATH", str(tmp_path / "ixc.sqlite3"))
+    for name, attr in (("customers", "STORAGE_PATH_CLIENTES"), ("contracts", "STORAGE_PATH_CONTRATOS"), ("bills", "STORAGE_PATH_BOLETOS")):
+        monkeypatch.setattr(settings, attr, str(tmp_path / f"{name}.json"))
+    monkeypatch.setattr(settings, "MATERIALIZE_METRICS", False)
+    get_storage(settings.STORAGE_PATH_CLIENTES).save_all([{"id": "1", "razao": "Ana", "fone": "9", "bairro": "Centro"}])
+    get_storage(settings.STORAGE_PATH_CONTRATOS).save_all([{"id": "1", "id_cliente": "1", "status_internet": "A"}])
+    get_storage(settings.STORAGE_PATH_BOLETOS).save_all([
+        {"id": "1", "id_cliente": "1", "status": "A", "data_vencimento": _day(3)},
+        {"id": "2", "id_cliente": "1", "status": "A", "data_vencimento": "0000-00-00"}])
+    client = TestClient(main.app)
+
+    total = client.get("/financial/inadiplencia", params={"view": "total"})
+    assert total.status_code == 200 and total.json()["status"]["vencimento_padrao"] == 1
+    details = client.get("/financial/detalhes", params={"date": (date.today() - timedelta(days=3)).strftime("%d-%m-%Y")})
+    assert details.status_code == 200
+    assert [(row["Nome do Cliente"], row["Dias de Atraso"]) for row in details.json()] == [("Ana", 3)]
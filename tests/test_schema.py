@@ -0,0 +1,42 @@
+import pandas as pd
+
+from config.settings import settings
+from utils.cache import dataset_cache
+from utils.schema import COLUMN_TYPES, column_types, typed_frame
+from utils.storage import get_storage
+
+
+def test_typed_frame_normalizes_ixc_strings():
+    df = typed_frame([
+        {"id": "1", "id_cliente": "10", "valor": "99.90", "status": "A", "data_vencimento": "2024-03-01 00:00:00",
+         "pagamento_data": "0000-00-00", "obs": "x"},
+        {"id": "2", "id_cliente": "", "valor": "", "status": "", "data_vencimento": "", "pagamento_data": "2024-03-04"},
+    ], COLUMN_TYPES["boletos"])
+
+    assert str(df["id"].dtype) == "Int32" and df["id_cliente"].isna().tolist() == [False, True]
+    assert df["valor"].dtype == "float64" and pd.isna(df["valor"][1])
+    assert str(df["status"].dtype) == "category" and df["status"].tolist() == ["A", ""]
+    assert df["data_vencimento"].dt.strftime("%Y-%m-%d").tolist()[0] == "2024-03-01"
+    assert df["pagamento_data"].isna().tolist() == [True, False]
+    assert df["obs"].tolist()[0] == "x"
+
+
+def test_large_ids_widen_to_int64():
+    df = typed_frame([{"id": str(2 ** 40)}], COLUMN_TYPES["clientes"])
+    assert str(df["id"].dtype) == "Int64" and df["id"][0] == 2 ** 40
+
+
+def test_schema_follows_the_configured_paths_not_the_file_names(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_PATH_BOLETOS", str(tmp_path / "bills.json"))
+    monkeypatch.setattr(settings, "STORAGE_PATH_CONTRATOS", str(tmp_path / "contracts.json"))
+    assert column_types(str(tmp_path / "bills.json")) is COLUMN_TYPES["boletos"]
+    assert column_types(str(tmp_path / "contracts.json")) is COLUMN_TYPES["contratos"]
+    assert column_types(str(tmp_path / "clientes.json")) is COLUMN_TYPES["clientes"]
+    assert column_types(str(tmp_path / "tipos.json")) is None
+
+    get_storage(settings.STORAGE_PATH_BOLETOS).save_all([
+        {"id": "1", "id_cliente": "10", "status": "A", "data_vencimento": "0000-00-00"},
+        {"id": "2", "id_cliente": "11", "status": "A", "data_vencimento": "2024-03-01"}])
+    df = dataset_cache.get(settings.STORAGE_PATH_BOLETOS, columns=["id_cliente", "data_vencimento"])
+    assert pd.api.types.is_datetime64_any_dtype(df["data_vencimento"]) and df["data_vencimento"].isna().tolist() == [True, False]
+    assert str(df["id_cliente"].dtype) == "Int32"
@@ -0,0 +1,182 @@
+import pytest
+
+from config.settings import settings
+from utils import compression
+from utils.indexes import read_index
+from utils.storage import UpsertResult, current_generation, get_storage
+
+
+def test_writer_streams_batches_into_tinydb(tmp_path):
+    path = str(tmp_path / "boletos.json")
+    storage = get_storage(path)
+    with storage.writer() as writer:
+        writer.write_many([{"id": "1", "valor": "10.00"}, {"id": "2", "valor": "20.00"}])
+        writer.write_many([{"id": "3", "valor": "çã"}])
+
+    assert storage.get_all() == [{"id": "1", "valor": "10.00"}, {"id": "2", "valor": "20.00"}, {"id": "3", "valor": "çã"}]
+    assert get_storage(path).get_all() == storage.get_all()
+
+
+def test_failed_write_keeps_previous_data(tmp_path):
+    path = str(tmp_path / "boletos.json")
+    get_storage(path).save_all([{"id": "1"}])
+
+    with pytest.raises(RuntimeError):
+        with get_storage(path).writer() as writer:
+            writer.write_many([{"id": "2"}])
+            raise RuntimeError("listing interrupted")
+
+    assert get_storage(path).get_all() == [{"id": "1"}]
+    assert not (tmp_path / "boletos.json.tmp").exists()
+
+
+def test_readers_keep_their_generation_until_they_reopen(tmp_path):
+    path = str(tmp_path / "boletos.json")
+    get_storage(path).save_all([{"id": "1"}])
+    reader = get_storage(path)
+
+    get_storage(path).save_all([{"id": "1"}, {"id": "2"}])
+    get_storage(path).save_all([{"id": "3"}])
+
+    # The open reader still sees its snapshot, even after it was pruned
+    assert reader.generation == 1
+    assert reader.get_all() == [{"id": "1"}]
+    assert current_generation(path) == 3
+    assert get_storage(path).get_all() == [{"id": "3"}]
+    assert sorted(p.name for p in tmp_path.iterdir() if not p.name.endswith((".arrow", ".index.json"))) == [
+        "boletos.000002.json", "boletos.000003.json", "boletos.json", "boletos.json.current"]
+
+
+def test_legacy_file_is_generation_zero(tmp_path):
+    path = tmp_path / "clientes.json"
+    path.write_text('{"_default": {"1": {"id": "7"}}}')
+
+    storage = get_storage(str(path))
+    assert (storage.generation, storage.get_all()) == (0, [{"id": "7"}])
+    storage.upsert_many([{"id": "8"}])
+    assert (storage.generation, current_generation(str(path))) == (1, 1)
+    assert [r["id"] for r in get_storage(str(path)).get_all()] == ["7", "8"]
+
+    # Pruning old generations never removes the legacy file
+    for i in range(4):
+        storage.upsert_many([{"id": str(10 + i)}])
+    assert current_generation(str(path)) == 5
+    assert path.exists() and get_storage(str(path)).generation == 5
+
+
+def test_upsert_reports_counts_and_skips_unchanged_rows(tmp_path):
+    path = str(tmp_path / "contratos.json")
+    storage = get_storage(path)
+    storage.save_all([{"id": "1", "status": "A"}, {"id": "2", "status": "A"}])
+
+    result = storage.upsert_many([{"status": "A", "id": "1"}, {"id": "2", "status": "D"}, {"id": "3", "status": "A"}])
+    assert result == UpsertResult(inserted=1, updated=1, unchanged=1, deleted=0, total=3)
+    assert current_generation(path) == 2
+
+    assert storage.upsert_many([{"id": "3", "status": "A"}]) == UpsertResult(unchanged=1, total=3)
+    assert current_generation(path) == 2
+
+    assert storage.delete_ids([2, "9"]) == UpsertResult(deleted=1, total=2)
+    assert [r["id"] for r in get_storage(path).get_all()] == ["1", "3"]
+    assert current_generation(path) == 3
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd", "lz4"])
+def test_compressed_snapshots_round_trip(tmp_path, monkeypatch, codec):
+    if not compression.available(codec):
+        pytest.skip(f"{codec} is not installed")
+    monkeypatch.setattr(settings, "STORAGE_COMPRESSION", codec)
+    path = str(tmp_path / "contratos.json")
+    records = [{"id": str(i), "status": "A", "valor": 1.5} for i in range(3)]
+    with get_storage(path).writer() as writer:
+        writer.write_many(records[:1])
+        writer.write_many(records[1:])
+
+    assert (tmp_path / f"contratos.000001.json{compression.EXTENSIONS[codec]}").exists()
+    storage = get_storage(path)
+    assert storage.get_all() == records
+    assert list(storage.iter_all()) == records
+    assert storage.upsert_many([{"id": "3", "status": "A"}]).inserted == 1
+    assert len(get_storage(path).get_all()) == 4
+
+    # An open reader outlives the pruning of its generation
+    reader = get_storage(path)
+    for i in range(4):
+        get_storage(path).save_all(records[:i])
+    assert not any(p.name.startswith(f"contratos.{reader.generation:06d}") for p in tmp_path.iterdir())
+    assert len(reader.get_all()) == 4
+
+
+def test_snapshots_stream_without_ijson(tmp_path, monkeypatch):
+    monkeypatch.setattr(compression, "ijson", None)
+    path = str(tmp_path / "contratos.json")
+    get_storage(path).save_all([{"id": "1"}, {"id": "2"}])
+    assert list(get_storage(path).iter_all()) == [{"id": "1"}, {"id": "2"}]
+
+
+def test_missing_codec_falls_back_to_gzip(monkeypatch):
+    monkeypatch.setattr(compression, "zstandard", None)
+    assert compression.resolve_codec("zstd") == "gzip"
+    assert compression.resolve_codec("none") is None
+    with pytest.raises(ValueError):
+        compression.resolve_codec("brotli")
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "STORAGE_SQLITE_PATH", str(tmp_path / "ixc.sqlite3"))
+    return tmp_path
+
+
+def test_sqlite_backend_publishes_generations_and_filters_by_index(sqlite_backend):
+    path = str(sqlite_backend / "boletos.json")
+    bills = [
+        {"id": "1", "id_cliente": "10", "status": "A", "data_vencimento": "2024-03-01"},
+        {"id": "2", "id_cliente": "11", "status": "R", "data_vencimento": "2024-03-01"},
+        {"id": "3", "id_cliente": "10", "status": "A", "data_vencimento": "2024-03-05 00:00:00"},
+    ]
+    with get_storage(path).writer() as writer:
+        writer.write_many(bills[:2])
+        writer.write_many(bills[2:])
+
+    storage = get_storage(path)
+    assert storage.get_all() == list(storage.iter_all()) == bills
+    assert current_generation(path) == storage.generation == 1
+    assert [r["id"] for r in storage.find("2024-03-01", "2024-03-01")] == ["1", "2"]
+    assert [r["id"] for r in storage.find(due_from="2024-03-02", status="A")] == ["3"]
+
+    result = storage.upsert_many([{"id": "2", "status": "A", "data_vencimento": "2024-03-06"}, {"id": "4", "data_vencimento": "2024-02-01"}],
+                                due_after="2024-03-01")
+    assert result == UpsertResult(inserted=0, updated=1, unchanged=0, deleted=1, total=2)
+    assert [(r["id"], r["status"]) for r in get_storage(path).get_all()] == [("2", "A"), ("3", "A")]
+    assert current_generation(path) == 2
+    # Derived from the published generation once the write lock is released
+    assert read_index(path, 2) == {"by_due": {"2024-03-05": [["3", "10", "A"]], "2024-03-06": [["2", None, "A"]]}}
+
+    assert storage.upsert_many([{"id": "3", "id_cliente": "10", "status": "A", "data_vencimento": "2024-03-05 00:00:00"}]).unchanged == 1
+    assert current_generation(path) == 2
+    assert storage.delete_ids(["3", "99"]) == UpsertResult(deleted=1, total=1)
+    assert current_generation(path) == 3
+
+
+def test_sqlite_backend_imports_the_latest_tinydb_generation(tmp_path, monkeypatch):
+    path = str(tmp_path / "boletos.json")
+    (tmp_path / "boletos.json").write_text('{"_default": {"1": {"id": "legacy"}}}')
+    for rows in ([{"id": "1"}], [{"id": "1"}, {"id": "2"}], [{"id": "1"}, {"id": "2"}, {"id": "3"}]):
+        get_storage(path).save_all(rows)
+    assert current_generation(path) == 3
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "STORAGE_SQLITE_PATH", str(tmp_path / "ixc.sqlite3"))
+    storage = get_storage(path)
+    assert [r["id"] for r in storage.get_all()] == ["1", "2", "3"]
+    assert current_generation(path) == storage.generation == 1
+
+
+def test_sqlite_backend_imports_existing_tinydb_files(sqlite_backend):
+    path = sqlite_backend / "clientes.json"
+    path.write_text('{"_default": {"1": {"id": "7", "razao": "Cliente"}}}')
+
+    assert get_storage(str(path)).get_all() == [{"id": "7", "razao": "Cliente"}]
+    assert current_generation(str(path)) == 1
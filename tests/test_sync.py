@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import httpx
+
+from config.settings import settings
+from ixc import sync
+from ixc.client import IxcClient
+from utils.storage import get_storage
+
+
+class FakeIxc:
+    """Serves one table and applies the `>`/`>=` grid filters used by delta syncs."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)
+        self.requests.append(params)
+        rows = self.rows
+        for cond in json.loads(params.get('grid_param', '[]')):
+            column = cond['TB'].split('.')[1]
+            if cond['OP'] == '>=':
+                rows = [r for r in rows if r[column] >= cond['P']]
+            elif cond['OP'] == '>' and column == 'id':
+                rows = [r for r in rows if int(r['id']) > int(cond['P'])]
+        page, rp = int(params['page']), int(params['rp'])
+        return httpx.Response(200, json={"total": len(rows), "registros": rows[(page - 1) * rp:page * rp]})
+
+
+def make_client(fake):
+    config = {'erp': {
+        'base_url': 'http://ixc-sync.test',
+        'auth': {'user_id': '1', 'user_token': 'token'},
+        'request_param': {'default_page_size': 2},
+        'rate_limit': {'rate': 1000, 'max_rate': 1000, 'burst': 1000}
+    }}
+    return IxcClient(config, transport=httpx.MockTransport(fake.handler))
+
+
+def run_sync(fake, path):
+    async def scenario():
+        async with make_client(fake) as client:
+            return await sync._sync_dataset(client, "cliente", client.customers_query(), path)
+    return asyncio.run(scenario())
+
+
+def test_delta_sync_fetches_only_changed_and_new_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "WATERMARKS_PATH", str(tmp_path / "watermarks.json"))
+    monkeypatch.setattr(settings, "SYNC_MODE", "delta")
+    path = str(tmp_path / "clientes.json")
+    fake = FakeIxc([
+        {"id": str(i), "razao": f"Cliente {i}", "ultima_atualizacao": f"2026-01-0{i} 10:00:00"}
+        for i in range(1, 6)
+    ])
+
+    assert run_sync(fake, path) == 5
+    assert len(fake.requests) == 3  # full listing, 2 rows per page
+
+    fake.requests.clear()
+    fake.rows[1] = {"id": "2", "razao": "Cliente 2 (editado)", "ultima_atualizacao": "2026-02-01 08:00:00"}
+    fake.rows.append({"id": "6", "razao": "Cliente 6", "ultima_atualizacao": ""})
+
+    assert run_sync(fake, path) == 6
+    stored = {r["id"]: r["razao"] for r in get_storage(path).get_all()}
+    assert stored["2"] == "Cliente 2 (editado)"
+    assert stored["6"] == "Cliente 6"
+    # One small listing for edits since the watermark, one for new ids
+    assert len(fake.requests) == 2
+
+
+def test_full_reconcile_drops_deleted_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "WATERMARKS_PATH", str(tmp_path / "watermarks.json"))
+    monkeypatch.setattr(settings, "SYNC_MODE", "delta")
+    path = str(tmp_path / "clientes.json")
+    fake = FakeIxc([{"id": str(i), "ultima_atualizacao": "2026-01-01 10:00:00"} for i in range(1, 4)])
+    run_sync(fake, path)
+
+    del fake.rows[0]
+    monkeypatch.setattr(settings, "SYNC_FULL_RECONCILE_HOURS", 0)
+    assert run_sync(fake, path) == 2
+    assert sorted(r["id"] for r in get_storage(path).get_all()) == ["2", "3"]
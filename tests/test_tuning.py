@@ -0,0 +1,49 @@
+from ixc.tuning import PageSizeTuner
+
+
+def run_listing(tuner, endpoint, seconds_per_page):
+    rp = tuner.page_size(endpoint)
+    for _ in range(5):
+        tuner.observe(endpoint, rp, rp, seconds_per_page(rp), rp * 200)
+    tuner.finish(endpoint)
+    return rp
+
+
+def test_tuner_climbs_towards_the_fastest_page_size(tmp_path):
+    tuner = PageSizeTuner(str(tmp_path / "page_sizes.json"), initial=100, min_size=50, max_size=5000)
+    # Fixed per-request overhead plus a per-row cost that grows past ~1000 rows
+    cost = lambda rp: 0.2 + rp * 0.0005 + max(0, rp - 1000) * 0.002
+
+    sizes = [run_listing(tuner, "cliente", cost) for _ in range(20)]
+    assert sizes[0] == 100
+    assert 600 <= tuner.state["cliente"]["best_rp"] <= 1600
+    assert all(50 <= s <= 5000 for s in sizes)
+
+    # The best size survives a restart
+    restored = PageSizeTuner(str(tmp_path / "page_sizes.json"), initial=100, min_size=50, max_size=5000)
+    assert restored.page_size("cliente") == tuner.page_size("cliente")
+
+
+def test_slow_or_heavy_pages_shrink_immediately():
+    tuner = PageSizeTuner(None, initial=1000, timeout=10, max_page_bytes=1_000_000)
+    tuner.observe("fn_areceber", 1000, 1000, 6.0, 100_000)
+    tuner.finish("fn_areceber")
+    assert tuner.page_size("fn_areceber") < 1000
+
+    tuner.observe("cliente", 1000, 1000, 0.5, 2_000_000)
+    tuner.finish("cliente")
+    assert tuner.page_size("cliente") < 1000
+
+    tuner.observe_timeout("tipo_cliente", 400)
+    assert tuner.page_size("tipo_cliente") == 200
+
+
+def test_single_page_listings_do_not_move_the_page_size():
+    tuner = PageSizeTuner(None, initial=100, max_size=5000)
+    run_listing(tuner, "fn_areceber", lambda rp: 0.5)
+    learned = tuner.page_size("fn_areceber")
+    # Delta syncs: a few rows, one page, at noise-level throughput
+    for rows in (12, 3, 40, 7):
+        tuner.observe("fn_areceber", learned, rows, 0.3, rows * 200)
+        tuner.finish("fn_areceber")
+    assert tuner.page_size("fn_areceber") == learned